@@ -0,0 +1,90 @@
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+
+from deadlines import Deadline
+from models.report import ReportData
+from risk_prediction_apis import RiskInputData, FetalHealthInput, MEMBER_NAMES, PREG_FEATURES, format_prediction
+
+# Combined assessment payload for /assess: one clinical report, the
+# pregnancy-risk fields and the CTG features of the same patient.
+#
+# RiskInputData fields that are also recorded in the report do not need to be
+# sent twice: a missing risk field is taken from the report field mapped to it
+# in SHARED_FIELDS. An ensemble runs only when all of its inputs are present.
+#
+# The rule engine and every ensemble member are scheduled on the thread pool
+# at once; the random forests dominate, and their tree traversal releases the
+# GIL, so the members overlap instead of running back to back. With a request
+# deadline, an ensemble answers from the members finished without error when
+# it expires (waiting for the random forest if none has), marked "Degraded".
+
+# RiskInputData field -> ReportData field
+SHARED_FIELDS = {
+    "systolic": "sbp",
+    "diastolic": "dbp",
+    "bmi": "bmi",
+}
+
+
+class RiskFields(BaseModel):
+    age: Optional[float] = None
+    systolic: Optional[float] = None
+    diastolic: Optional[float] = None
+    bs: Optional[float] = None
+    bmi: Optional[float] = None
+    heart_rate: Optional[float] = None
+    body_temp: Optional[float] = None
+    previous_complications: Optional[float] = None
+
+
+class AssessInput(BaseModel):
+    id: Optional[str] = None
+    data: Optional[ReportData] = None
+    risk: Optional[RiskFields] = None
+    fetal: Optional[FetalHealthInput] = None
+
+
+def risk_input(payload: AssessInput) -> Tuple[Optional[RiskInputData], List[str]]:
+    # (RiskInputData, []) when every feature is available, else (None, missing fields)
+    risk = payload.risk.dict() if payload.risk is not None else {}
+    report = payload.data.dict() if payload.data is not None else {}
+    values: Dict[str, Optional[float]] = {}
+    for feature in PREG_FEATURES:
+        value = risk.get(feature)
+        if value is None and feature in SHARED_FIELDS:
+            value = report.get(SHARED_FIELDS[feature])
+        values[feature] = value
+    missing = [f for f, v in values.items() if v is None]
+    if missing:
+        return None, missing
+    return RiskInputData(**values), []
+
+
+async def soft_vote_concurrently(models, features: List[str], values: List[float], deadline: Optional[Deadline] = None) -> Dict:
+    # Same soft vote as risk_prediction_apis.soft_vote, one thread per member
+    frame = pd.DataFrame([values], columns=features)
+    if deadline is None:
+        probas = await asyncio.gather(*(run_in_threadpool(m.predict_proba, frame) for m in models))
+        return format_prediction(np.asarray(sum(probas) / len(models))[0])
+
+    jobs = [asyncio.ensure_future(run_in_threadpool(m.predict_proba, frame)) for m in models]
+    await asyncio.wait(jobs, timeout=max(0.0, deadline.remaining()))
+    # Members that raised are left out like late ones; only the random forest
+    # fallback failing fails the vote
+    used = [i for i, job in enumerate(jobs) if job.done() and job.exception() is None]
+    if not used:
+        await jobs[0]
+        used = [0]
+    for job in jobs:
+        if not job.done():
+            # Still running in its thread; its result is discarded
+            job.add_done_callback(lambda j: j.cancelled() or j.exception())
+    result = format_prediction(np.asarray(sum(jobs[i].result() for i in used) / len(used))[0])
+    if len(used) < len(models):
+        result.update({"Degraded": True, "Models": [MEMBER_NAMES[i] for i in used]})
+    return result
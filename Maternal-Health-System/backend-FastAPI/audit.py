@@ -0,0 +1,333 @@
+import argparse
+import atexit
+import collections
+import gzip
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Audit log of every inference: route, inputs, outputs and the versions of the
+# models and rule thresholds that produced them. Enabled by setting
+# AUDIT_LOG_DIR. Routes write one record per call (/analyze, /predict_preg,
+# /predict_fetal, /predict_fetal/trace, /predict_preg/sensitivity, /assess),
+# per batch (/analyze/batch, /predict_preg/batch and /predict_fetal/batch:
+# all rows, and their class probabilities, in one record), per scored chunk
+# (/cohorts/{id}/reports, /rank), per prediction of a /ws/ctg session, or per
+# report analysed by workers/report_worker.py. Offline tools (benchmarks/,
+# training/) are not audited.
+#
+# Handlers only append a tuple to an in-process deque (append and popleft are
+# atomic, so the request path takes no lock and does no I/O). A background
+# thread per worker process wakes every AUDIT_FLUSH_SECONDS (default 1), or
+# once AUDIT_BATCH_SIZE records are queued, serializes a batch to JSON lines
+# and appends it to the current segment as one gzip member. A segment is a
+# concatenation of such members, readable by any gzip reader; a crash loses at
+# most the batch being written.
+#
+# Segments are named audit-<first record>-<last record>-<pid>.jsonl.gz (UTC
+# times); the one being written has "open" in place of the last time. A
+# segment is closed, renamed and made read-only after AUDIT_SEGMENT_MB
+# (default 64) of compressed data or AUDIT_SEGMENT_SECONDS (default 3600).
+#
+# Memory stays bounded under backpressure: once AUDIT_QUEUE_MAX (default
+# 100000) records are waiting, new records are dropped and counted. Dropped
+# and unwritable records are reported by GET /debug/audit.
+#
+# Records are serialized by the writer thread, after the request has
+# returned: callers must not modify the input or output objects afterwards.
+# NumPy arrays are written as nested lists.
+#
+# Reader CLI (from the backend-FastAPI directory):
+#   python audit.py --dir audit --pregnancy PREG-123 --since 2024-05-01 --until 2024-06-01
+
+SEGMENT_PATTERN = re.compile(r"^audit-(\d{8}T\d{6}\.\d{6}Z)-(\d{8}T\d{6}\.\d{6}Z|open)-(\d+)\.jsonl\.gz$")
+STAMP_FORMAT = "%Y%m%dT%H%M%S.%fZ"
+
+
+def _stamp(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime(STAMP_FORMAT)
+
+
+def _parse_stamp(stamp: str) -> float:
+    return datetime.strptime(stamp, STAMP_FORMAT).replace(tzinfo=timezone.utc).timestamp()
+
+
+def _jsonable(value: Any) -> Any:
+    # NumPy arrays and scalars have tolist(); anything else is written as text
+    return value.tolist() if hasattr(value, "tolist") else str(value)
+
+
+class AuditLog:
+    def __init__(
+        self,
+        directory: Optional[str],
+        max_queue: int = 100000,
+        batch_size: int = 1000,
+        flush_seconds: float = 1.0,
+        segment_bytes: int = 64 * 1024 * 1024,
+        segment_seconds: float = 3600.0,
+    ):
+        self.directory = directory
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self._lock = threading.Lock()
+        self._queue: collections.deque = collections.deque()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._registered = False
+        # Current segment: [fd, path, first record time, opened at, bytes, last record time]
+        self._segment: Optional[List] = None
+        self._counts = {"written": 0, "dropped": 0, "lost": 0, "write_errors": 0, "batches": 0, "segments": 0}
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    def _start(self):
+        # The writer thread does not survive fork: a worker starts its own,
+        # and drops the records its parent had queued (the parent writes them)
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = collections.deque()
+            self._wake = threading.Event()
+            self._segment = None
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+            if not self._registered:
+                atexit.register(self.close)
+                self._registered = True
+
+    def record(
+        self,
+        route: str,
+        inputs: Any,
+        outputs: Any,
+        versions: Dict,
+        pregnancy_id: Optional[str] = None,
+    ):
+        if not self.enabled:
+            return
+        if self._pid != os.getpid():
+            self._start()
+        queue = self._queue
+        if len(queue) >= self.max_queue:
+            with self._lock:
+                self._counts["dropped"] += 1
+            return
+        queue.append((time.time(), route, pregnancy_id, inputs, outputs, versions))
+        if len(queue) >= self.batch_size:
+            self._wake.set()
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self._drain()
+        self._drain()
+        self._close_segment()
+
+    def _drain(self):
+        queue = self._queue
+        while queue:
+            batch = []
+            while queue and len(batch) < self.batch_size:
+                batch.append(queue.popleft())
+            self._write(batch)
+
+    def _write(self, batch: List[Tuple]):
+        pid = os.getpid()
+        lines, unserializable = [], 0
+        for ts, route, pregnancy_id, inputs, outputs, versions in batch:
+            entry = {
+                "ts": ts,
+                "time": datetime.fromtimestamp(ts, timezone.utc).isoformat(),
+                "route": route,
+                "pregnancy_id": pregnancy_id,
+                "input": inputs,
+                "output": outputs,
+                "versions": versions,
+                "pid": pid,
+            }
+            try:
+                lines.append(json.dumps(entry, separators=(",", ":"), default=_jsonable))
+            except (TypeError, ValueError):
+                unserializable += 1
+        if unserializable:
+            with self._lock:
+                self._counts["lost"] += unserializable
+        if not lines:
+            return
+        data = gzip.compress(("\n".join(lines) + "\n").encode("utf-8"))
+        try:
+            segment = self._segment_for(batch[0][0], len(data))
+            os.write(segment[0], data)
+            segment[4] += len(data)
+            segment[5] = batch[-1][0]
+        except OSError:
+            with self._lock:
+                self._counts["write_errors"] += 1
+                self._counts["lost"] += len(lines)
+            self._close_segment()
+            return
+        with self._lock:
+            self._counts["written"] += len(lines)
+            self._counts["batches"] += 1
+
+    def _segment_for(self, first_ts: float, size: int) -> List:
+        segment = self._segment
+        if segment is not None and segment[4] and (
+            segment[4] + size > self.segment_bytes or time.monotonic() - segment[3] >= self.segment_seconds
+        ):
+            self._close_segment()
+            segment = None
+        if segment is None:
+            path = os.path.join(self.directory, f"audit-{_stamp(first_ts)}-open-{os.getpid()}.jsonl.gz")
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            segment = self._segment = [fd, path, first_ts, time.monotonic(), 0, first_ts]
+            with self._lock:
+                self._counts["segments"] += 1
+        return segment
+
+    def _close_segment(self):
+        segment, self._segment = self._segment, None
+        if segment is None:
+            return
+        fd, path, _, _, _, last_ts = segment
+        try:
+            os.close(fd)
+            closed = path.replace("-open-", f"-{_stamp(last_ts)}-")
+            os.rename(path, closed)
+            os.chmod(closed, 0o444)
+        except OSError:
+            with self._lock:
+                self._counts["write_errors"] += 1
+
+    def close(self, timeout: float = 10.0):
+        # Writes what is queued and closes the segment (at interpreter exit)
+        thread = self._thread
+        if self._pid != os.getpid() or thread is None:
+            return
+        self._stopping = True
+        self._wake.set()
+        thread.join(timeout)
+        self._pid = None
+
+    def stats(self) -> Dict:
+        segment = self._segment
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "directory": self.directory,
+                "queued": len(self._queue),
+                "max_queue": self.max_queue,
+                "current_segment": segment[1] if segment is not None else None,
+                **self._counts,
+            }
+
+
+def segments(directory: str, since: Optional[float] = None, until: Optional[float] = None) -> List[str]:
+    # Segment files that may hold records in [since, until], oldest first
+    found = []
+    for name in os.listdir(directory):
+        match = SEGMENT_PATTERN.match(name)
+        if match is None:
+            continue
+        first = _parse_stamp(match.group(1))
+        last = float("inf") if match.group(2) == "open" else _parse_stamp(match.group(2))
+        if (since is not None and last < since) or (until is not None and first > until):
+            continue
+        found.append((first, name))
+    return [os.path.join(directory, name) for _, name in sorted(found)]
+
+
+def read_records(path: str) -> Iterator[Dict]:
+    # A segment cut short by a crash ends in a partial gzip member; the
+    # complete members before it are still read
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+    except (EOFError, gzip.BadGzipFile, ValueError):
+        return
+
+
+def query(
+    directory: str,
+    pregnancy_id: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    route: Optional[str] = None,
+) -> Iterator[Dict]:
+    for path in segments(directory, since, until):
+        for entry in read_records(path):
+            if pregnancy_id is not None and entry.get("pregnancy_id") != pregnancy_id:
+                continue
+            if route is not None and entry.get("route") != route:
+                continue
+            if (since is not None and entry["ts"] < since) or (until is not None and entry["ts"] > until):
+                continue
+            yield entry
+
+
+def parse_time(value: str) -> float:
+    # Seconds since the epoch, or an ISO 8601 date/time (UTC unless it has an offset)
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+AUDIT_LOG = AuditLog(
+    os.environ.get("AUDIT_LOG_DIR") or None,
+    int(os.environ.get("AUDIT_QUEUE_MAX", "100000")),
+    int(os.environ.get("AUDIT_BATCH_SIZE", "1000")),
+    float(os.environ.get("AUDIT_FLUSH_SECONDS", "1")),
+    int(float(os.environ.get("AUDIT_SEGMENT_MB", "64")) * 1024 * 1024),
+    float(os.environ.get("AUDIT_SEGMENT_SECONDS", "3600")),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query audit log segments as NDJSON")
+    parser.add_argument("--dir", default=os.environ.get("AUDIT_LOG_DIR"), help="default: AUDIT_LOG_DIR")
+    parser.add_argument("--pregnancy", help="only records of this pregnancy id")
+    parser.add_argument("--route", help="only records of this route, e.g. predict_preg")
+    parser.add_argument("--since", help="ISO 8601 time or epoch seconds")
+    parser.add_argument("--until", help="ISO 8601 time or epoch seconds")
+    parser.add_argument("--limit", type=int, help="stop after this many records")
+    args = parser.parse_args()
+
+    if not args.dir or not os.path.isdir(args.dir):
+        sys.exit("error: --dir (or AUDIT_LOG_DIR) must be an audit log directory")
+    try:
+        since = parse_time(args.since) if args.since else None
+        until = parse_time(args.until) if args.until else None
+    except ValueError as e:
+        sys.exit(f"error: {e}")
+    for i, entry in enumerate(query(args.dir, args.pregnancy, since, until, args.route)):
+        if args.limit is not None and i >= args.limit:
+            break
+        print(json.dumps(entry, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
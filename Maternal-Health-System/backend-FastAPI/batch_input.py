@@ -0,0 +1,152 @@
+from typing import Any, Dict, List, Union, get_args, get_origin
+
+import numpy as np
+from pydantic import ValidationError
+
+# A batch is either row-oriented (a list of objects, one per patient) or
+# columnar (one array per feature name, e.g. {"systolic": [...], "diastolic": [...]}).
+# Columnar batches are validated in bulk with NumPy and never build per-row models.
+# Binary decoders (see wire_formats.py) may also hand over a ready float matrix.
+
+
+class BatchInputError(ValueError):
+    pass
+
+
+def _field_kind(annotation) -> str:
+    args = [a for a in get_args(annotation) if a is not type(None)]
+    inner = args[0] if args else annotation
+    if inner is bool:
+        return "bool"
+    if get_origin(inner) in (list, List):
+        return "list"
+    return "float"
+
+
+def _column_length(name: str, column: Any) -> int:
+    if not isinstance(column, (list, tuple, np.ndarray)):
+        raise BatchInputError(f"column '{name}' must be an array")
+    return len(column)
+
+
+def rows_to_matrix(rows: List[Any], model_cls, features: List[str]) -> np.ndarray:
+    X = np.empty((len(rows), len(features)), dtype=np.float64)
+    for i, row in enumerate(rows):
+        try:
+            item = row if isinstance(row, model_cls) else model_cls(**row)
+        except (TypeError, ValidationError) as e:
+            raise BatchInputError(f"row {i}: {e}")
+        X[i] = [getattr(item, f) for f in features]
+    return X
+
+
+def columns_to_matrix(columns: Dict[str, Any], features: List[str]) -> np.ndarray:
+    missing = [f for f in features if f not in columns]
+    if missing:
+        raise BatchInputError(f"missing feature columns: {missing}")
+    unknown = sorted(set(columns) - set(features))
+    if unknown:
+        raise BatchInputError(f"unknown feature columns: {unknown}")
+
+    n_rows = _column_length(features[0], columns[features[0]])
+    # Fortran order keeps every feature column contiguous, so each assignment
+    # below is a single bulk conversion of the incoming array.
+    X = np.empty((n_rows, len(features)), dtype=np.float64, order="F")
+    for j, name in enumerate(features):
+        column = columns[name]
+        if _column_length(name, column) != n_rows:
+            raise BatchInputError(
+                f"column '{name}' has {len(column)} values, expected {n_rows}"
+            )
+        try:
+            X[:, j] = column
+        except (TypeError, ValueError):
+            raise BatchInputError(f"column '{name}' must contain only numbers")
+        if np.isnan(X[:, j]).any():
+            raise BatchInputError(f"column '{name}' contains null values")
+    return X
+
+
+def check_matrix(X: np.ndarray, features: List[str]) -> np.ndarray:
+    if X.ndim != 2 or X.shape[1] != len(features):
+        raise BatchInputError(
+            f"matrix must have shape (n, {len(features)}), got {X.shape}"
+        )
+    if X.dtype != np.float64:
+        X = X.astype(np.float64)
+    if np.isnan(X).any():
+        raise BatchInputError("matrix contains null values")
+    return X
+
+
+def parse_batch(
+    payload: Union[List[Any], Dict[str, Any], np.ndarray], model_cls, features: List[str]
+) -> np.ndarray:
+    if isinstance(payload, list):
+        return rows_to_matrix(payload, model_cls, features)
+    if isinstance(payload, dict):
+        return columns_to_matrix(payload, features)
+    if isinstance(payload, np.ndarray):
+        return check_matrix(payload, features)
+    raise BatchInputError("batch must be a list of rows or an object of columns")
+
+
+def columns_to_records(columns: Dict[str, Any], model_cls) -> List[Dict]:
+    # Columnar counterpart of [model_cls(**row).dict() for row in rows] for
+    # models whose fields are all optional, such as ReportData.
+    annotations = model_cls.__annotations__
+    unknown = sorted(set(columns) - set(annotations))
+    if unknown:
+        raise BatchInputError(f"unknown columns: {unknown}")
+    if not columns:
+        return []
+
+    n_rows = None
+    values = {}
+    for name, column in columns.items():
+        length = _column_length(name, column)
+        if n_rows is None:
+            n_rows = length
+        elif length != n_rows:
+            raise BatchInputError(
+                f"column '{name}' has {length} values, expected {n_rows}"
+            )
+
+        kind = _field_kind(annotations[name])
+        if kind == "float":
+            try:
+                array = np.asarray(column, dtype=np.float64)
+            except (TypeError, ValueError):
+                raise BatchInputError(f"column '{name}' must contain only numbers")
+            if array.ndim != 1:
+                raise BatchInputError(f"column '{name}' must contain only numbers")
+            values[name] = [None if v != v else v for v in array.tolist()]
+        elif kind == "bool":
+            if any(v not in (True, False, None) for v in column):
+                raise BatchInputError(f"column '{name}' must contain only booleans")
+            values[name] = [None if v is None else bool(v) for v in column]
+        else:
+            if any(v is not None and not isinstance(v, list) for v in column):
+                raise BatchInputError(f"column '{name}' must contain only lists")
+            values[name] = list(column)
+
+    names = list(annotations)
+    ordered = [values.get(name, [None] * n_rows) for name in names]
+    return [dict(zip(names, row)) for row in zip(*ordered)]
+
+
+def parse_report_batch(payload: Union[List[Any], Dict[str, Any]], input_cls) -> List[Dict]:
+    # Row-oriented report batches are lists of ReportInput objects ({"data": {...}});
+    # columnar ones are a single object of ReportData columns.
+    if isinstance(payload, list):
+        records = []
+        for i, row in enumerate(payload):
+            try:
+                records.append(input_cls(**row).data.dict())
+            except (TypeError, ValidationError) as e:
+                raise BatchInputError(f"row {i}: {e}")
+        return records
+    if isinstance(payload, dict):
+        data_cls = input_cls.__annotations__["data"]
+        return columns_to_records(payload, data_cls)
+    raise BatchInputError("batch must be a list of rows or an object of columns")
@@ -0,0 +1,73 @@
+# Row-oriented vs columnar batch input throughput.
+#
+# Run from the backend-FastAPI directory (the models are loaded from the cwd):
+#   python benchmarks/bench_batch_input.py --rows 10000 --repeat 5
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from batch_input import parse_batch
+from risk_prediction_apis import (
+    RiskInputData,
+    FetalHealthInput,
+    PREG_FEATURES,
+    FETAL_FEATURES,
+    predict_preg_batch,
+    predict_fetal_batch,
+)
+
+
+def make_columns(features, n_rows, rng):
+    return {f: rng.uniform(0, 100, n_rows).round(2).tolist() for f in features}
+
+
+def columns_to_rows(columns):
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run(name, model_cls, features, predict, n_rows, repeat, rng):
+    columns = make_columns(features, n_rows, rng)
+    bodies = {
+        "rows": json.dumps(columns_to_rows(columns)),
+        "columnar": json.dumps(columns),
+    }
+    for layout, body in bodies.items():
+        parse = lambda: parse_batch(json.loads(body), model_cls, features)
+        end_to_end = lambda: predict(parse())
+        t_parse = best_of(parse, repeat)
+        t_total = best_of(end_to_end, repeat)
+        print(
+            f"{name:<6} {layout:<9} parse {t_parse * 1e3:9.2f} ms "
+            f"({n_rows / t_parse:12,.0f} rows/s)   "
+            f"parse+predict {t_total * 1e3:9.2f} ms ({n_rows / t_total:12,.0f} rows/s)"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Row vs columnar batch input benchmark")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    run("preg", RiskInputData, PREG_FEATURES, predict_preg_batch, args.rows, args.repeat, rng)
+    run("fetal", FetalHealthInput, FETAL_FEATURES, predict_fetal_batch, args.rows, args.repeat, rng)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# Latency added by explain=true on /predict_preg and /predict_fetal.
+#
+# Run from the backend-FastAPI directory (the models are loaded from the cwd):
+#   python benchmarks/bench_explain.py --samples 200 --max-ms 100
+# Exits with status 1 when the uncached p99 explanation latency exceeds --max-ms.
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from explain import PREG_EXPLAINER, FETAL_EXPLAINER
+from risk_prediction_apis import predict_preg_proba, predict_fetal_proba
+
+
+def percentiles(timings):
+    ms = np.array(timings) * 1e3
+    return np.percentile(ms, 50), np.percentile(ms, 99)
+
+
+def run(name, explainer, predict_proba, n_samples, rng):
+    X = rng.uniform(0, 100, size=(n_samples, len(explainer.features)))
+    predict, cold, cached = [], [], []
+    for x in X:
+        start = time.perf_counter()
+        target = int(np.argmax(predict_proba(x[None, :])[0]))
+        predict.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        explainer.explain(x, target)
+        cold.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        explainer.explain(x, target)
+        cached.append(time.perf_counter() - start)
+
+    for label, timings in (("predict", predict), ("explain", cold), ("explain cached", cached)):
+        p50, p99 = percentiles(timings)
+        print(f"{name:<6} {label:<15} p50 {p50:8.3f} ms   p99 {p99:8.3f} ms")
+    return percentiles(cold)[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Explanation latency benchmark")
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--max-ms", type=float, default=100.0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    worst = max(
+        run("preg", PREG_EXPLAINER, predict_preg_proba, args.samples, rng),
+        run("fetal", FETAL_EXPLAINER, predict_fetal_proba, args.samples, rng),
+    )
+    if worst > args.max_ms:
+        print(f"FAIL: uncached p99 {worst:.1f} ms exceeds {args.max_ms} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# Rule engine throughput on sparse reports: presence-mask skipping vs running every rule.
+#
+# Most uploaded reports fill only a handful of the ReportData fields. The
+# baseline plan gives every rule empty masks, so all rules run as before; the
+# default plan skips the rules whose inputs are absent. Outputs of the two
+# plans are compared for every report before timing.
+#
+# Run from the backend-FastAPI directory:
+#   python benchmarks/bench_rules_sparse.py --reports 20000 --repeat 5
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.report import ReportData
+from rules.engine import DEFAULT_PLAN, get_recommendations
+
+RANGES = {
+    "hb_1st": (7, 14), "hb_2nd": (7, 14), "hb_3rd": (7, 14), "ferritin": (5, 120),
+    "tsat": (5, 45), "sbp": (90, 170), "dbp": (60, 110), "proteinuria": (0, 600),
+    "ogtt_f": (70, 110), "ogtt_1h": (120, 220), "ogtt_2h": (100, 180),
+    "tsh_1": (0.5, 6), "tsh_2": (0.5, 6), "tsh_3": (0.5, 6), "ft4": (0.5, 2),
+    "gestational_age_weeks": (6, 40), "bmi": (17, 40), "pre_pregnancy_weight": (40, 90),
+    "current_weight": (42, 105),
+}
+SYMPTOMS = ["itching", "nausea", "headache", "jaundice", "abdominal pain"]
+CONDITIONS = ["preeclampsia", "hep B", "hellp history", "asthma"]
+
+
+def sparse_report(fields_per_report, rng):
+    # A full ReportData dict (absent fields are None, as after validation)
+    report = ReportData().dict()
+    for field in rng.sample(list(report), min(fields_per_report, len(report))):
+        if field == "sysmptoms":
+            report[field] = rng.sample(SYMPTOMS, rng.randint(1, 2))
+        elif field == "conditions":
+            report[field] = rng.sample(CONDITIONS, 1)
+        elif field == "tpo_ab":
+            report[field] = rng.random() < 0.2
+        else:
+            lo, hi = RANGES.get(field, (0, 100))
+            report[field] = round(rng.uniform(lo, hi), 1)
+    return report
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rule engine throughput on sparse reports")
+    parser.add_argument("--reports", type=int, default=20000)
+    parser.add_argument("--fields", type=int, nargs="+", default=[2, 4, 8, 20],
+                        help="present fields per report, one run per value")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    baseline_plan = tuple((rule_fn, 0, 0) for rule_fn, _, _ in DEFAULT_PLAN)
+    rng = random.Random(args.seed)
+    for fields in args.fields:
+        reports = [sparse_report(fields, rng) for _ in range(args.reports)]
+        for report in reports:
+            assert get_recommendations(report) == get_recommendations(report, baseline_plan), report
+
+        t_all = best_of(lambda: [get_recommendations(r, baseline_plan) for r in reports], args.repeat)
+        t_mask = best_of(lambda: [get_recommendations(r) for r in reports], args.repeat)
+        print(
+            f"{fields:>3} fields  all rules {args.reports / t_all:10,.0f} reports/s   "
+            f"presence mask {args.reports / t_mask:10,.0f} reports/s   x{t_all / t_mask:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
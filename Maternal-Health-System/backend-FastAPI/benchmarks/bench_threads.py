@@ -0,0 +1,87 @@
+# Tail latency of single-row /predict_preg scoring with and without the thread budget.
+#
+# Starts --workers processes on this host, as a multi-worker server would, each
+# scoring single rows through the full pregnancy ensemble in a closed loop for
+# --duration seconds. In the "default" run every library sizes its thread pools
+# to all cores; in the "budget" run each process applies thread_budget.py first
+# (and binds itself to its own cores with --pin-cpus). Prints throughput and
+# p50/p95/p99 latency of both runs.
+#
+# Run from the backend-FastAPI directory (the models are loaded from the cwd):
+#   python benchmarks/bench_threads.py --workers 4 --duration 10
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def worker(mode, index, workers, threads, pin_cpus, duration, start_at, queue):
+    from risk_prediction_apis import PREG_FEATURES, PREG_MODELS, predict_preg_proba
+    from thread_budget import ThreadBudget
+
+    if mode == "budget":
+        budget = ThreadBudget(workers, threads)
+        if pin_cpus:
+            budget.pin(index)
+        budget.apply(PREG_MODELS)
+    rng = np.random.default_rng(index)
+    rows = rng.uniform(0, 100, (256, len(PREG_FEATURES)))
+    predict_preg_proba(rows[:1])
+    while time.time() < start_at:
+        time.sleep(0.01)
+    latencies = []
+    end = start_at + duration
+    i = 0
+    while time.time() < end:
+        started = time.perf_counter()
+        predict_preg_proba(rows[i % len(rows)][None, :])
+        latencies.append(time.perf_counter() - started)
+        i += 1
+    queue.put(latencies)
+
+
+def run(mode, args):
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    # Workers load the models first, then start measuring together
+    start_at = time.time() + args.startup
+    procs = [
+        ctx.Process(
+            target=worker,
+            args=(mode, i, args.workers, args.threads_per_worker, args.pin_cpus, args.duration, start_at, queue),
+        )
+        for i in range(args.workers)
+    ]
+    for p in procs:
+        p.start()
+    latencies = np.concatenate([queue.get() for _ in procs]) * 1e3
+    for p in procs:
+        p.join()
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(
+        f"{mode:<8} {len(latencies) / args.duration:9.1f} rows/s   "
+        f"p50 {p50:7.2f} ms   p95 {p95:7.2f} ms   p99 {p99:7.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-row scoring latency with and without the thread budget")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--threads-per-worker", type=int, help="default: available cores // workers")
+    parser.add_argument("--pin-cpus", action="store_true")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--startup", type=float, default=15.0, help="seconds allowed for loading the models")
+    args = parser.parse_args()
+
+    print(f"{args.workers} workers on {os.cpu_count()} cores")
+    for mode in ("default", "budget"):
+        run(mode, args)
+
+
+if __name__ == "__main__":
+    main()
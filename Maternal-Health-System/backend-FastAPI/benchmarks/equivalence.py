@@ -0,0 +1,412 @@
+# Differential equivalence harness: a reference implementation against a
+# candidate on randomized and edge-case inputs, as a gate for performance work.
+#
+# Targets:
+#   rules   get_recommendations; every alert, recommendation, diet line and
+#           alert flag must match
+#   preg    pregnancy ensemble probabilities and classes
+#   fetal   fetal ensemble probabilities and classes
+#
+# Rule implementations (--reference / --candidate):
+#   all-rules        every rule runs on every report (no presence-mask skipping)
+#   engine           rules.engine.get_recommendations as it is now
+#   git:<rev>        the rules package as of a git revision, e.g. git:HEAD~3
+#   <module>:<func>  any importable function taking the report dict
+# Prediction implementations:
+#   softvote         soft_vote over the members, batched
+#   batch            predict_preg_proba / predict_fetal_proba
+#   rows             soft_vote one row at a time, as /predict_* scores (slow)
+#   voter            the deadline voter with an unlimited deadline (deadlines.py)
+#   distilled        the distilled student in MODEL_DIR (training/distill.py)
+#   <module>:<func>  any importable function taking a DataFrame, returning probabilities
+#
+# Reports get a random mix per field: absent, None, NaN, exactly on a rule
+# threshold or one ulp either side, 0, negative, or a plausible value; list
+# fields get no, empty, trigger or unrelated entries. Model inputs are
+# plausible rows with some cells at 0, negative, range bounds or 1e6, plus a
+# few rows with NaN (which must fail, or succeed, the same way in both).
+#
+# Cases are generated per chunk from (--seed, chunk index), so a run is
+# reproducible and chunks run in parallel worker processes. The exit status is
+# 1 when any case diverges; --report writes the summary and examples as JSON.
+# Single-row and batched predictions can differ in the last bits (BLAS
+# summation order), so compare those with e.g. --atol 1e-9.
+#
+# Run from the backend-FastAPI directory (the models are loaded from the cwd):
+#   python benchmarks/equivalence.py rules --cases 1000000 --workers 4
+#   python benchmarks/equivalence.py rules --reference git:HEAD~1 --candidate engine
+#   python benchmarks/equivalence.py preg --candidate voter --cases 200000
+#   python benchmarks/equivalence.py fetal --candidate rows --cases 2000 --atol 1e-9
+import argparse
+import importlib
+import io
+import json
+import math
+import multiprocessing
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from models.report import ReportData
+from rules.engine import CONFIG, DEFAULT_PLAN, alert_flags, get_recommendations
+
+# Rule thresholds per report field: CONFIG keys and literals in rules/engine.py
+FIELD_THRESHOLDS = {
+    "ferritin": [CONFIG["ferritin_severe"], CONFIG["ferritin_mild"]],
+    "tsat": [CONFIG["tsat"]],
+    "hb_1st": [CONFIG["hb_1st_3rd"], 7],
+    "hb_2nd": [CONFIG["hb_2nd"], 7],
+    "hb_3rd": [CONFIG["hb_1st_3rd"], 7],
+    "sbp": [CONFIG["htn_sbp"]],
+    "dbp": [CONFIG["htn_dbp"]],
+    "proteinuria": [CONFIG["pree_proteinuria"]],
+    "ogtt_f": [CONFIG["gdm_ogtt_f"]],
+    "ogtt_1h": [CONFIG["gdm_ogtt_1h"]],
+    "ogtt_2h": [CONFIG["gdm_ogtt_2h"]],
+    "tsh_1": [CONFIG["tsh_first_tri"]],
+    "tsh_2": [CONFIG["tsh_second_third"]],
+    "tsh_3": [CONFIG["tsh_second_third"]],
+    "ft4": [0.8],
+    "gestational_age_weeks": [13, 14, 40],
+    "bmi": [18.5, 25, 30],
+    "pre_pregnancy_weight": [60],
+    "current_weight": [60],
+    "bile_acids": [19, 40, 100],
+    "ast": [70, 300],
+    "platelets": [100000],
+    "ldh": [600],
+    "bilirubin": [5],
+    "glucose": [60],
+}
+# Plausible value ranges of the numeric report fields
+FIELD_RANGES = {
+    "hb_1st": (5, 15), "hb_2nd": (5, 15), "hb_3rd": (5, 15), "ferritin": (2, 150), "tsat": (2, 50),
+    "sbp": (80, 200), "dbp": (50, 130), "proteinuria": (0, 1000), "ogtt_f": (60, 140),
+    "ogtt_1h": (100, 260), "ogtt_2h": (80, 220), "tsh_1": (0.1, 8), "tsh_2": (0.1, 8), "tsh_3": (0.1, 8),
+    "ft4": (0.3, 2.5), "gestational_age_weeks": (4, 42), "bmi": (15, 45),
+    "pre_pregnancy_weight": (40, 110), "current_weight": (40, 130), "bile_acids": (0, 150),
+    "ast": (10, 400), "platelets": (20000, 400000), "ldh": (100, 900), "bilirubin": (0.1, 8),
+    "glucose": (30, 200),
+}
+LIST_VALUES = {
+    "sysmptoms": ["pruritus", "severe itching", "ruq", "jaundice", "nausea", "headache", "Pruritus"],
+    "symptoms": ["pruritus", "severe itching", "ruq", "jaundice", "nausea", "headache", "Pruritus"],
+    "conditions": ["preeclampsia", "hep B", "hellp history", "asthma", "Preeclampsia"],
+}
+NUMERIC_FIELDS = list(FIELD_RANGES)
+# absent, None, NaN, threshold (+-1 ulp), 0, negative, plausible
+NUMERIC_KINDS = np.array([0.15, 0.15, 0.03, 0.2, 0.03, 0.02, 0.42])
+RESULT_KEYS = ("supplement_recommendations", "alerts", "dietary_recommendations")
+
+
+def generate_reports(n: int, rng: np.random.Generator) -> List[Dict]:
+    kinds = rng.choice(len(NUMERIC_KINDS), size=(n, len(NUMERIC_FIELDS)), p=NUMERIC_KINDS)
+    uniform = rng.random((n, len(NUMERIC_FIELDS)))
+    picks = rng.integers(0, 1 << 30, size=(n, len(NUMERIC_FIELDS)))
+    list_kinds = rng.integers(0, 4, size=(n, len(LIST_VALUES)))
+    tpo = rng.integers(0, 3, size=n)
+    reports = []
+    for i in range(n):
+        report = {}
+        for j, field in enumerate(NUMERIC_FIELDS):
+            kind = kinds[i, j]
+            if kind == 0:
+                continue
+            if kind == 1:
+                value = None
+            elif kind == 2:
+                value = math.nan
+            elif kind == 3:
+                thresholds = FIELD_THRESHOLDS[field]
+                threshold = float(thresholds[picks[i, j] % len(thresholds)])
+                value = [threshold, math.nextafter(threshold, -math.inf), math.nextafter(threshold, math.inf)][
+                    picks[i, j] // len(thresholds) % 3
+                ]
+            elif kind == 4:
+                value = 0.0
+            elif kind == 5:
+                value = -float(picks[i, j] % 100 + 1)
+            else:
+                lo, hi = FIELD_RANGES[field]
+                value = round(float(lo + uniform[i, j] * (hi - lo)), 1)
+            report[field] = value
+        for j, (field, values) in enumerate(LIST_VALUES.items()):
+            kind = list_kinds[i, j]
+            if kind == 1:
+                report[field] = None
+            elif kind == 2:
+                report[field] = []
+            elif kind == 3:
+                report[field] = [values[picks[i, j] % len(values)], values[picks[i, j] // 7 % len(values)]]
+        report["tpo_ab"] = (None, True, False)[tpo[i]]
+        if i % 2:
+            # Half the reports look like validated ReportData (every field present, absent ones None)
+            report = {**ReportData().dict(), **report}
+        reports.append(report)
+    return reports
+
+
+def load_git_engine(rev: str):
+    # The rules package at a revision, imported from a temporary copy; the
+    # current rules modules are set aside meanwhile so nothing is shared
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    git = lambda *args: subprocess.run(["git", *args], cwd=backend, check=True, capture_output=True).stdout
+    top, prefix = git("rev-parse", "--show-toplevel", "--show-prefix").decode().split("\n")[:2]
+    archive = subprocess.run(
+        ["git", "archive", "--format=tar", f"{rev}:{prefix}rules"], cwd=top, check=True, capture_output=True
+    ).stdout
+    root = tempfile.mkdtemp(prefix="rules-")
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(os.path.join(root, "rules"))
+    current = {name: sys.modules.pop(name) for name in list(sys.modules) if name.split(".")[0] == "rules"}
+    sys.path.insert(0, root)
+    try:
+        return importlib.import_module("rules.engine").get_recommendations
+    finally:
+        sys.path.remove(root)
+        for name in [name for name in sys.modules if name.split(".")[0] == "rules"]:
+            del sys.modules[name]
+        sys.modules.update(current)
+
+
+def load_callable(spec: str) -> Callable:
+    module, _, name = spec.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def rules_implementation(spec: str) -> Callable:
+    if spec == "engine":
+        return get_recommendations
+    if spec == "all-rules":
+        plan = tuple((rule_fn, 0, 0) for rule_fn, _, _ in DEFAULT_PLAN)
+        return lambda report: get_recommendations(report, plan)
+    if spec.startswith("git:"):
+        return load_git_engine(spec[4:])
+    return load_callable(spec)
+
+
+def prediction_implementation(spec: str, target: str) -> Callable:
+    import risk_prediction_apis as api
+
+    models = api.PREG_MODELS if target == "preg" else api.FETAL_MODELS
+    if spec == "softvote":
+        return lambda X: api.soft_vote(models, X)
+    if spec == "batch":
+        predict = api.predict_preg_proba if target == "preg" else api.predict_fetal_proba
+        return lambda X: predict(X.to_numpy())
+    if spec == "rows":
+        return lambda X: np.vstack([api.soft_vote(models, X.iloc[[i]]) for i in range(len(X))])
+    if spec == "voter":
+        from deadlines import Deadline, DeadlineVoter
+
+        voter = DeadlineVoter(api.MEMBER_NAMES, models)
+        return lambda X: voter.vote(X, Deadline(1e12))[0]
+    if spec == "distilled":
+        student = api.preg_student if target == "preg" else api.fetal_student
+        if student is None:
+            raise ValueError(f"no distilled {target} model in MODEL_DIR")
+        return lambda X: student.predict_proba(X)
+    return load_callable(spec)
+
+
+def outcome(fn, arg):
+    try:
+        return fn(arg), None
+    except Exception as e:
+        return None, type(e).__name__
+
+
+class Divergences:
+    def __init__(self, max_examples: int):
+        self.max_examples = max_examples
+        self.counts: Dict[str, int] = {}
+        self.examples: Dict[str, List] = {}
+        # Cases where both sides raised the same exception: agreement, but
+        # not a comparison of results
+        self.both_failed = 0
+
+    def add(self, kind: str, example: Dict):
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        examples = self.examples.setdefault(kind, [])
+        if len(examples) < self.max_examples:
+            examples.append(example)
+
+    def merge(self, other: "Divergences"):
+        self.both_failed += other.both_failed
+        for kind, count in other.counts.items():
+            self.counts[kind] = self.counts.get(kind, 0) + count
+            examples = self.examples.setdefault(kind, [])
+            examples.extend(other.examples.get(kind, [])[: self.max_examples - len(examples)])
+
+
+# Job settings, set in the parent before the worker processes are forked
+_JOB: Dict = {}
+
+
+def rules_chunk(args):
+    index, n = args
+    reference, candidate = _JOB["reference"], _JOB["candidate"]
+    found = Divergences(_JOB["examples"])
+    for report in generate_reports(n, np.random.default_rng([_JOB["seed"], index])):
+        ref, ref_error = outcome(reference, report)
+        cand, cand_error = outcome(candidate, report)
+        if ref_error or cand_error:
+            if ref_error != cand_error:
+                found.add("error", {"reference": ref_error, "candidate": cand_error, "input": report})
+            else:
+                found.both_failed += 1
+            continue
+        for key in RESULT_KEYS:
+            if ref.get(key) != cand.get(key):
+                found.add(key, {"reference": ref.get(key), "candidate": cand.get(key), "input": report})
+        ref_flags, cand_flags = alert_flags(ref["alerts"]), alert_flags(cand["alerts"])
+        if ref_flags != cand_flags:
+            changed = {f: [ref_flags[f], cand_flags[f]] for f in ref_flags if ref_flags[f] != cand_flags[f]}
+            found.add("flags", {"flags (reference, candidate)": changed, "input": report})
+    return n, found
+
+
+def generate_rows(n: int, features: List[str], rng: np.random.Generator) -> np.ndarray:
+    from benchmarks.load_harness import RANGES
+
+    bounds = np.array([RANGES.get(f, (0, 100)) for f in features], dtype=float)
+    X = bounds[:, 0] + rng.random((n, len(features))) * (bounds[:, 1] - bounds[:, 0])
+    # Edge cells: 0, negative, range bounds, very large
+    edges = rng.random(X.shape) < 0.02
+    choice = rng.integers(0, 5, size=X.shape)
+    X[edges & (choice == 0)] = 0.0
+    X[edges & (choice == 1)] = -1.0
+    X = np.where(edges & (choice == 2), bounds[:, 0], X)
+    X = np.where(edges & (choice == 3), bounds[:, 1], X)
+    X[edges & (choice == 4)] = 1e6
+    return X
+
+
+def prediction_chunk(args):
+    index, n = args
+    reference, candidate, features = _JOB["reference"], _JOB["candidate"], _JOB["features"]
+    atol = _JOB["atol"]
+    found = Divergences(_JOB["examples"])
+    rng = np.random.default_rng([_JOB["seed"], index])
+    X = pd.DataFrame(generate_rows(n, features, rng), columns=features)
+
+    ref, cand = np.asarray(reference(X)), np.asarray(candidate(X))
+    ref_class, cand_class = ref.argmax(1), cand.argmax(1)
+    error = np.abs(ref - cand).max(1)
+    formatted = (np.round(ref, 4) != np.round(cand, 4)).any(1)
+    for kind, rows in (
+        ("class", np.flatnonzero(ref_class != cand_class)),
+        ("probability", np.flatnonzero(error > atol)),
+        ("formatted", np.flatnonzero(formatted)),
+    ):
+        for i in rows:
+            found.add(kind, {
+                "max_abs_error": float(error[i]),
+                "reference": ref[i].tolist(),
+                "candidate": cand[i].tolist(),
+                "input": X.iloc[i].to_dict(),
+            })
+
+    # A few rows with a NaN cell: both must fail, or both give the same class
+    for i in range(_JOB["nan_rows"]):
+        row = X.iloc[[i]].copy()
+        row.iloc[0, rng.integers(len(features))] = np.nan
+        r, r_error = outcome(reference, row)
+        c, c_error = outcome(candidate, row)
+        if r_error is not None and r_error == c_error:
+            found.both_failed += 1
+        elif r_error != c_error or np.asarray(r).argmax() != np.asarray(c).argmax():
+            found.add("nan", {
+                "reference": r_error or np.asarray(r).tolist(),
+                "candidate": c_error or np.asarray(c).tolist(),
+                "input": row.iloc[0].to_dict(),
+            })
+    return n, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a reference and a candidate implementation case by case")
+    parser.add_argument("target", choices=["rules", "preg", "fetal"])
+    parser.add_argument("--reference", help="default: all-rules for rules, softvote for predictions")
+    parser.add_argument("--candidate", help="default: engine for rules, batch for predictions")
+    parser.add_argument("--cases", type=int, default=100000)
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--atol", type=float, default=0.0, help="allowed absolute probability difference")
+    parser.add_argument("--nan-rows", type=int, default=5, help="NaN rows checked per prediction chunk")
+    parser.add_argument("--examples", type=int, default=5, help="examples kept per kind of divergence")
+    parser.add_argument("--report", help="write the summary and examples to this JSON file")
+    args = parser.parse_args()
+
+    rules = args.target == "rules"
+    reference = args.reference or ("all-rules" if rules else "softvote")
+    candidate = args.candidate or ("engine" if rules else "batch")
+    try:
+        if rules:
+            _JOB.update(reference=rules_implementation(reference), candidate=rules_implementation(candidate))
+        else:
+            from risk_prediction_apis import FETAL_FEATURES, PREG_FEATURES
+
+            _JOB.update(
+                reference=prediction_implementation(reference, args.target),
+                candidate=prediction_implementation(candidate, args.target),
+                features=PREG_FEATURES if args.target == "preg" else FETAL_FEATURES,
+            )
+    except (ImportError, AttributeError, ValueError, subprocess.CalledProcessError) as e:
+        sys.exit(f"error: {e}")
+    _JOB.update(seed=args.seed, atol=args.atol, nan_rows=args.nan_rows, examples=args.examples)
+
+    chunks = [
+        (i, min(args.chunk_size, args.cases - start))
+        for i, start in enumerate(range(0, args.cases, args.chunk_size))
+    ]
+    work = rules_chunk if rules else prediction_chunk
+    found = Divergences(args.examples)
+    done = 0
+    started = time.perf_counter()
+    if args.workers > 1:
+        with multiprocessing.get_context("fork").Pool(args.workers) as pool:
+            results = pool.imap_unordered(work, chunks)
+            for n, chunk_found in results:
+                done += n
+                found.merge(chunk_found)
+    else:
+        for chunk in chunks:
+            n, chunk_found = work(chunk)
+            done += n
+            found.merge(chunk_found)
+    elapsed = time.perf_counter() - started
+
+    summary = {
+        "target": args.target,
+        "reference": reference,
+        "candidate": candidate,
+        "cases": done,
+        "seed": args.seed,
+        "seconds": round(elapsed, 2),
+        "cases_per_second": round(done / elapsed),
+        "both_failed": found.both_failed,
+        "divergences": found.counts,
+    }
+    print(json.dumps(summary, indent=2))
+    for kind, examples in found.examples.items():
+        print(f"\nfirst {kind} divergences:")
+        for example in examples:
+            print("  " + json.dumps(example, default=str)[:600])
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({**summary, "examples": found.examples}, f, indent=2, default=str)
+    sys.exit(1 if found.counts else 0)
+
+
+if __name__ == "__main__":
+    main()
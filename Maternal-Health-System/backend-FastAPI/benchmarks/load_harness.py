@@ -0,0 +1,284 @@
+# Capacity and tail-latency load harness for /analyze, /predict_preg and /predict_fetal.
+#
+# Closed-loop clients (one per concurrency slot) send a weighted mix of requests
+# for --duration seconds at each concurrency level and record per-request
+# latency. For every level the harness prints throughput and p50/p95/p99, and it
+# reports the saturation point: the level after which more concurrency stops
+# adding throughput (< --saturation-gain) and only adds latency.
+#
+# Targets:
+#   inproc   the ASGI app in this process via httpx.ASGITransport (no network)
+#   socket   the app served by uvicorn on a local TCP port in this process
+#   http://… an already running server (e.g. python serve.py --workers 4)
+#
+# Run from the backend-FastAPI directory (inproc/socket load the models from the cwd):
+#   python benchmarks/load_harness.py --target inproc --concurrency 1 2 4 8 16 32 --save base.json
+#   python benchmarks/load_harness.py --target inproc --compare base.json
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import httpx
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+ROUTES = {
+    "analyze": ("/analyze", "ReportData"),
+    "predict_preg": ("/predict_preg", "RiskInputData"),
+    "predict_fetal": ("/predict_fetal", "FetalHealthInput"),
+}
+
+# Plausible value ranges; other numeric fields are drawn from [0, 100]
+RANGES = {
+    "age": (18, 45), "systolic": (90, 170), "diastolic": (60, 110), "bs": (4, 15),
+    "bmi": (17, 40), "heart_rate": (60, 110), "body_temp": (97, 103),
+    "previous_complications": (0, 1),
+    "hb_1st": (7, 14), "hb_2nd": (7, 14), "hb_3rd": (7, 14), "ferritin": (5, 120),
+    "tsat": (5, 45), "sbp": (90, 170), "dbp": (60, 110), "proteinuria": (0, 600),
+    "ogtt_f": (70, 110), "ogtt_1h": (120, 220), "ogtt_2h": (100, 180),
+    "tsh_1": (0.5, 6), "tsh_2": (0.5, 6), "tsh_3": (0.5, 6), "ft4": (0.5, 2),
+    "gestational_age_weeks": (6, 40), "pre_pregnancy_weight": (40, 90),
+    "current_weight": (42, 105),
+    "baseline_value": (105, 165), "accelerations": (0, 0.02), "fetal_movement": (0, 0.5),
+    "uterine_contractions": (0, 0.015), "light_decelerations": (0, 0.015),
+    "severe_decelerations": (0, 0.001), "prolongued_decelerations": (0, 0.005),
+    "histogram_tendency": (-1, 1),
+}
+SYMPTOMS = ["itching", "nausea", "headache", "jaundice", "abdominal pain"]
+
+
+def random_payload(name, properties, required, sparsity, rng):
+    # Optional fields are left out with probability `sparsity`
+    body = {}
+    for field, schema in properties.items():
+        if field not in required and rng.random() < sparsity:
+            continue
+        kinds = {schema.get("type")} | {s.get("type") for s in schema.get("anyOf", [])}
+        if "array" in kinds:
+            body[field] = rng.sample(SYMPTOMS, rng.randint(0, 2))
+        elif "boolean" in kinds:
+            body[field] = rng.random() < 0.2
+        else:
+            lo, hi = RANGES.get(field, (0, 100))
+            body[field] = round(rng.uniform(lo, hi), 2)
+    return {"data": body} if name == "ReportData" else body
+
+
+async def build_pools(client, routes, pool_size, sparsity, seed):
+    # Field lists come from the server's OpenAPI schema, so the harness needs
+    # no model imports when it targets a remote server
+    schemas = (await client.get("/openapi.json")).json()["components"]["schemas"]
+    rng = random.Random(seed)
+    pools = {}
+    for route in routes:
+        schema = schemas[ROUTES[route][1]]
+        pools[route] = [
+            random_payload(ROUTES[route][1], schema["properties"], set(schema.get("required", [])), sparsity, rng)
+            for _ in range(pool_size)
+        ]
+    return pools
+
+
+def summarize(latencies):
+    if not latencies:
+        return {"count": 0}
+    ms = np.array(latencies) * 1e3
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "count": len(ms),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+    }
+
+
+async def run_level(client, concurrency, duration, warmup, mix, pools, seed):
+    routes, weights = zip(*mix.items())
+    latencies = {route: [] for route in routes}
+    errors = {route: 0 for route in routes}
+    loop = asyncio.get_running_loop()
+    measure_from = loop.time() + warmup
+    end = measure_from + duration
+
+    async def client_loop(slot):
+        rng = random.Random(seed * 1000 + slot)
+        while loop.time() < end:
+            route = rng.choices(routes, weights)[0]
+            body = rng.choice(pools[route])
+            issued = loop.time()
+            start = time.perf_counter()
+            try:
+                ok = (await client.post(ROUTES[route][0], json=body)).status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            elapsed = time.perf_counter() - start
+            if issued < measure_from:
+                continue
+            if ok:
+                latencies[route].append(elapsed)
+            else:
+                errors[route] += 1
+
+    await asyncio.gather(*(client_loop(slot) for slot in range(concurrency)))
+    completed = [x for values in latencies.values() for x in values]
+    return {
+        "concurrency": concurrency,
+        "throughput_rps": round(len(completed) / duration, 1),
+        "errors": sum(errors.values()),
+        "latency": summarize(completed),
+        "routes": {
+            route: {**summarize(latencies[route]), "errors": errors[route]} for route in routes
+        },
+    }
+
+
+def saturation_point(levels, min_gain):
+    # Last level whose throughput still grew by at least min_gain over the one before
+    knee = levels[0]
+    for previous, level in zip(levels, levels[1:]):
+        if level["throughput_rps"] < previous["throughput_rps"] * (1 + min_gain):
+            return {
+                "concurrency": knee["concurrency"],
+                "throughput_rps": knee["throughput_rps"],
+                "p99_ms": knee["latency"].get("p99_ms"),
+            }
+        knee = level
+    return None  # still scaling at the highest level tried
+
+
+def start_local_server(app):
+    import uvicorn
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def print_levels(levels):
+    print(f"{'conc':>5} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for level in levels:
+        lat = level["latency"]
+        print(
+            f"{level['concurrency']:>5} {level['throughput_rps']:>9} {lat.get('p50_ms', '-'):>9}"
+            f" {lat.get('p95_ms', '-'):>9} {lat.get('p99_ms', '-'):>9} {level['errors']:>7}"
+        )
+
+
+def print_comparison(run, baseline):
+    print(f"\ncompared with {baseline['meta']['started']} ({baseline['meta']['target']}):")
+    print(f"{'conc':>5} {'rps':>9} {'Δrps':>8} {'p99 ms':>9} {'Δp99':>8}")
+    previous = {level["concurrency"]: level for level in baseline["levels"]}
+    for level in run["levels"]:
+        base = previous.get(level["concurrency"])
+        if base is None or not base["latency"].get("count"):
+            continue
+        p99, base_p99 = level["latency"].get("p99_ms"), base["latency"]["p99_ms"]
+        d_rps = (level["throughput_rps"] / base["throughput_rps"] - 1) * 100 if base["throughput_rps"] else 0.0
+        d_p99 = (p99 / base_p99 - 1) * 100 if p99 is not None and base_p99 else 0.0
+        print(f"{level['concurrency']:>5} {level['throughput_rps']:>9} {d_rps:>+7.1f}% {p99:>9} {d_p99:>+7.1f}%")
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        route, _, weight = part.partition("=")
+        if route not in ROUTES:
+            raise argparse.ArgumentTypeError(f"unknown route '{route}' (choose from {', '.join(ROUTES)})")
+        mix[route] = float(weight or 1)
+    return mix
+
+
+async def run(args):
+    server = None
+    if args.target in ("inproc", "socket"):
+        import main
+
+        if args.target == "inproc":
+            client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://harness")
+        else:
+            server, url = start_local_server(main.app)
+            client = httpx.AsyncClient(base_url=url, timeout=60)
+    else:
+        client = httpx.AsyncClient(base_url=args.target, timeout=60)
+
+    async with client:
+        pools = await build_pools(client, args.mix, args.payload_pool, args.sparsity, args.seed)
+        levels = []
+        for concurrency in args.concurrency:
+            level = await run_level(client, concurrency, args.duration, args.warmup, args.mix, pools, args.seed)
+            levels.append(level)
+            print(f"concurrency {concurrency}: {level['throughput_rps']} rps, p99 {level['latency'].get('p99_ms')} ms", flush=True)
+    if server is not None:
+        server.should_exit = True
+    return levels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput and tail-latency load harness")
+    parser.add_argument("--target", default="inproc", help="inproc, socket or a base URL")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds per level")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds per level")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("analyze=2,predict_preg=1,predict_fetal=1"),
+                        help="weighted routes, e.g. analyze=2,predict_preg=1,predict_fetal=1")
+    parser.add_argument("--sparsity", type=float, default=0.5, help="share of optional fields left out")
+    parser.add_argument("--payload-pool", type=int, default=1000, help="distinct payloads per route")
+    parser.add_argument("--saturation-gain", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="write the run to this JSON file")
+    parser.add_argument("--compare", help="earlier run (JSON) to compare against")
+    args = parser.parse_args()
+
+    started = datetime.now(timezone.utc).isoformat()
+    levels = asyncio.run(run(args))
+    result = {
+        "meta": {
+            "started": started,
+            "target": args.target,
+            "mix": args.mix,
+            "sparsity": args.sparsity,
+            "payload_pool": args.payload_pool,
+            "duration": args.duration,
+            "host": platform.node(),
+            "cpus": os.cpu_count(),
+        },
+        "levels": levels,
+        "saturation": saturation_point(levels, args.saturation_gain),
+    }
+
+    print()
+    print_levels(levels)
+    saturation = result["saturation"]
+    if saturation:
+        print(
+            f"saturation at concurrency {saturation['concurrency']}:"
+            f" {saturation['throughput_rps']} rps, p99 {saturation['p99_ms']} ms"
+        )
+    else:
+        print("no saturation within the concurrency levels tried")
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(result, json.load(f))
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
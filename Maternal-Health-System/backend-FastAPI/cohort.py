@@ -0,0 +1,314 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from pydantic import BaseModel, ValidationError
+
+from batch_input import BatchInputError
+from models.report import ReportData
+from risk_prediction_apis import (
+    RiskInputData,
+    FetalHealthInput,
+    PREG_FEATURES,
+    FETAL_FEATURES,
+    predict_preg_proba,
+    predict_fetal_proba,
+)
+from rules.engine import ALERT_FLAGS, alert_flags, get_recommendations
+
+# Running cohort aggregates for district dashboards.
+#
+# Every report added to a cohort updates fixed-size count/sum arrays indexed by
+# gestational-age band, so a dashboard refresh reads the current totals
+# instead of rescanning history. Aggregates of several cohorts (or workers)
+# can be combined with CohortAggregator.merge.
+#
+# By default cohorts live in process memory, so under several workers
+# (serve.py, uvicorn --workers) each worker only sees the reports it received.
+# With COHORT_STORE_PATH set to a SQLite file on local disk, the totals are
+# kept there instead and shared by every worker: a chunk is scored into a
+# fresh aggregator first, then added to the stored totals in one IMMEDIATE
+# transaction, so concurrent workers never lose each other's updates.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cohorts (
+    cohort_id TEXT PRIMARY KEY,
+    state TEXT NOT NULL
+);
+"""
+
+# Upper bounds (exclusive, in weeks) of the gestational-age bands
+GA_BAND_EDGES = [14, 28, 37]
+GA_BANDS = ["<14", "14-27", "28-36", ">=37", "unknown"]
+
+CONDITIONS = list(ALERT_FLAGS)
+N_CLASSES = 3
+
+# Aggregate arrays, in the order of CohortAggregator._arrays
+ARRAY_NAMES = (
+    "reports",
+    "analyzed",
+    "condition_counts",
+    "preg_counts",
+    "preg_proba_sum",
+    "fetal_counts",
+    "fetal_proba_sum",
+)
+
+
+class CohortReport(BaseModel):
+    # Any combination of the three inputs; gestational age defaults to the
+    # one in the clinical report
+    gestational_age_weeks: Optional[float] = None
+    report: Optional[ReportData] = None
+    risk: Optional[RiskInputData] = None
+    fetal: Optional[FetalHealthInput] = None
+
+
+def ga_band_index(weeks: np.ndarray) -> np.ndarray:
+    # weeks may contain NaN for unknown gestational age
+    bands = np.digitize(weeks, GA_BAND_EDGES)
+    bands[np.isnan(weeks)] = len(GA_BANDS) - 1
+    return bands
+
+
+def parse_cohort_reports(rows: List[Any]) -> List[CohortReport]:
+    if not isinstance(rows, list):
+        raise BatchInputError("reports must be a list")
+    reports = []
+    for i, row in enumerate(rows):
+        try:
+            reports.append(row if isinstance(row, CohortReport) else CohortReport(**row))
+        except (TypeError, ValidationError) as e:
+            raise BatchInputError(f"report {i}: {e}")
+    return reports
+
+
+def _ensemble_summary(counts: np.ndarray, proba_sum: np.ndarray) -> Dict:
+    scored = int(counts.sum())
+    mean = proba_sum / scored if scored else np.zeros_like(proba_sum)
+    return {
+        "scored": scored,
+        "class_counts": {f"Class_{i}": int(c) for i, c in enumerate(counts)},
+        "mean_probabilities": {f"Class_{i}": round(float(p), 4) for i, p in enumerate(mean)},
+    }
+
+
+class CohortAggregator:
+    def __init__(self):
+        self._lock = threading.Lock()
+        n_bands = len(GA_BANDS)
+        self.reports = np.zeros(n_bands, dtype=np.int64)
+        self.analyzed = np.zeros(n_bands, dtype=np.int64)
+        self.condition_counts = np.zeros((n_bands, len(CONDITIONS)), dtype=np.int64)
+        self.preg_counts = np.zeros((n_bands, N_CLASSES), dtype=np.int64)
+        self.preg_proba_sum = np.zeros((n_bands, N_CLASSES))
+        self.fetal_counts = np.zeros((n_bands, N_CLASSES), dtype=np.int64)
+        self.fetal_proba_sum = np.zeros((n_bands, N_CLASSES))
+
+    def add_reports(self, rows: List[Any], on_scored: Optional[Callable[[List[Dict], Dict], None]] = None) -> int:
+        # on_scored(reports, outputs) is called with the parsed reports and
+        # the per-report rule flags and class probabilities (e.g. for auditing)
+        reports = parse_cohort_reports(rows)
+        if not reports:
+            return 0
+
+        weeks = np.array(
+            [
+                r.gestational_age_weeks
+                if r.gestational_age_weeks is not None
+                else (r.report.gestational_age_weeks if r.report is not None else None)
+                for r in reports
+            ],
+            dtype=np.float64,
+        )
+        bands = ga_band_index(weeks)
+
+        # Rule flags: one boolean row per analysed report
+        analyzed_idx = [i for i, r in enumerate(reports) if r.report is not None]
+        flags = np.array(
+            [
+                list(alert_flags(get_recommendations(reports[i].report.dict())["alerts"]).values())
+                for i in analyzed_idx
+            ],
+            dtype=np.int64,
+        ).reshape(len(analyzed_idx), len(CONDITIONS))
+
+        # Ensemble probabilities, one batched pass per ensemble
+        preg_idx = [i for i, r in enumerate(reports) if r.risk is not None]
+        preg_proba = predict_preg_proba(
+            np.array(
+                [[getattr(reports[i].risk, f) for f in PREG_FEATURES] for i in preg_idx],
+                dtype=np.float64,
+            ).reshape(len(preg_idx), len(PREG_FEATURES))
+        )
+        fetal_idx = [i for i, r in enumerate(reports) if r.fetal is not None]
+        fetal_proba = predict_fetal_proba(
+            np.array(
+                [[getattr(reports[i].fetal, f) for f in FETAL_FEATURES] for i in fetal_idx],
+                dtype=np.float64,
+            ).reshape(len(fetal_idx), len(FETAL_FEATURES))
+        )
+
+        if on_scored is not None:
+            on_scored([r.dict() for r in reports], {
+                "flags": {"reports": analyzed_idx, "conditions": CONDITIONS, "values": flags},
+                "preg": {"reports": preg_idx, "probabilities": preg_proba},
+                "fetal": {"reports": fetal_idx, "probabilities": fetal_proba},
+            })
+
+        with self._lock:
+            np.add.at(self.reports, bands, 1)
+            np.add.at(self.analyzed, bands[analyzed_idx], 1)
+            np.add.at(self.condition_counts, bands[analyzed_idx], flags)
+            self._add_proba(self.preg_counts, self.preg_proba_sum, bands[preg_idx], preg_proba)
+            self._add_proba(self.fetal_counts, self.fetal_proba_sum, bands[fetal_idx], fetal_proba)
+        return len(reports)
+
+    @staticmethod
+    def _add_proba(counts, proba_sum, bands, proba):
+        if len(bands) == 0:
+            return
+        np.add.at(counts, (bands, np.argmax(proba, axis=1)), 1)
+        np.add.at(proba_sum, bands, proba)
+
+    def merge(self, other: "CohortAggregator"):
+        with other._lock:
+            arrays = tuple(a.copy() for a in other._arrays())
+        with self._lock:
+            for mine, theirs in zip(self._arrays(), arrays):
+                mine += theirs
+
+    def state(self) -> Dict[str, list]:
+        # JSON-serializable copy of the totals (see from_state)
+        with self._lock:
+            return {name: getattr(self, name).tolist() for name in ARRAY_NAMES}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, list]) -> "CohortAggregator":
+        aggregator = cls()
+        for name in ARRAY_NAMES:
+            array = getattr(aggregator, name)
+            array[...] = np.asarray(state[name], dtype=array.dtype)
+        return aggregator
+
+    def _arrays(self):
+        return (
+            self.reports,
+            self.analyzed,
+            self.condition_counts,
+            self.preg_counts,
+            self.preg_proba_sum,
+            self.fetal_counts,
+            self.fetal_proba_sum,
+        )
+
+    def summary(self) -> Dict:
+        with self._lock:
+            reports, analyzed, conditions, preg_counts, preg_sum, fetal_counts, fetal_sum = (
+                a.copy() for a in self._arrays()
+            )
+
+        bands = {}
+        for b, name in enumerate(GA_BANDS):
+            bands[name] = {
+                "reports": int(reports[b]),
+                "analyzed": int(analyzed[b]),
+                "alerts": {c: int(n) for c, n in zip(CONDITIONS, conditions[b])},
+                "pregnancy_risk": _ensemble_summary(preg_counts[b], preg_sum[b]),
+                "fetal_ctg": _ensemble_summary(fetal_counts[b], fetal_sum[b]),
+            }
+        return {
+            "reports": int(reports.sum()),
+            "analyzed": int(analyzed.sum()),
+            "alerts": {c: int(n) for c, n in zip(CONDITIONS, conditions.sum(axis=0))},
+            "pregnancy_risk": _ensemble_summary(preg_counts.sum(axis=0), preg_sum.sum(axis=0)),
+            "fetal_ctg": _ensemble_summary(fetal_counts.sum(axis=0), fetal_sum.sum(axis=0)),
+            "by_gestational_age": bands,
+        }
+
+
+class CohortRegistry:
+    def __init__(self, path: Optional[str] = None, timeout: float = 5.0):
+        # path: SQLite file shared by every worker; None keeps cohorts in memory
+        self.path = path
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._cohorts: Dict[str, CohortAggregator] = {}
+        if path:
+            conn = sqlite3.connect(path, timeout=timeout)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+            finally:
+                conn.close()
+
+    @property
+    def shared(self) -> bool:
+        return bool(self.path)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread, never reused across fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _stored(self, conn: sqlite3.Connection, cohort_id: str) -> Optional[CohortAggregator]:
+        row = conn.execute("SELECT state FROM cohorts WHERE cohort_id = ?", (cohort_id,)).fetchone()
+        return CohortAggregator.from_state(json.loads(row[0])) if row is not None else None
+
+    def add_reports(
+        self, cohort_id: str, rows: List[Any], on_scored: Optional[Callable[[List[Dict], Dict], None]] = None
+    ) -> int:
+        # Creates the cohort if needed; see CohortAggregator.add_reports
+        if not self.shared:
+            with self._lock:
+                aggregator = self._cohorts.setdefault(cohort_id, CohortAggregator())
+            return aggregator.add_reports(rows, on_scored)
+
+        delta = CohortAggregator()
+        added = delta.add_reports(rows, on_scored)
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            total = self._stored(conn, cohort_id) or CohortAggregator()
+            total.merge(delta)
+            conn.execute(
+                "INSERT OR REPLACE INTO cohorts (cohort_id, state) VALUES (?, ?)",
+                (cohort_id, json.dumps(total.state())),
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return added
+
+    def summary(self, cohort_id: str) -> Optional[Dict]:
+        if not self.shared:
+            with self._lock:
+                aggregator = self._cohorts.get(cohort_id)
+        else:
+            aggregator = self._stored(self._conn(), cohort_id)
+        return aggregator.summary() if aggregator is not None else None
+
+    def remove(self, cohort_id: str) -> bool:
+        if self.shared:
+            return self._conn().execute("DELETE FROM cohorts WHERE cohort_id = ?", (cohort_id,)).rowcount > 0
+        with self._lock:
+            return self._cohorts.pop(cohort_id, None) is not None
+
+    def ids(self) -> List[str]:
+        if self.shared:
+            return [row[0] for row in self._conn().execute("SELECT cohort_id FROM cohorts ORDER BY cohort_id")]
+        with self._lock:
+            return sorted(self._cohorts)
+
+
+COHORTS = CohortRegistry(os.environ.get("COHORT_STORE_PATH") or None)
@@ -0,0 +1,217 @@
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+# Vectorised extraction of the 21 CTG summary features used by FetalHealthInput
+# (the SisPorto/UCI CTG feature set) from raw fetal heart-rate (FHR) and
+# uterine-contraction (UC) traces.
+#
+# Operational definitions used here:
+#   - FHR samples outside 50-240 bpm are treated as signal loss.
+#   - The signal is averaged into 1 s epochs; everything below works on epochs.
+#   - Baseline: 1-bpm histogram mode of the epochs, refined as the mean of the
+#     epochs within +/-10 bpm of it over a 10 min moving window.
+#   - Acceleration: >= 15 bpm above baseline for >= 15 s.
+#   - Deceleration: >= 15 bpm below baseline for >= 15 s; prolonged if it lasts
+#     >= 120 s, severe if it reaches >= 60 bpm below baseline, light otherwise.
+#   - Short-term variability: |difference| of consecutive epochs; abnormal < 1 bpm.
+#   - Long-term variability: per-minute range of the epochs; abnormal < 5 bpm.
+#   - Contraction: smoothed UC >= 15 units above its resting tone for >= 30 s.
+# Event features are rates per second, as in the training data.
+
+FHR_MIN, FHR_MAX = 50, 240
+EVENT_BPM = 15
+EVENT_SECONDS = 15
+PROLONGED_SECONDS = 120
+SEVERE_BPM = 60
+ABNORMAL_STV = 1.0
+ABNORMAL_LTV = 5.0
+UC_RISE = 15
+UC_SECONDS = 30
+BASELINE_WINDOW_SECONDS = 600
+
+
+class TraceError(ValueError):
+    pass
+
+
+class CTGTraceInput(BaseModel):
+    # Raw monitor output; null or out-of-range FHR samples count as signal loss
+    fhr: List[Optional[float]]
+    uc: Optional[List[Optional[float]]] = None
+    sampling_rate_hz: float = 4.0
+    fetal_movements: Optional[int] = None
+
+
+def epoch_means(signal: np.ndarray, samples_per_epoch: int) -> np.ndarray:
+    # Mean of each complete epoch, ignoring NaN samples (NaN if all missing)
+    n_epochs = len(signal) // samples_per_epoch
+    blocks = signal[: n_epochs * samples_per_epoch].reshape(n_epochs, samples_per_epoch)
+    valid = ~np.isnan(blocks)
+    counts = valid.sum(axis=1)
+    sums = np.where(valid, blocks, 0.0).sum(axis=1)
+    return np.divide(sums, counts, out=np.full(n_epochs, np.nan), where=counts > 0)
+
+
+def moving_mean(values: np.ndarray, window: int) -> np.ndarray:
+    # Centred moving mean that skips NaN values
+    valid = ~np.isnan(values)
+    sums = np.concatenate([[0.0], np.cumsum(np.where(valid, values, 0.0))])
+    counts = np.concatenate([[0], np.cumsum(valid)])
+    half = window // 2
+    idx = np.arange(len(values))
+    lo = np.clip(idx - half, 0, len(values))
+    hi = np.clip(idx + half + 1, 0, len(values))
+    n = counts[hi] - counts[lo]
+    return np.divide(sums[hi] - sums[lo], n, out=np.full(len(values), np.nan), where=n > 0)
+
+
+def runs(mask: np.ndarray):
+    # (start, end) index arrays of the True runs in mask, end exclusive
+    padded = np.concatenate([[False], mask, [False]]).astype(np.int8)
+    edges = np.diff(padded)
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def _baseline(epochs: np.ndarray) -> np.ndarray:
+    valid = epochs[~np.isnan(epochs)]
+    counts = np.bincount(np.round(valid).astype(np.int64) - FHR_MIN, minlength=FHR_MAX - FHR_MIN + 1)
+    mode = FHR_MIN + int(np.argmax(counts))
+    stable = np.where(np.abs(epochs - mode) <= 10, epochs, np.nan)
+    curve = moving_mean(stable, BASELINE_WINDOW_SECONDS)
+    return np.where(np.isnan(curve), mode, curve)
+
+
+def histogram_statistics(counts: np.ndarray, lo: int) -> Dict[str, float]:
+    # counts: 1-bpm FHR histogram whose first bin is lo bpm; shared with the
+    # live sessions in ctg/live.py, which maintain the histogram incrementally
+    nonzero = np.flatnonzero(counts)
+    counts = counts[nonzero[0]:nonzero[-1] + 1]
+    lo, hi = lo + int(nonzero[0]), lo + int(nonzero[-1])
+    bpm = np.arange(lo, hi + 1, dtype=np.float64)
+    n = int(counts.sum())
+    cumulative = np.cumsum(counts)
+    median = float(
+        bpm[np.searchsorted(cumulative, (n - 1) // 2, side="right")]
+        + bpm[np.searchsorted(cumulative, n // 2, side="right")]
+    ) / 2
+    mean = float((counts * bpm).sum() / n)
+    variance = float((counts * (bpm - mean) ** 2).sum() / n)
+
+    smooth = np.convolve(counts, np.ones(5) / 5, mode="same")
+    inner = smooth[1:-1]
+    peaks = (inner > smooth[:-2]) & (inner >= smooth[2:]) & (inner >= 0.01 * n)
+    tendency = 0.0
+    if mean - median > 1:
+        tendency = 1.0
+    elif median - mean > 1:
+        tendency = -1.0
+    return {
+        "histogram_width": float(hi - lo),
+        "histogram_min": float(lo),
+        "histogram_max": float(hi),
+        "histogram_number_of_peaks": float(peaks.sum()),
+        "histogram_number_of_zeroes": float((counts == 0).sum()),
+        "histogram_mode": float(lo + int(np.argmax(counts))),
+        "histogram_mean": round(mean, 1),
+        "histogram_median": median,
+        "histogram_variance": round(variance, 1),
+        "histogram_tendency": tendency,
+    }
+
+
+def _histogram_features(epochs: np.ndarray) -> Dict[str, float]:
+    valid = np.round(epochs[~np.isnan(epochs)]).astype(np.int64)
+    return histogram_statistics(np.bincount(valid - FHR_MIN, minlength=FHR_MAX - FHR_MIN + 1), FHR_MIN)
+
+
+def _count_contractions(uc: np.ndarray, fs: int) -> int:
+    epochs = epoch_means(uc, fs)
+    if np.isnan(epochs).all():
+        return 0
+    smooth = moving_mean(epochs, 15)
+    tone = np.nanpercentile(smooth, 10)
+    starts, ends = runs(np.nan_to_num(smooth - tone, nan=0.0) >= UC_RISE)
+    return int(((ends - starts) >= UC_SECONDS).sum())
+
+
+def _percent(mask: np.ndarray) -> float:
+    return round(100.0 * float(mask.mean()), 1) if len(mask) else 0.0
+
+
+def _mean(values: np.ndarray) -> float:
+    return round(float(values.mean()), 1) if len(values) else 0.0
+
+
+def samples_per_second(sampling_rate_hz: float) -> int:
+    # Epochs are whole seconds of whole samples: fractional rates (0.5, 2.5 Hz)
+    # would mis-scale every duration, so they are rejected
+    if not math.isfinite(sampling_rate_hz) or sampling_rate_hz <= 0:
+        raise TraceError("sampling_rate_hz must be a positive number")
+    if sampling_rate_hz != int(sampling_rate_hz):
+        raise TraceError("sampling_rate_hz must be a whole number of samples per second")
+    return int(sampling_rate_hz)
+
+
+def extract_features(
+    fhr,
+    uc=None,
+    sampling_rate_hz: float = 4.0,
+    fetal_movements: Optional[int] = None,
+) -> Dict[str, float]:
+    fs = samples_per_second(sampling_rate_hz)
+    fhr = np.asarray(fhr, dtype=np.float64)
+    fhr = np.where((fhr >= FHR_MIN) & (fhr <= FHR_MAX), fhr, np.nan)
+    epochs = epoch_means(fhr, fs)
+    n_valid = int((~np.isnan(epochs)).sum())
+    if n_valid < 60:
+        raise TraceError("trace must contain at least one minute of valid FHR signal")
+    duration = float(len(epochs))  # seconds
+
+    baseline = _baseline(epochs)
+    deviation = epochs - baseline
+    filled = np.nan_to_num(deviation, nan=0.0)
+
+    starts, ends = runs(filled >= EVENT_BPM)
+    accelerations = int(((ends - starts) >= EVENT_SECONDS).sum())
+
+    starts, ends = runs(filled <= -EVENT_BPM)
+    # Between two run starts everything outside the first run is above
+    # -EVENT_BPM, so the segment minimum is the depth of that run
+    depth = -np.minimum.reduceat(filled, starts) if len(starts) else np.empty(0)
+    keep = (ends - starts) >= EVENT_SECONDS
+    durations, depth = (ends - starts)[keep], depth[keep]
+    prolonged = durations >= PROLONGED_SECONDS
+    severe = ~prolonged & (depth >= SEVERE_BPM)
+    light = ~prolonged & ~severe
+
+    stv = np.abs(np.diff(epochs))
+    stv = stv[~np.isnan(stv)]
+    minutes = len(epochs) // 60
+    per_minute = epochs[: minutes * 60].reshape(minutes, 60)
+    per_minute = per_minute[(~np.isnan(per_minute)).sum(axis=1) >= 30]
+    ltv = np.empty(0)
+    if len(per_minute):
+        ltv = np.nanmax(per_minute, axis=1) - np.nanmin(per_minute, axis=1)
+
+    contractions = 0
+    if uc is not None and len(uc):
+        contractions = _count_contractions(np.asarray(uc, dtype=np.float64), fs)
+
+    features = {
+        "baseline_value": float(np.round(np.nanmedian(baseline))),
+        "accelerations": round(accelerations / duration, 6),
+        "fetal_movement": round((fetal_movements or 0) / duration, 6),
+        "uterine_contractions": round(contractions / duration, 6),
+        "light_decelerations": round(int(light.sum()) / duration, 6),
+        "severe_decelerations": round(int(severe.sum()) / duration, 6),
+        "prolongued_decelerations": round(int(prolonged.sum()) / duration, 6),
+        "abnormal_short_term_variability": _percent(stv < ABNORMAL_STV),
+        "mean_value_of_short_term_variability": _mean(stv),
+        "percentage_of_time_with_abnormal_long_term_variability": _percent(ltv < ABNORMAL_LTV),
+        "mean_value_of_long_term_variability": _mean(ltv),
+    }
+    features.update(_histogram_features(epochs))
+    return features
@@ -0,0 +1,396 @@
+import asyncio
+import json
+import os
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
+
+from ctg.features import (
+    ABNORMAL_LTV,
+    ABNORMAL_STV,
+    EVENT_BPM,
+    EVENT_SECONDS,
+    FHR_MAX,
+    FHR_MIN,
+    PROLONGED_SECONDS,
+    SEVERE_BPM,
+    UC_RISE,
+    UC_SECONDS,
+    TraceError,
+    epoch_means,
+    histogram_statistics,
+    samples_per_second,
+)
+from risk_prediction_apis import FETAL_FEATURES, format_prediction, predict_fetal_proba
+
+# Live CTG monitoring sessions.
+#
+# A session keeps the FetalHealthInput features of the last window_seconds of
+# a continuous FHR/UC stream up to date one 1 s epoch at a time: epochs live in
+# ring buffers, and the FHR histogram, variability sums and event lists are
+# updated as epochs enter and leave the window, so the cost per epoch does not
+# depend on the window length. The definitions follow ctg/features.py, except
+# that the baseline is the window's histogram mode refined by the mean of the
+# bins within +/-10 bpm of it (refreshed every minute), and an event still in
+# progress counts as soon as it is long enough.
+#
+# Predictions from all sessions go through one BatchScorer, so hundreds of
+# sessions cost a handful of batched ensemble calls per second.
+#
+# CTG_WINDOW_SECONDS (default 600) and CTG_PREDICT_EVERY_SECONDS (default 10)
+# set the defaults for new sessions. A session holds several buffers of one
+# slot per second of window, so clients may ask for at most
+# CTG_MAX_WINDOW_SECONDS (default 3600), and predictions at most once per window.
+
+CTG_WINDOW_SECONDS = int(os.environ.get("CTG_WINDOW_SECONDS", "600"))
+CTG_PREDICT_EVERY_SECONDS = int(os.environ.get("CTG_PREDICT_EVERY_SECONDS", "10"))
+CTG_MAX_WINDOW_SECONDS = int(os.environ.get("CTG_MAX_WINDOW_SECONDS", "3600"))
+UC_MAX = 255
+UC_SMOOTH_SECONDS = 15
+MIN_VALID_SECONDS = 60
+
+
+class CTGChunk(BaseModel):
+    fhr: List[Optional[float]]
+    uc: Optional[List[Optional[float]]] = None
+    fetal_movements: int = 0
+
+
+class _Runs:
+    # Incremental version of features.runs: tracks the run in progress and the
+    # end times of finished runs that lasted at least min_length epochs
+    def __init__(self, min_length: int):
+        self.min_length = min_length
+        self.start = None
+        self.depth = 0.0
+        self.finished = deque()  # (end_epoch, length, depth)
+
+    def update(self, t: int, active: bool, depth: float = 0.0):
+        if active:
+            if self.start is None:
+                self.start, self.depth = t, 0.0
+            self.depth = max(self.depth, depth)
+        elif self.start is not None:
+            if t - self.start >= self.min_length:
+                self.finished.append((t, t - self.start, self.depth))
+            self.start = None
+
+    def evict(self, window_start: int):
+        while self.finished and self.finished[0][0] <= window_start:
+            self.finished.popleft()
+
+    def events(self, t: int) -> List:
+        events = list(self.finished)
+        if self.start is not None and t - self.start >= self.min_length:
+            events.append((t, t - self.start, self.depth))
+        return events
+
+
+class LiveCTGFeatures:
+    def __init__(self, sampling_rate_hz: float = 4.0, window_seconds: int = CTG_WINDOW_SECONDS):
+        self.fs = samples_per_second(sampling_rate_hz)
+        if not 60 <= window_seconds <= CTG_MAX_WINDOW_SECONDS:
+            raise TraceError(f"window_seconds must be between 60 and {CTG_MAX_WINDOW_SECONDS}")
+        # Whole minutes, so per-minute variability slots line up with the ring
+        self.window = int(window_seconds) // 60 * 60
+        self.t = 0  # epochs seen
+        self._pending_fhr = np.empty(0)
+        self._pending_uc = np.empty(0)
+
+        self.fhr = np.full(self.window, np.nan)
+        self.hist = np.zeros(FHR_MAX - FHR_MIN + 1, dtype=np.int64)
+        self.stv = np.full(self.window, np.nan)
+        self.stv_n = self.stv_abnormal = 0
+        self.stv_sum = 0.0
+        self.ltv = np.full(self.window // 60, np.nan)
+        self.ltv_n = self.ltv_abnormal = 0
+        self.ltv_sum = 0.0
+        self._minute = [np.inf, -np.inf, 0]  # min, max, valid epochs
+        self.baseline = None
+
+        self.uc_hist = np.zeros(UC_MAX + 1, dtype=np.int64)
+        self.uc_smooth = np.full(self.window, np.nan)
+        # UC histogram bin each epoch was counted in (-1: none), so eviction
+        # decrements the same clipped bin as insertion
+        self.uc_bin = np.full(self.window, -1, dtype=np.int64)
+        self._uc_recent = deque(maxlen=UC_SMOOTH_SECONDS)
+        self.tone = None
+
+        self.accelerations = _Runs(EVENT_SECONDS)
+        self.decelerations = _Runs(EVENT_SECONDS)
+        self.contractions = _Runs(UC_SECONDS)
+        self.movements = deque()  # (epoch, count)
+
+    @property
+    def seconds(self) -> int:
+        return min(self.t, self.window)
+
+    def push(self, fhr, uc=None, fetal_movements: int = 0):
+        fhr = np.asarray(fhr, dtype=np.float64).ravel()
+        fhr = np.where((fhr >= FHR_MIN) & (fhr <= FHR_MAX), fhr, np.nan)
+        uc = np.full(len(fhr), np.nan) if uc is None else np.asarray(uc, dtype=np.float64).ravel()
+        if len(uc) != len(fhr):
+            raise TraceError("uc must have one sample per fhr sample")
+        if fetal_movements:
+            self.movements.append((self.t, int(fetal_movements)))
+
+        # Whole epochs are averaged in one vectorised pass; the remainder waits
+        # for the next chunk
+        fhr = np.concatenate([self._pending_fhr, fhr])
+        uc = np.concatenate([self._pending_uc, uc])
+        n_epochs = len(fhr) // self.fs
+        self._pending_fhr = fhr[n_epochs * self.fs:]
+        self._pending_uc = uc[n_epochs * self.fs:]
+        for v, u in zip(epoch_means(fhr, self.fs), epoch_means(uc, self.fs)):
+            self._add_epoch(float(v), float(u))
+
+    def _add_epoch(self, v: float, u: float):
+        t, slot = self.t, self.t % self.window
+        valid = v == v
+
+        # Evict the epoch leaving the window
+        old = self.fhr[slot]
+        if old == old:
+            self.hist[int(round(old)) - FHR_MIN] -= 1
+        old = self.stv[slot]
+        if old == old:
+            self.stv_n -= 1
+            self.stv_sum -= old
+            self.stv_abnormal -= old < ABNORMAL_STV
+        old = self.uc_bin[slot]
+        if old >= 0:
+            self.uc_hist[old] -= 1
+
+        # Short-term variability against the previous epoch
+        prev = self.fhr[(t - 1) % self.window] if t else np.nan
+        diff = abs(v - prev) if valid and prev == prev else np.nan
+        self.stv[slot] = diff
+        if diff == diff:
+            self.stv_n += 1
+            self.stv_sum += diff
+            self.stv_abnormal += diff < ABNORMAL_STV
+
+        self.fhr[slot] = v
+        if valid:
+            self.hist[int(round(v)) - FHR_MIN] += 1
+            minute = self._minute
+            minute[0], minute[1], minute[2] = min(minute[0], v), max(minute[1], v), minute[2] + 1
+        if t % 60 == 59:
+            self._close_minute(t // 60)
+
+        # Uterine tone: trailing 15 s mean, clipped into the UC histogram
+        if u == u:
+            self._uc_recent.append(u)
+        smooth = float(np.mean(self._uc_recent)) if self._uc_recent and u == u else np.nan
+        self.uc_smooth[slot] = smooth
+        if smooth == smooth:
+            bin_ = int(min(max(smooth, 0), UC_MAX))
+            self.uc_hist[bin_] += 1
+            self.uc_bin[slot] = bin_
+        else:
+            self.uc_bin[slot] = -1
+
+        if self.baseline is None or t % 60 == 0:
+            self._refresh_baseline()
+        deviation = v - self.baseline if valid and self.baseline is not None else 0.0
+        self.accelerations.update(t, deviation >= EVENT_BPM)
+        self.decelerations.update(t, deviation <= -EVENT_BPM, -deviation)
+        rise = smooth - self.tone if smooth == smooth and self.tone is not None else 0.0
+        self.contractions.update(t, rise >= UC_RISE)
+
+        self.t = t + 1
+        window_start = self.t - self.window
+        for runs in (self.accelerations, self.decelerations, self.contractions):
+            runs.evict(window_start)
+        while self.movements and self.movements[0][0] < window_start:
+            self.movements.popleft()
+
+    def _close_minute(self, index: int):
+        slot = index % len(self.ltv)
+        old = self.ltv[slot]
+        if old == old:
+            self.ltv_n -= 1
+            self.ltv_sum -= old
+            self.ltv_abnormal -= old < ABNORMAL_LTV
+        lo, hi, n = self._minute
+        value = hi - lo if n >= 30 else np.nan
+        self.ltv[slot] = value
+        if value == value:
+            self.ltv_n += 1
+            self.ltv_sum += value
+            self.ltv_abnormal += value < ABNORMAL_LTV
+        self._minute = [np.inf, -np.inf, 0]
+
+    def _refresh_baseline(self):
+        n = self.hist.sum()
+        if n:
+            mode = int(np.argmax(self.hist))
+            lo, hi = max(mode - 10, 0), mode + 11
+            near = self.hist[lo:hi]
+            self.baseline = FHR_MIN + float((near * np.arange(lo, lo + len(near))).sum() / near.sum())
+        n = self.uc_hist.sum()
+        if n:
+            self.tone = float(np.searchsorted(np.cumsum(self.uc_hist), 0.1 * n))
+
+    def features(self) -> Optional[Dict[str, float]]:
+        # None until the window holds a minute of valid FHR signal
+        if self.hist.sum() < MIN_VALID_SECONDS:
+            return None
+        self._refresh_baseline()
+        duration = float(self.seconds)
+        decelerations = self.decelerations.events(self.t)
+        prolonged = sum(1 for _, length, _ in decelerations if length >= PROLONGED_SECONDS)
+        severe = sum(
+            1 for _, length, depth in decelerations
+            if length < PROLONGED_SECONDS and depth >= SEVERE_BPM
+        )
+        light = len(decelerations) - prolonged - severe
+        movements = sum(n for _, n in self.movements)
+
+        features = {
+            "baseline_value": float(round(self.baseline)),
+            "accelerations": round(len(self.accelerations.events(self.t)) / duration, 6),
+            "fetal_movement": round(movements / duration, 6),
+            "uterine_contractions": round(len(self.contractions.events(self.t)) / duration, 6),
+            "light_decelerations": round(light / duration, 6),
+            "severe_decelerations": round(severe / duration, 6),
+            "prolongued_decelerations": round(prolonged / duration, 6),
+            "abnormal_short_term_variability": _ratio(self.stv_abnormal, self.stv_n, 100.0),
+            "mean_value_of_short_term_variability": _ratio(self.stv_sum, self.stv_n),
+            "percentage_of_time_with_abnormal_long_term_variability": _ratio(self.ltv_abnormal, self.ltv_n, 100.0),
+            "mean_value_of_long_term_variability": _ratio(self.ltv_sum, self.ltv_n),
+        }
+        features.update(histogram_statistics(self.hist, FHR_MIN))
+        return features
+
+
+def _ratio(total: float, n: int, scale: float = 1.0) -> float:
+    return round(scale * total / n, 1) if n else 0.0
+
+
+class BatchScorer:
+    # Collects the rows requested within max_delay seconds and scores them in
+    # one ensemble call on the thread pool
+    def __init__(self, predict_proba, max_delay: float = 0.005):
+        self.predict_proba = predict_proba
+        self.max_delay = max_delay
+        self._pending = []
+        self._flush_task = None
+
+    async def score(self, values: List[float]) -> np.ndarray:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((values, future))
+        if self._flush_task is None:
+            self._flush_task = asyncio.ensure_future(self._flush())
+        return await future
+
+    async def _flush(self):
+        await asyncio.sleep(self.max_delay)
+        pending, self._pending = self._pending, []
+        self._flush_task = None
+        try:
+            X = np.array([values for values, _ in pending], dtype=np.float64)
+            proba = await run_in_threadpool(self.predict_proba, X)
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), p in zip(pending, proba):
+            if not future.done():
+                future.set_result(p)
+
+
+SCORER = BatchScorer(predict_fetal_proba)
+
+
+class LiveCTGSession:
+    def __init__(
+        self,
+        session_id: str,
+        sampling_rate_hz: float = 4.0,
+        window_seconds: int = CTG_WINDOW_SECONDS,
+        predict_every_seconds: int = CTG_PREDICT_EVERY_SECONDS,
+        on_prediction: Optional[Callable[[int, Dict, Dict], None]] = None,
+    ):
+        self.session_id = session_id
+        self.state = LiveCTGFeatures(sampling_rate_hz, window_seconds)
+        if not 1 <= predict_every_seconds <= self.state.window:
+            raise TraceError(f"predict_every_seconds must be between 1 and the window ({self.state.window})")
+        self.predict_every = predict_every_seconds
+        # Called with (seconds, features, prediction) after every prediction
+        self.on_prediction = on_prediction
+        self._next_prediction = predict_every_seconds
+        self.prediction = None
+        self.features = None
+
+    async def feed(self, message: str) -> List[Dict]:
+        # One JSON chunk {"fhr": [...], "uc": [...], "fetal_movements": n};
+        # returns the messages to push back (class changes only)
+        try:
+            chunk = CTGChunk(**json.loads(message))
+        except (ValueError, TypeError, ValidationError) as e:
+            raise TraceError(f"invalid chunk: {e}")
+        self.state.push(chunk.fhr, chunk.uc, chunk.fetal_movements)
+        if self.state.t < self._next_prediction:
+            return []
+        self._next_prediction = self.state.t + self.predict_every
+
+        features = self.state.features()
+        if features is None:
+            return []
+        proba = await SCORER.score([features[f] for f in FETAL_FEATURES])
+        prediction = format_prediction(proba)
+        if self.on_prediction is not None:
+            self.on_prediction(self.state.t, features, prediction)
+        previous = self.prediction["EnsemblePrediction"] if self.prediction else None
+        self.prediction, self.features = prediction, features
+        if prediction["EnsemblePrediction"] == previous:
+            return []
+        return [
+            {
+                "type": "class_change",
+                "session_id": self.session_id,
+                "seconds": self.state.t,
+                "previous": previous,
+                **prediction,
+                "Features": features,
+            }
+        ]
+
+    def summary(self) -> Dict:
+        return {
+            "session_id": self.session_id,
+            "seconds": self.state.t,
+            "window_seconds": self.state.window,
+            "prediction": self.prediction,
+        }
+
+
+class LiveSessionRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, LiveCTGSession] = {}
+
+    def open(self, session_id: str, **options) -> LiveCTGSession:
+        with self._lock:
+            if session_id in self._sessions:
+                raise TraceError(f"session '{session_id}' is already connected")
+            session = self._sessions[session_id] = LiveCTGSession(session_id, **options)
+            return session
+
+    def close(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def summaries(self) -> List[Dict]:
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return [s.summary() for s in sessions]
+
+
+LIVE_SESSIONS = LiveSessionRegistry()
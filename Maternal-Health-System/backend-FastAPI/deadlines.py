@@ -0,0 +1,130 @@
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Request deadlines and graceful degradation of the soft vote.
+#
+# A caller states how long it will wait in the X-Request-Deadline-Ms header
+# (milliseconds from when the request reaches the route). Without the header
+# the route default applies: REQUEST_DEADLINE_MS_<ROUTE> (e.g.
+# REQUEST_DEADLINE_MS_PREDICT_PREG), else REQUEST_DEADLINE_MS, else none.
+#
+# A request whose deadline has passed by the time its work would start (e.g.
+# after queueing for a worker thread) is answered 504 without computing
+# anything. If the recent latency of the full ensemble fits in the remaining
+# time, the request gets the full vote (shared with identical requests in
+# flight, see singleflight.py). Otherwise the members run in order, the random
+# forest first; a later member is skipped when its recent latency no longer
+# fits in the remaining time. A vote over fewer than all members is returned
+# with "Degraded": true and the members used, and is never cached.
+#
+# A skipped member is not timed, so one slow call could keep it skipped for
+# good. After DEADLINE_PROBE_EVERY (default 50) skips in a row it runs once
+# anyway, and that timing replaces its estimate.
+
+DEADLINE_HEADER = "x-request-deadline-ms"
+
+# Weight of the newest observation in the per-member latency estimate
+LATENCY_ALPHA = 0.2
+DEADLINE_PROBE_EVERY = int(os.environ.get("DEADLINE_PROBE_EVERY", "50"))
+
+
+class Deadline:
+    __slots__ = ("budget_ms", "expires_at")
+
+    def __init__(self, budget_ms: float):
+        self.budget_ms = budget_ms
+        self.expires_at = time.monotonic() + budget_ms / 1000
+
+    def remaining(self) -> float:
+        # Seconds left, negative once expired
+        return self.expires_at - time.monotonic()
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+def route_default_ms(route: str) -> Optional[float]:
+    value = os.environ.get(f"REQUEST_DEADLINE_MS_{route.upper()}") or os.environ.get("REQUEST_DEADLINE_MS")
+    return float(value) if value else None
+
+
+def parse_deadline(header: Optional[str], route: str) -> Optional[Deadline]:
+    # Raises ValueError for a header that is not a positive number
+    if header is None:
+        budget = route_default_ms(route)
+        return Deadline(budget) if budget else None
+    budget = float(header)
+    if not budget > 0:
+        raise ValueError(f"{DEADLINE_HEADER} must be a positive number of milliseconds")
+    return Deadline(budget)
+
+
+def _smoothed(previous: float, seconds: float) -> float:
+    return seconds if previous == 0 else previous + LATENCY_ALPHA * (seconds - previous)
+
+
+class DeadlineVoter:
+    def __init__(self, names: Sequence[str], models: Sequence, probe_every: int = DEADLINE_PROBE_EVERY):
+        # The first member is the fallback and always runs
+        self.names = list(names)
+        self.models = list(models)
+        self.probe_every = max(int(probe_every), 1)
+        self._lock = threading.Lock()
+        self._latency = [0.0] * len(self.models)
+        self._skips = [0] * len(self.models)
+        self._full = 0.0  # latency of a full ensemble vote
+
+    def _observe(self, i: int, seconds: float, probe: bool = False):
+        with self._lock:
+            self._latency[i] = seconds if probe else _smoothed(self._latency[i], seconds)
+            self._skips[i] = 0
+
+    def _should_skip(self, i: int, deadline: Deadline) -> Tuple[bool, bool]:
+        # (skip, probe): a member over budget is skipped, except every
+        # probe_every-th time in a row while time remains
+        if deadline.remaining() >= self._latency[i]:
+            return False, False
+        with self._lock:
+            self._skips[i] += 1
+            if self._skips[i] < self.probe_every or deadline.expired():
+                return True, False
+        return False, True
+
+    def vote(self, X, deadline: Deadline) -> Tuple[np.ndarray, List[str]]:
+        # (averaged probabilities, members used); summed in member order, so
+        # a full vote equals risk_prediction_apis.soft_vote
+        probas, used, total = [], [], 0.0
+        for i, model in enumerate(self.models):
+            probe = False
+            if probas:
+                skip, probe = self._should_skip(i, deadline)
+                if skip:
+                    continue
+            started = time.perf_counter()
+            probas.append(model.predict_proba(X))
+            elapsed = time.perf_counter() - started
+            self._observe(i, elapsed, probe)
+            total += elapsed
+            used.append(self.names[i])
+        if len(used) == len(self.models):
+            with self._lock:
+                self._full = total
+        return sum(probas) / len(probas), used
+
+    def observe_full(self, seconds: float):
+        # Timing of a full vote run outside the voter (e.g. the shared flight)
+        with self._lock:
+            self._full = _smoothed(self._full, seconds)
+
+    def full_vote_fits(self, deadline: Deadline) -> bool:
+        return deadline.remaining() >= self._full
+
+    def latency_ms(self) -> Dict[str, float]:
+        with self._lock:
+            latency = {name: round(s * 1000, 3) for name, s in zip(self.names, self._latency)}
+            latency["full_vote"] = round(self._full * 1000, 3)
+            return latency
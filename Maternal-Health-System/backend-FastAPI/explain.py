@@ -0,0 +1,238 @@
+from functools import lru_cache
+from typing import Dict, List
+
+import numpy as np
+
+from risk_prediction_apis import (
+    PREG_FEATURES,
+    FETAL_FEATURES,
+    model_rf,
+    model_xgb,
+    model_mlp,
+    fetal_rf,
+    fetal_xgb,
+    fetal_mlp,
+)
+
+# Per-feature explanations for the soft-voting ensembles.
+#
+# RandomForest: path-dependent TreeSHAP over path tables precomputed here at
+# model load. For every leaf we store the distinct features split on along its
+# root-to-leaf path, the fraction of training cover that follows the path for
+# each feature (zero fraction) and the interval of values that follows it. At
+# request time the "one fractions" are a vectorised interval test and the
+# Shapley weights come from the EXTEND/UNWIND recurrences of Lundberg et al.,
+# run for all leaves with the same number of path features at once.
+# Contributions are in probability units and sum to prediction - expected value.
+#
+# XGBoost: the booster's native TreeSHAP (pred_contribs), in margin units.
+#
+# MLP: gradient x input of the class probability, taken in the space the MLP
+# sees (after the pipeline's scaler, relative to its zero point).
+
+
+def _leaf_paths(tree):
+    # Yields (leaf_id, {feature: [zero_fraction, lower, upper]}) for every leaf.
+    # A sample follows the path for feature f iff lower < x_f <= upper.
+    left, right = tree.children_left, tree.children_right
+    feature, threshold = tree.feature, tree.threshold
+    cover = tree.weighted_n_node_samples
+    stack = [(0, {})]
+    while stack:
+        node, path = stack.pop()
+        if left[node] == -1:
+            yield node, path
+            continue
+        f, t = int(feature[node]), threshold[node]
+        for child, goes_left in ((left[node], True), (right[node], False)):
+            z, lo, hi = path.get(f, (1.0, -np.inf, np.inf))
+            if goes_left:
+                hi = min(hi, t)
+            else:
+                lo = max(lo, t)
+            child_path = dict(path)
+            child_path[f] = (z * cover[child] / cover[node], lo, hi)
+            stack.append((child, child_path))
+
+
+class ForestPathTables:
+    def __init__(self, forest, n_features: int):
+        self.n_features = n_features
+        n_trees = len(forest.estimators_)
+        groups: Dict[int, List] = {}
+        expected = 0.0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            values = tree.value[:, 0, :]
+            values = values / values.sum(axis=1, keepdims=True)
+            expected = expected + values[0] / n_trees
+            for leaf, path in _leaf_paths(tree):
+                if not path:
+                    continue
+                rows = groups.setdefault(len(path), [])
+                rows.append((sorted(path.items()), values[leaf] / n_trees))
+
+        self.expected_value = expected
+        self.groups = []
+        for k, rows in sorted(groups.items()):
+            feat = np.array([[f for f, _ in path] for path, _ in rows], dtype=np.intp)
+            stats = np.array([[s for _, s in path] for path, _ in rows], dtype=np.float64)
+            self.groups.append(
+                (
+                    feat,
+                    stats[..., 0],  # zero fractions
+                    stats[..., 1],  # lower bounds
+                    stats[..., 2],  # upper bounds
+                    np.array([v for _, v in rows]),
+                )
+            )
+
+    def shap_values(self, x: np.ndarray) -> np.ndarray:
+        # x: (n_features,) -> (n_features, n_classes)
+        # sklearn trees compare float32 inputs against their thresholds
+        x32 = x.astype(np.float32).astype(np.float64)
+        phi = np.zeros((self.n_features, len(self.expected_value)))
+        for feat, z, lo, hi, value in self.groups:
+            contrib = _path_contributions(feat, z, lo, hi, x32)
+            flat_feat = feat.ravel()
+            for c in range(phi.shape[1]):
+                phi[:, c] += np.bincount(
+                    flat_feat,
+                    weights=(contrib * value[:, c:c + 1]).ravel(),
+                    minlength=self.n_features,
+                )
+        return phi
+
+
+def _path_contributions(feat, z, lo, hi, x):
+    # Shapley weight x (one_fraction - zero_fraction) for every (leaf, path
+    # feature) of a group of leaves that all have k distinct path features.
+    n_leaves, k = feat.shape
+    xv = x[feat]
+    o = ((xv > lo) & (xv <= hi)).astype(np.float64)
+
+    # EXTEND the permutation weights with one path feature at a time
+    w = np.zeros((n_leaves, k + 1))
+    w[:, 0] = 1.0
+    for length in range(1, k + 1):
+        i = np.arange(length)
+        pz = z[:, length - 1:length]
+        po = o[:, length - 1:length]
+        extended = np.zeros((n_leaves, length + 1))
+        extended[:, :length] = pz * w[:, :length] * ((length - i) / (length + 1))
+        extended[:, 1:] += po * w[:, :length] * ((i + 1) / (length + 1))
+        w[:, :length + 1] = extended
+
+    # Sum of the weights after UNWINDing each feature, for every feature at once
+    total_one = np.zeros((n_leaves, k))
+    next_one = np.repeat(w[:, k:k + 1], k, axis=1)
+    for i in range(k - 1, -1, -1):
+        tmp = next_one * ((k + 1) / (i + 1))
+        total_one += tmp
+        next_one = w[:, i:i + 1] - tmp * z * ((k - i) / (k + 1))
+    coef = (k + 1) / (k - np.arange(k))
+    total_zero = (w[:, :k] @ coef)[:, None] / z
+
+    unwound = np.where(o > 0, total_one, total_zero)
+    return unwound * (o - z)
+
+
+def _mlp_gradient_x_input(model, x: np.ndarray, target: int) -> np.ndarray:
+    # Supports a bare MLPClassifier or a Pipeline ending in one
+    mlp = model
+    a = x.reshape(1, -1)
+    if hasattr(model, "steps"):
+        a = model[:-1].transform(a)
+        mlp = model.steps[-1][1]
+    inputs = a[0]
+
+    activations, pre_activations = [a], []
+    for layer, (W, b) in enumerate(zip(mlp.coefs_, mlp.intercepts_)):
+        h = activations[-1] @ W + b
+        pre_activations.append(h)
+        if layer < len(mlp.coefs_) - 1:
+            activations.append(_ACTIVATIONS[mlp.activation][0](h))
+    logits = pre_activations[-1][0]
+    p = np.exp(logits - logits.max())
+    p /= p.sum()
+
+    # d p_target / d logits for a softmax output
+    grad = -p[target] * p
+    grad[target] += p[target]
+    grad = grad[None, :]
+    for layer in range(len(mlp.coefs_) - 1, -1, -1):
+        grad = grad @ mlp.coefs_[layer].T
+        if layer > 0:
+            grad = grad * _ACTIVATIONS[mlp.activation][1](pre_activations[layer - 1])
+    return grad[0] * inputs
+
+
+_ACTIVATIONS = {
+    "relu": (lambda h: np.maximum(h, 0), lambda h: (h > 0).astype(np.float64)),
+    "tanh": (np.tanh, lambda h: 1 - np.tanh(h) ** 2),
+    "logistic": (
+        lambda h: 1 / (1 + np.exp(-h)),
+        lambda h: (1 / (1 + np.exp(-h))) * (1 - 1 / (1 + np.exp(-h))),
+    ),
+    "identity": (lambda h: h, lambda h: np.ones_like(h)),
+}
+
+
+def _xgb_contributions(model, x: np.ndarray, target: int):
+    import xgboost
+
+    booster = model.get_booster()
+    dmatrix = xgboost.DMatrix(x.reshape(1, -1), feature_names=booster.feature_names)
+    contribs = booster.predict(dmatrix, pred_contribs=True)[0]
+    if contribs.ndim == 2:  # multi-class: (n_classes, n_features + 1)
+        contribs = contribs[target]
+    return contribs[:-1], float(contribs[-1])
+
+
+def _named(features: List[str], values) -> Dict[str, float]:
+    return {f: round(float(v), 6) for f, v in zip(features, values)}
+
+
+class EnsembleExplainer:
+    def __init__(self, features: List[str], rf, xgb, mlp):
+        self.features = features
+        self.rf, self.xgb, self.mlp = rf, xgb, mlp
+        self.rf_tables = ForestPathTables(rf, len(features))
+        self._explain_cached = lru_cache(maxsize=4096)(self._explain)
+
+    def explain(self, values, target: int) -> Dict:
+        return self._explain_cached(tuple(float(v) for v in values), int(target))
+
+    def _explain(self, values, target: int) -> Dict:
+        x = np.array(values, dtype=np.float64)
+        rf_phi = self.rf_tables.shap_values(x)[:, target]
+        xgb_phi, xgb_bias = _xgb_contributions(self.xgb, x, target)
+        mlp_phi = _mlp_gradient_x_input(self.mlp, x, target)
+        return {
+            "Class": target,
+            "RandomForest": {
+                "method": "tree_shap",
+                "units": "probability",
+                "expected_value": round(float(self.rf_tables.expected_value[target]), 6),
+                "contributions": _named(self.features, rf_phi),
+            },
+            "XGBoost": {
+                "method": "tree_shap",
+                "units": "margin",
+                "expected_value": round(xgb_bias, 6),
+                "contributions": _named(self.features, xgb_phi),
+            },
+            "MLPClassifier": {
+                "method": "gradient_x_input",
+                "units": "probability",
+                "contributions": _named(self.features, mlp_phi),
+            },
+        }
+
+    def cache_info(self):
+        return self._explain_cached.cache_info()
+
+
+# Path tables are built once, when the models are loaded
+PREG_EXPLAINER = EnsembleExplainer(PREG_FEATURES, model_rf, model_xgb, model_mlp)
+FETAL_EXPLAINER = EnsembleExplainer(FETAL_FEATURES, fetal_rf, fetal_xgb, fetal_mlp)
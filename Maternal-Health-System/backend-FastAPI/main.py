@@ -1,46 +1,640 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import time
+from typing import Any, List, Optional
+
+from fastapi import FastAPI, HTTPException, Depends, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from starlette.requests import HTTPConnection
 from models.report import ReportInput
-from rules.engine import get_recommendations
+from rules.engine import get_recommendations, alert_flags
+from rules.profiling import PROFILER
+from rules.profiles import PROFILES, ProfileError, RuleProfile
 from fastapi import APIRouter
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), 'ML'))
-from risk_prediction_apis import RiskInputData, FetalHealthInput, predict_preg, predict_fetal
+from risk_prediction_apis import (
+    RiskInputData,
+    FetalHealthInput,
+    PREG_FEATURES,
+    FETAL_FEATURES,
+    PREG_MODEL_FILES,
+    FETAL_MODEL_FILES,
+    PREG_MODELS,
+    FETAL_MODELS,
+    MEMBER_NAMES,
+    input_frame,
+    predict_preg,
+    predict_fetal,
+    predict_preg_proba,
+    predict_fetal_proba,
+    format_prediction,
+    model_paths,
+    predict_distilled,
+    preg_student,
+    fetal_student,
+    PREG_STUDENT_FILE,
+    FETAL_STUDENT_FILE,
+)
+from batch_input import BatchInputError, parse_batch, parse_report_batch
+from wire_formats import (
+    decode_body,
+    is_ndjson,
+    iter_ndjson_batches,
+    request_payload,
+    response_format,
+    encode_predictions,
+    encode_records,
+)
+from singleflight import FlightTimeout, SingleFlight, payload_key
+from result_cache import RESULT_CACHE, config_digest, file_digest
+from audit import AUDIT_LOG
+from rules import engine as rule_engine
+from cohort import COHORTS
+from ranking import DEFAULT_SEVERE_FLAGS, RANK_CHUNK_SIZE, RiskRanker
+from assess import AssessInput, risk_input, soft_vote_concurrently
+from explain import PREG_EXPLAINER, FETAL_EXPLAINER
+from sensitivity import SensitivityInput, sensitivity
+from monitoring.drift import DriftMonitor, load_reference
+from monitoring.memory import memory_usage
+from thread_budget import THREAD_BUDGET
+from deadlines import DEADLINE_HEADER, Deadline, DeadlineVoter, parse_deadline
+from ctg.features import CTGTraceInput, TraceError, extract_features
+from ctg.live import CTG_MAX_WINDOW_SECONDS, CTG_PREDICT_EVERY_SECONDS, CTG_WINDOW_SECONDS, LIVE_SESSIONS
 
 app = FastAPI()
 
+# Size the models' native thread pools for this worker (see thread_budget.py)
+THREAD_BUDGET.apply(PREG_MODELS + FETAL_MODELS + (preg_student, fetal_student))
+
+# Identical concurrent requests share one computation (see singleflight.py)
+FLIGHTS = {
+    "analyze": SingleFlight(),
+    "predict_preg": SingleFlight(),
+    "predict_fetal": SingleFlight(),
+}
+
+# Scoring backends of /predict_preg and /predict_fetal: the full ensemble, or
+# the single distilled student (training/distill.py) where MODEL_DIR has one
+PREDICT_BACKEND = os.environ.get("PREDICT_BACKEND", "ensemble")
+STUDENTS = {
+    "predict_preg": (preg_student, PREG_FEATURES, PREG_STUDENT_FILE),
+    "predict_fetal": (fetal_student, FETAL_FEATURES, FETAL_STUDENT_FILE),
+}
+
+# Versions of the optional on-disk result cache (see result_cache.py); the
+# /analyze version also includes the thresholds of the selected profile
+CACHE_VERSIONS = {
+    "analyze": file_digest(rule_engine.RULE_SOURCES),
+    "predict_preg": file_digest(model_paths(PREG_MODEL_FILES)),
+    "predict_fetal": file_digest(model_paths(FETAL_MODEL_FILES)),
+}
+CACHE_VERSIONS.update({
+    f"{route}:distilled": file_digest(model_paths([file]))
+    for route, (student, _, file) in STUDENTS.items()
+    if student is not None
+})
+
+# Ensembles scored member by member when a request has a deadline (see deadlines.py)
+VOTERS = {
+    "predict_preg": (DeadlineVoter(MEMBER_NAMES, PREG_MODELS), PREG_FEATURES),
+    "predict_fetal": (DeadlineVoter(MEMBER_NAMES, FETAL_MODELS), FETAL_FEATURES),
+}
+
+# Streaming sketches of every input scored by the prediction routes
+_drift_reference = load_reference()
+DRIFT = {
+    "preg": DriftMonitor(PREG_FEATURES, _drift_reference.get("preg")),
+    "fetal": DriftMonitor(FETAL_FEATURES, _drift_reference.get("fetal")),
+}
+
+
+def analyze_patient(patient_data, report_id=None, rules: Optional[RuleProfile] = None):
+    result = get_recommendations(patient_data, rules.plan if rules is not None else None)
+    flags = alert_flags(result["alerts"])
+    result.update(
+        {
+            "anemia": flags["anemia"],
+            "gdm": flags["gdm"],
+            "thyroid": flags["thyroid"],
+            "report_id": report_id,
+        }
+    )
+    if rules is not None:
+        result["rule_profile"] = rules.name
+    return result
+
+
+# Threshold profile for the rule engine: ?profile=<name>, else the profile
+# mapped to the X-Facility-Id header, else the default (see rules/profiles.py)
+def rule_profile(request: Request, profile: Optional[str] = None) -> RuleProfile:
+    try:
+        return PROFILES.resolve(profile, request.headers.get("x-facility-id"))
+    except ProfileError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# Deadline of the request: the X-Request-Deadline-Ms header, else the route
+# default (see deadlines.py). Async, so the clock starts before any queueing
+# for a worker thread.
+def request_deadline(route: str):
+    async def dependency(request: Request) -> Optional[Deadline]:
+        try:
+            return parse_deadline(request.headers.get(DEADLINE_HEADER), route)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+    return dependency
+
+
+# Audit record of one inference (see audit.py); X-Pregnancy-Id names the
+# pregnancy for the reader tool. Batch routes write one record per request.
+def audit_inference(request: HTTPConnection, route: str, inputs, outputs, versions: dict):
+    AUDIT_LOG.record(route, inputs, outputs, versions, request.headers.get("x-pregnancy-id"))
+
+
+def rule_versions(rules: RuleProfile, thresholds: str) -> dict:
+    return {
+        "rules": CACHE_VERSIONS["analyze"],
+        "rule_modules": list(rule_engine.RULE_MODULES),
+        "profile": rules.name,
+        "thresholds": thresholds,
+    }
+
+
+def assessment_versions(rules: RuleProfile, thresholds: str) -> dict:
+    # Rules plus both ensembles
+    return {
+        **rule_versions(rules, thresholds),
+        "models": {route: CACHE_VERSIONS[route] for route in ("predict_preg", "predict_fetal")},
+    }
+
+
+# Cohorts and /rank run the rule engine with its built-in thresholds
+_builtin_rules = RuleProfile("built-in", {})
+BUILTIN_VERSIONS = assessment_versions(_builtin_rules, config_digest(_builtin_rules.config))
+
+
+def drop_if_expired(deadline: Optional[Deadline]):
+    if deadline is not None and deadline.expired():
+        raise HTTPException(status_code=504, detail="request deadline passed before work started")
+
 
 @app.post("/analyze")
-def analyze_report(report: ReportInput):
+def analyze_report(
+    report: ReportInput,
+    request: Request,
+    rules: RuleProfile = Depends(rule_profile),
+    deadline: Optional[Deadline] = Depends(request_deadline("analyze")),
+):
+    drop_if_expired(deadline)
     try:
         patient_data = report.data.dict()
-        result = get_recommendations(patient_data)
-        anemia = any("anemia" in s.lower() for s in result["alerts"])
-        gdm = any(
-            "gdm" in s.lower() or "gestational diabetes" in s.lower()
-            for s in result["alerts"]
-        )
-        thyroid = any(
-            "tsh" in s.lower() or "thyroid" in s.lower() for s in result["alerts"]
+        report_id = getattr(report, "id", None)  # or report.id if present
+        thresholds = config_digest(rules.config)
+        version = f"{CACHE_VERSIONS['analyze']}-{thresholds}"
+        key = payload_key([patient_data, report_id, rules.name])
+        result = FLIGHTS["analyze"].do(
+            f"{version}:{key}",
+            lambda: RESULT_CACHE.get_or_compute(
+                "analyze", version, key, lambda: analyze_patient(patient_data, report_id, rules)
+            ),
         )
-        result.update(
-            {
-                "anemia": anemia,
-                "gdm": gdm,
-                "thyroid": thyroid,
-                "report_id": getattr(report, "id", None),  # or report.id if present
-            }
-        )
-        return result
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    audit_inference(request, "analyze", patient_data, result, rule_versions(rules, thresholds))
+    return result
+
+
+# Batch analysis: a list of ReportInput objects or one object of ReportData columns.
+# Bodies and responses may be JSON, MessagePack or Arrow IPC (see wire_formats.py).
+@app.post("/analyze/batch")
+def analyze_batch(
+    request: Request,
+    payload: Any = Depends(request_payload),
+    rules: RuleProfile = Depends(rule_profile),
+    deadline: Optional[Deadline] = Depends(request_deadline("analyze_batch")),
+):
+    drop_if_expired(deadline)
+    try:
+        records = parse_report_batch(payload, ReportInput)
+    except BatchInputError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    try:
+        results = [analyze_patient(patient_data, rules=rules) for patient_data in records]
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    audit_inference(request, "analyze_batch", records, results, rule_versions(rules, config_digest(rules.config)))
+    return encode_records(results, response_format(request))
+
+def vote_by_deadline(route: str, data, deadline: Deadline):
+    voter, features = VOTERS[route]
+    proba, used = voter.vote(input_frame(data, features), deadline)
+    result = format_prediction(proba[0])
+    if len(used) < len(voter.models):
+        result.update({"Degraded": True, "Models": used})
+    return result
+
+
+def full_vote(route: str, data, predict_ensemble):
+    # Timed, so deadline requests know whether a full vote fits their budget
+    started = time.perf_counter()
+    result = predict_ensemble(data)
+    VOTERS[route][0].observe_full(time.perf_counter() - started)
+    return result
+
+
+def predict_with_backend(route: str, data, backend: str, predict_ensemble, deadline: Optional[Deadline] = None):
+    drop_if_expired(deadline)
+    key = payload_key(data.dict())
+    keep = lambda result: not result.get("Degraded")
+    if backend == "ensemble":
+        version = CACHE_VERSIONS[route]
+        if deadline is not None and not VOTERS[route][0].full_vote_fits(deadline):
+            # Degraded vote within this caller's budget; not coalesced, since
+            # the answer depends on the time left
+            return RESULT_CACHE.get_or_compute(
+                route, version, key, lambda: vote_by_deadline(route, data, deadline), keep=keep
+            )
+        predict = lambda: full_vote(route, data, predict_ensemble)
+    elif backend == "distilled":
+        student, features, _ = STUDENTS[route]
+        if student is None:
+            raise HTTPException(status_code=400, detail=f"no distilled model for {route} in MODEL_DIR")
+        version = CACHE_VERSIONS[f"{route}:distilled"]
+        predict = lambda: {**predict_distilled(student, features, data), "Backend": "distilled"}
+    else:
+        raise HTTPException(status_code=422, detail="backend must be 'ensemble' or 'distilled'")
+    # The flight computes the full answer whatever the callers' deadlines;
+    # each caller waits for it only as long as its own deadline allows
+    try:
+        return FLIGHTS[route].do(
+            f"{backend}:{key}",
+            lambda: RESULT_CACHE.get_or_compute(route, version, key, predict, keep=keep),
+            deadline.remaining() if deadline is not None else None,
+        )
+    except FlightTimeout:
+        raise HTTPException(status_code=504, detail="request deadline passed waiting for an identical request")
+
+
+def model_versions(route: str, backend: str) -> dict:
+    key = route if backend == "ensemble" else f"{route}:{backend}"
+    return {"backend": backend, "models": CACHE_VERSIONS.get(key)}
+
 
 # Pregnancy risk prediction endpoint
 @app.post("/predict_preg")
-def predict_preg_route(data: RiskInputData):
-    return predict_preg(data)
+def predict_preg_route(
+    data: RiskInputData,
+    request: Request,
+    explain: bool = False,
+    backend: str = PREDICT_BACKEND,
+    deadline: Optional[Deadline] = Depends(request_deadline("predict_preg")),
+):
+    values = [getattr(data, f) for f in PREG_FEATURES]
+    DRIFT["preg"].observe_row(values)
+    result = predict_with_backend("predict_preg", data, backend, predict_preg, deadline)
+    if explain:
+        # Per-feature contributions towards the predicted class (see explain.py)
+        result = {**result, "Explanation": PREG_EXPLAINER.explain(values, result["EnsemblePrediction"])}
+    audit_inference(request, "predict_preg", data.dict(), result, model_versions("predict_preg", backend))
+    return result
 
 # Fetal risk prediction endpoint
 @app.post("/predict_fetal")
-def predict_fetal_route(data: FetalHealthInput):
-    return predict_fetal(data)
+def predict_fetal_route(
+    data: FetalHealthInput,
+    request: Request,
+    explain: bool = False,
+    backend: str = PREDICT_BACKEND,
+    deadline: Optional[Deadline] = Depends(request_deadline("predict_fetal")),
+):
+    values = [getattr(data, f) for f in FETAL_FEATURES]
+    DRIFT["fetal"].observe_row(values)
+    result = predict_with_backend("predict_fetal", data, backend, predict_fetal, deadline)
+    if explain:
+        result = {**result, "Explanation": FETAL_EXPLAINER.explain(values, result["EnsemblePrediction"])}
+    audit_inference(request, "predict_fetal", data.dict(), result, model_versions("predict_fetal", backend))
+    return result
+
+# Fetal risk from a raw CTG recording: the 21 summary features are derived from
+# the FHR/UC traces (see ctg/features.py) and scored by the fetal ensemble
+@app.post("/predict_fetal/trace")
+def predict_fetal_trace_route(trace: CTGTraceInput, request: Request, explain: bool = False):
+    try:
+        features = extract_features(
+            trace.fhr, trace.uc, trace.sampling_rate_hz, trace.fetal_movements
+        )
+    except TraceError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    values = [features[f] for f in FETAL_FEATURES]
+    DRIFT["fetal"].observe_row(values)
+    result = {"Features": features, **predict_fetal(FetalHealthInput(**features))}
+    if explain:
+        result["Explanation"] = FETAL_EXPLAINER.explain(values, result["EnsemblePrediction"])
+    audit_inference(request, "predict_fetal_trace", trace.dict(), result, model_versions("predict_fetal", "ensemble"))
+    return result
+
+
+# One call per patient instead of /analyze + /predict_preg + /predict_fetal: the
+# rule engine and every ensemble with complete inputs run concurrently, so the
+# latency is roughly that of the slowest component (see assess.py)
+@app.post("/assess")
+async def assess_patient(
+    payload: AssessInput,
+    request: Request,
+    rules: RuleProfile = Depends(rule_profile),
+    deadline: Optional[Deadline] = Depends(request_deadline("assess")),
+):
+    drop_if_expired(deadline)
+    jobs, skipped = {}, {}
+    if payload.data is not None:
+        jobs["analysis"] = run_in_threadpool(analyze_patient, payload.data.dict(), payload.id, rules)
+    else:
+        skipped["analysis"] = "no report data"
+
+    risk, missing = risk_input(payload)
+    if risk is not None:
+        values = [getattr(risk, f) for f in PREG_FEATURES]
+        DRIFT["preg"].observe_row(values)
+        jobs["pregnancy_risk"] = soft_vote_concurrently(PREG_MODELS, PREG_FEATURES, values, deadline)
+    else:
+        skipped["pregnancy_risk"] = f"missing {', '.join(missing)}"
+
+    if payload.fetal is not None:
+        values = [getattr(payload.fetal, f) for f in FETAL_FEATURES]
+        DRIFT["fetal"].observe_row(values)
+        jobs["fetal_risk"] = soft_vote_concurrently(FETAL_MODELS, FETAL_FEATURES, values, deadline)
+    else:
+        skipped["fetal_risk"] = "no CTG features"
+
+    try:
+        results = await asyncio.gather(*jobs.values())
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    result = {"id": payload.id, **dict(zip(jobs, results)), "skipped": skipped}
+    audit_inference(request, "assess", payload.dict(), result, assessment_versions(rules, config_digest(rules.config)))
+    return result
+
+
+# Batch prediction endpoints: a list of rows or one array per feature name,
+# as JSON, MessagePack or Arrow IPC (see wire_formats.py)
+@app.post("/predict_preg/batch")
+def predict_preg_batch_route(
+    request: Request,
+    payload: Any = Depends(request_payload),
+    deadline: Optional[Deadline] = Depends(request_deadline("predict_preg_batch")),
+):
+    drop_if_expired(deadline)
+    try:
+        X = parse_batch(payload, RiskInputData, PREG_FEATURES)
+    except BatchInputError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    DRIFT["preg"].observe(X)
+    proba = predict_preg_proba(X)
+    audit_inference(request, "predict_preg_batch", {"features": PREG_FEATURES, "rows": X}, {"probabilities": proba},
+                    model_versions("predict_preg", "ensemble"))
+    return encode_predictions(proba, response_format(request), format_prediction)
+
+
+# What-if curves: the pregnancy risk as each feature moves over a range, scored
+# as one batched grid (see sensitivity.py)
+@app.post("/predict_preg/sensitivity")
+def predict_preg_sensitivity_route(
+    payload: SensitivityInput,
+    request: Request,
+    deadline: Optional[Deadline] = Depends(request_deadline("predict_preg_sensitivity")),
+):
+    drop_if_expired(deadline)
+    try:
+        result = sensitivity(payload.data, payload.ranges)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    audit_inference(request, "predict_preg_sensitivity", payload.dict(), result,
+                    model_versions("predict_preg", "ensemble"))
+    return result
+
+
+@app.post("/predict_fetal/batch")
+def predict_fetal_batch_route(
+    request: Request,
+    payload: Any = Depends(request_payload),
+    deadline: Optional[Deadline] = Depends(request_deadline("predict_fetal_batch")),
+):
+    drop_if_expired(deadline)
+    try:
+        X = parse_batch(payload, FetalHealthInput, FETAL_FEATURES)
+    except BatchInputError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    DRIFT["fetal"].observe(X)
+    proba = predict_fetal_proba(X)
+    audit_inference(request, "predict_fetal_batch", {"features": FETAL_FEATURES, "rows": X}, {"probabilities": proba},
+                    model_versions("predict_fetal", "ensemble"))
+    return encode_predictions(proba, response_format(request), format_prediction)
+
+
+# Cohort aggregates for dashboards. Reports are added incrementally as a JSON
+# (or MessagePack) list, or streamed as NDJSON and aggregated in chunks.
+# Without COHORT_STORE_PATH the totals are per worker (see cohort.py), and the
+# responses say so when several workers are serving.
+COHORT_CHUNK_SIZE = 1000
+
+
+def cohort_warning() -> dict:
+    if COHORTS.shared or THREAD_BUDGET.workers <= 1:
+        return {}
+    return {"warning": "cohorts are kept per worker; set COHORT_STORE_PATH to share them across workers"}
+
+
+@app.post("/cohorts/{cohort_id}/reports")
+async def add_cohort_reports(cohort_id: str, request: Request):
+    added = 0
+
+    # One audit record per scored chunk
+    def audit_chunk(reports, outputs):
+        audit_inference(request, "cohort_reports", {"cohort_id": cohort_id, "reports": reports}, outputs,
+                        BUILTIN_VERSIONS)
+
+    try:
+        if is_ndjson(request):
+            async for batch in iter_ndjson_batches(request, COHORT_CHUNK_SIZE):
+                added += await run_in_threadpool(COHORTS.add_reports, cohort_id, batch, audit_chunk)
+        else:
+            payload = decode_body(await request.body(), request.headers.get("content-type"))
+            added = await run_in_threadpool(COHORTS.add_reports, cohort_id, payload, audit_chunk)
+    except BatchInputError as e:
+        raise HTTPException(status_code=422, detail=f"{e} ({added} reports added before the error)")
+    return {"cohort_id": cohort_id, "added": added, **cohort_warning()}
+
+
+@app.get("/cohorts")
+def list_cohorts():
+    return {"cohorts": COHORTS.ids(), **cohort_warning()}
+
+
+@app.get("/cohorts/{cohort_id}")
+def cohort_summary(cohort_id: str):
+    summary = COHORTS.summary(cohort_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Cohort not found")
+    return {"cohort_id": cohort_id, **summary, **cohort_warning()}
+
+
+@app.delete("/cohorts/{cohort_id}")
+def reset_cohort(cohort_id: str):
+    if not COHORTS.remove(cohort_id):
+        raise HTTPException(status_code=404, detail="Cohort not found")
+    return {"cohort_id": cohort_id, "deleted": True}
+
+
+# Top-K patients by risk score (see ranking.py). The body is a JSON list of
+# {id, risk, report} objects or an NDJSON stream, scored in chunks.
+@app.post("/rank")
+async def rank_patients(
+    request: Request,
+    k: int = 50,
+    risk_class: int = 2,
+    alert_weight: float = 0.5,
+    severe_flags: List[str] = Query(list(DEFAULT_SEVERE_FLAGS)),
+):
+    try:
+        ranker = RiskRanker(
+            k, risk_class, alert_weight, severe_flags,
+            # One audit record per scored chunk
+            on_scored=lambda patients, outputs: audit_inference(request, "rank", patients, outputs, BUILTIN_VERSIONS),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        if is_ndjson(request):
+            async for batch in iter_ndjson_batches(request, RANK_CHUNK_SIZE):
+                await run_in_threadpool(ranker.add, batch)
+        else:
+            payload = decode_body(await request.body(), request.headers.get("content-type"))
+            if not isinstance(payload, list):
+                raise BatchInputError("expected a list of patients")
+            for start in range(0, len(payload), RANK_CHUNK_SIZE):
+                await run_in_threadpool(ranker.add, payload[start:start + RANK_CHUNK_SIZE])
+    except BatchInputError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return ranker.results()
+
+
+# Live CTG monitoring: the client streams {"fhr": [...], "uc": [...]} chunks and
+# receives a message whenever the predicted fetal class changes (see ctg/live.py)
+@app.websocket("/ws/ctg/{session_id}")
+async def live_ctg(
+    websocket: WebSocket,
+    session_id: str,
+    sampling_rate_hz: float = 4.0,
+    window_seconds: int = Query(CTG_WINDOW_SECONDS, ge=60, le=CTG_MAX_WINDOW_SECONDS),
+    predict_every_seconds: int = Query(CTG_PREDICT_EVERY_SECONDS, ge=1, le=CTG_MAX_WINDOW_SECONDS),
+):
+    await websocket.accept()
+
+    # Every prediction of the session is audited, not only the class changes sent back
+    def audit_prediction(seconds: int, features: dict, prediction: dict):
+        audit_inference(websocket, "ws_ctg", {"session_id": session_id, "seconds": seconds, "features": features},
+                        prediction, model_versions("predict_fetal", "ensemble"))
+
+    try:
+        session = LIVE_SESSIONS.open(
+            session_id,
+            sampling_rate_hz=sampling_rate_hz,
+            window_seconds=window_seconds,
+            predict_every_seconds=predict_every_seconds,
+            on_prediction=audit_prediction,
+        )
+    except TraceError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    try:
+        while True:
+            message = await websocket.receive_text()
+            try:
+                updates = await session.feed(message)
+            except TraceError as e:
+                await websocket.send_json({"type": "error", "detail": str(e)})
+                continue
+            for update in updates:
+                await websocket.send_json(update)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        LIVE_SESSIONS.close(session_id)
+
+
+@app.get("/ctg/sessions")
+def live_ctg_sessions():
+    return {"sessions": LIVE_SESSIONS.summaries()}
+
+
+# Loaded rule threshold profiles, facility mapping and load errors
+@app.get("/rules/profiles")
+def rule_profiles():
+    return PROFILES.status()
+
+
+@app.post("/rules/profiles/reload")
+def reload_rule_profiles():
+    PROFILES.reload(force=True)
+    return PROFILES.status()
+
+
+# Input drift against the training reference sketches; reset=true starts a new window
+@app.get("/monitoring/drift")
+def drift_report(reset: bool = False):
+    return {name: monitor.report(reset=reset) for name, monitor in DRIFT.items()}
+
+
+# Unique vs shared memory of the worker serving this request (see serve.py)
+@app.get("/debug/memory")
+def worker_memory():
+    usage = memory_usage()
+    if usage is None:
+        raise HTTPException(status_code=501, detail="memory accounting needs /proc/<pid>/smaps_rollup")
+    return usage
+
+
+# On-disk result cache counters of this worker, plus the shared entry count and size
+@app.get("/debug/cache")
+def result_cache_stats():
+    return RESULT_CACHE.stats()
+
+
+@app.get("/debug/audit")
+def audit_stats():
+    return AUDIT_LOG.stats()
+
+
+# Thread budget, per-model thread settings and the native thread pools of this worker
+@app.get("/debug/threads")
+def thread_settings():
+    return THREAD_BUDGET.describe()
+
+
+# Recent per-member latencies used to decide what fits in a request deadline
+@app.get("/debug/deadlines")
+def deadline_stats():
+    return {route: voter.latency_ms() for route, (voter, _) in VOTERS.items()}
+
+
+# Request coalescing counters per route
+@app.get("/debug/singleflight")
+def singleflight_stats():
+    return {route: flight.stats() for route, flight in FLIGHTS.items()}
+
+
+# Rule-engine profiling counters (enable with RULE_PROFILE_SAMPLE_RATE or POST below)
+@app.get("/debug/rules/stats")
+def rule_stats(reset: bool = False):
+    return {"modules": list(rule_engine.RULE_MODULES), **PROFILER.snapshot(reset=reset)}
+
+
+@app.post("/debug/rules/sampling")
+def set_rule_sampling(rate: float):
+    try:
+        PROFILER.set_sample_rate(rate)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"sample_rate": PROFILER.sample_rate}
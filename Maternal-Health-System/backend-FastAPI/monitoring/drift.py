@@ -0,0 +1,218 @@
+import argparse
+import json
+import math
+import os
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Constant-memory drift monitoring of model input features.
+#
+# Every scored input row is copied into a fixed-size buffer; when the buffer
+# fills it is folded, one vectorised pass per feature, into
+#   - a merging t-digest (quantiles), and
+#   - a histogram over the reference bin edges (PSI / KS against training).
+# Memory is bounded by the buffer size, the t-digest compression and the
+# number of reference bins, however many requests are observed.
+#
+# Reference sketches are a JSON file (DRIFT_REFERENCE_PATH, default
+# drift_reference.json) of the form
+#   {"preg": {"age": {"edges": [...], "counts": [...], "quantiles": {"0.5": ...}}, ...},
+#    "fetal": {...}}
+# built from the training data with
+#   python monitoring/drift.py drift_reference.json preg train_preg.csv
+
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+PSI_ALERT = 0.25  # conventional "significant shift" threshold
+BUFFER_ROWS = 512
+
+
+class TDigest:
+    def __init__(self, compression: float = 200):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = math.inf
+        self.max = -math.inf
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum())
+
+    def update(self, values: np.ndarray):
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        means = np.concatenate([self.means, values])
+        weights = np.concatenate([self.weights, np.ones(len(values))])
+        order = np.argsort(means, kind="mergesort")
+        means, weights = means[order], weights[order]
+
+        # k1 scale function: points whose mid-quantiles fall in the same unit
+        # of k share a centroid, so centroids stay small in the tails
+        cumulative = np.cumsum(weights)
+        q = (cumulative - weights / 2) / cumulative[-1]
+        k = np.floor(self.compression / (2 * math.pi) * np.arcsin(2 * q - 1))
+        starts = np.flatnonzero(np.r_[True, k[1:] != k[:-1]])
+        merged_weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / merged_weights
+        self.weights = merged_weights
+
+    def quantile(self, qs) -> np.ndarray:
+        if len(self.weights) == 0:
+            return np.full(len(qs), np.nan)
+        cumulative = np.cumsum(self.weights)
+        centers = (cumulative - self.weights / 2) / cumulative[-1]
+        return np.interp(qs, np.r_[0.0, centers, 1.0], np.r_[self.min, self.means, self.max])
+
+
+def population_stability_index(expected: np.ndarray, actual: np.ndarray) -> float:
+    e = np.clip(expected / max(expected.sum(), 1), 1e-4, None)
+    a = np.clip(actual / max(actual.sum(), 1), 1e-4, None)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+def ks_statistic(expected: np.ndarray, actual: np.ndarray) -> float:
+    # Kolmogorov-Smirnov distance evaluated at the shared bin edges
+    e = np.cumsum(expected) / max(expected.sum(), 1)
+    a = np.cumsum(actual) / max(actual.sum(), 1)
+    return float(np.abs(a - e).max())
+
+
+class DriftMonitor:
+    def __init__(self, features: List[str], reference: Optional[Dict] = None):
+        self.features = features
+        self.reference = reference or {}
+        self._lock = threading.Lock()
+        self._buffer = np.empty((BUFFER_ROWS, len(features)))
+        self._reset_state()
+
+    def _reset_state(self):
+        self._buffered = 0
+        self.observations = 0
+        self.digests = [TDigest() for _ in self.features]
+        self.edges = [
+            np.asarray(self.reference[f]["edges"], dtype=np.float64)
+            if f in self.reference else None
+            for f in self.features
+        ]
+        self.histograms = [
+            np.zeros(len(edges) + 1, dtype=np.int64) if edges is not None else None
+            for edges in self.edges
+        ]
+
+    def observe_row(self, values):
+        with self._lock:
+            self._buffer[self._buffered] = values
+            self._buffered += 1
+            self.observations += 1
+            if self._buffered == BUFFER_ROWS:
+                self._flush()
+
+    def observe(self, X: np.ndarray):
+        for start in range(0, len(X), BUFFER_ROWS):
+            chunk = X[start:start + BUFFER_ROWS]
+            with self._lock:
+                self._flush()
+                self._buffer[:len(chunk)] = chunk
+                self._buffered = len(chunk)
+                self.observations += len(chunk)
+                self._flush()
+
+    def _flush(self):
+        if self._buffered == 0:
+            return
+        rows = self._buffer[:self._buffered]
+        for j, edges in enumerate(self.edges):
+            column = rows[:, j]
+            self.digests[j].update(column)
+            if edges is not None:
+                bins = np.searchsorted(edges, column, side="right")
+                self.histograms[j] += np.bincount(bins, minlength=len(edges) + 1)
+        self._buffered = 0
+
+    def report(self, reset: bool = False) -> Dict:
+        with self._lock:
+            self._flush()
+            features = {}
+            for j, name in enumerate(self.features):
+                current = self.digests[j].quantile(QUANTILES)
+                entry = {
+                    "quantiles": {str(q): _rounded(v) for q, v in zip(QUANTILES, current)},
+                }
+                reference = self.reference.get(name)
+                if reference is not None and self.histograms[j].sum() > 0:
+                    expected = np.asarray(reference["counts"], dtype=np.float64)
+                    actual = self.histograms[j].astype(np.float64)
+                    entry["psi"] = round(population_stability_index(expected, actual), 4)
+                    entry["ks"] = round(ks_statistic(expected, actual), 4)
+                    if "quantiles" in reference:
+                        entry["reference_quantiles"] = reference["quantiles"]
+                features[name] = entry
+            observations = self.observations
+            if reset:
+                self._reset_state()
+
+        drifted = [f for f, e in features.items() if e.get("psi", 0.0) >= PSI_ALERT]
+        return {
+            "observations": observations,
+            "has_reference": bool(self.reference),
+            "drifted_features": drifted,
+            "features": features,
+        }
+
+
+def _rounded(value: float):
+    return None if math.isnan(value) else round(float(value), 4)
+
+
+def load_reference(path: Optional[str] = None) -> Dict:
+    path = path or os.environ.get("DRIFT_REFERENCE_PATH", "drift_reference.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def build_reference(X: np.ndarray, features: List[str], n_bins: int = 10) -> Dict:
+    # Decile bin edges (deduplicated for discrete features) and training counts
+    reference = {}
+    for j, name in enumerate(features):
+        column = X[:, j][~np.isnan(X[:, j])]
+        edges = np.unique(np.quantile(column, np.linspace(0, 1, n_bins + 1)[1:-1]))
+        bins = np.searchsorted(edges, column, side="right")
+        reference[name] = {
+            "edges": edges.tolist(),
+            "counts": np.bincount(bins, minlength=len(edges) + 1).tolist(),
+            "quantiles": {str(q): float(v) for q, v in zip(QUANTILES, np.quantile(column, QUANTILES))},
+        }
+    return reference
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build drift reference sketches from training data")
+    parser.add_argument("output", help="reference JSON file to create or update")
+    parser.add_argument("ensemble", help="section name, e.g. preg or fetal")
+    parser.add_argument("csv", help="training data with one column per model feature")
+    parser.add_argument("--features", nargs="*", help="columns to use (default: all numeric)")
+    parser.add_argument("--bins", type=int, default=10)
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    frame = pd.read_csv(args.csv)
+    features = args.features or list(frame.select_dtypes("number").columns)
+    references = load_reference(args.output)
+    references[args.ensemble] = build_reference(
+        frame[features].to_numpy(dtype=np.float64), features, args.bins
+    )
+    with open(args.output, "w") as f:
+        json.dump(references, f, indent=2)
+    print(f"wrote {len(features)} feature sketches for '{args.ensemble}' to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
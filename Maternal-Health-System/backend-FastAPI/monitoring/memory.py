@@ -0,0 +1,45 @@
+import os
+from typing import Dict, Iterable, List, Optional
+
+# Per-process memory accounting from /proc/<pid>/smaps_rollup (Linux).
+#
+#   unique: private pages (USS), freed if the process exits
+#   shared: pages shared with other processes, e.g. model arrays inherited
+#           from a preloading master (see serve.py)
+#   pss:    proportional set size; summing it over processes gives the real
+#           combined footprint
+
+FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def smaps_rollup(pid: int) -> Optional[Dict[str, int]]:
+    # Values in kB, or None where smaps_rollup is unavailable
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+    values = {}
+    for line in lines[1:]:
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].rstrip(":") in FIELDS:
+            values[parts[0].rstrip(":")] = int(parts[1])
+    return values
+
+
+def memory_usage(pid: Optional[int] = None) -> Optional[Dict[str, float]]:
+    pid = pid or os.getpid()
+    values = smaps_rollup(pid)
+    if values is None:
+        return None
+    return {
+        "pid": pid,
+        "rss_mb": round(values.get("Rss", 0) / 1024, 1),
+        "pss_mb": round(values.get("Pss", 0) / 1024, 1),
+        "unique_mb": round((values.get("Private_Clean", 0) + values.get("Private_Dirty", 0)) / 1024, 1),
+        "shared_mb": round((values.get("Shared_Clean", 0) + values.get("Shared_Dirty", 0)) / 1024, 1),
+    }
+
+
+def memory_table(pids: Iterable[int]) -> List[Dict[str, float]]:
+    return [usage for usage in (memory_usage(pid) for pid in pids) if usage is not None]
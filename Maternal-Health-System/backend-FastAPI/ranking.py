@@ -0,0 +1,174 @@
+import argparse
+import heapq
+import itertools
+import json
+import sys
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from pydantic import BaseModel, ValidationError
+
+from batch_input import BatchInputError
+from models.report import ReportData
+from risk_prediction_apis import RiskInputData, PREG_FEATURES, format_prediction, predict_preg_proba
+from rules.engine import ALERT_FLAGS, alert_flags, get_recommendations
+
+# Top-K ranking of a patient population by risk.
+#
+# Patients are scored chunk by chunk (one batched ensemble pass plus the rule
+# engine per chunk) and pushed through a bounded min-heap, so memory stays at
+# one chunk plus K entries however many patients are streamed through.
+#
+# score = P(risk_class) * (1 + alert_weight * number of severe rule flags)
+#
+# CLI: python ranking.py patients.ndjson --k 50
+
+DEFAULT_SEVERE_FLAGS = ("preeclampsia", "hypertension", "gdm", "liver")
+RANK_CHUNK_SIZE = 1000
+
+
+class RankPatient(BaseModel):
+    id: Optional[str] = None
+    risk: RiskInputData
+    report: Optional[ReportData] = None
+
+
+class TopK:
+    def __init__(self, k: int):
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        self.k = k
+        self._heap = []
+        self._order = itertools.count()  # ties keep arrival order
+        self.seen = 0
+
+    def push(self, score: float, item: Dict):
+        self.seen += 1
+        entry = (score, -next(self._order), item)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry > self._heap[0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def skip(self):
+        # Counts a patient whose score cannot enter the heap
+        self.seen += 1
+
+    def threshold(self) -> float:
+        # Lowest score still in the top K (-inf until K patients were seen)
+        return self._heap[0][0] if len(self._heap) == self.k else -np.inf
+
+    def results(self) -> List[Dict]:
+        return [item for _, _, item in sorted(self._heap, reverse=True)]
+
+
+class RiskRanker:
+    def __init__(
+        self,
+        k: int = 50,
+        risk_class: int = 2,
+        alert_weight: float = 0.5,
+        severe_flags: Sequence[str] = DEFAULT_SEVERE_FLAGS,
+        on_scored: Optional[Callable[[List[Dict], Dict], None]] = None,
+    ):
+        # on_scored(patients, outputs) is called per chunk with the parsed
+        # patients and their probabilities, alerts and scores (e.g. for auditing)
+        unknown = [f for f in severe_flags if f not in ALERT_FLAGS]
+        if unknown:
+            raise ValueError(f"unknown alert flags: {unknown}")
+        if risk_class not in (0, 1, 2):
+            raise ValueError("risk_class must be 0, 1 or 2")
+        self.top = TopK(k)
+        self.risk_class = risk_class
+        self.alert_weight = alert_weight
+        self.severe_flags = list(severe_flags)
+        self.on_scored = on_scored
+
+    def add(self, rows: List[Any]) -> int:
+        patients = []
+        for i, row in enumerate(rows):
+            try:
+                patients.append(row if isinstance(row, RankPatient) else RankPatient(**row))
+            except (TypeError, ValidationError) as e:
+                raise BatchInputError(f"patient {self.top.seen + i}: {e}")
+        if not patients:
+            return 0
+
+        X = np.array([[getattr(p.risk, f) for f in PREG_FEATURES] for p in patients], dtype=np.float64)
+        proba = predict_preg_proba(X)
+        alerts = [
+            get_recommendations(p.report.dict())["alerts"] if p.report is not None else []
+            for p in patients
+        ]
+        severe = [[f for f in self.severe_flags if alert_flags(a)[f]] for a in alerts]
+        scores = proba[:, self.risk_class] * (
+            1 + self.alert_weight * np.array([len(s) for s in severe], dtype=np.float64)
+        )
+        if self.on_scored is not None:
+            self.on_scored([p.dict() for p in patients], {"probabilities": proba, "alerts": alerts, "scores": scores})
+
+        for i, patient in enumerate(patients):
+            index = self.top.seen
+            # Entries are only built for patients that make it into the heap
+            if scores[i] <= self.top.threshold():
+                self.top.skip()
+                continue
+            self.top.push(
+                float(scores[i]),
+                {
+                    "id": patient.id if patient.id is not None else str(index),
+                    "score": round(float(scores[i]), 4),
+                    **format_prediction(proba[i]),
+                    "severe_flags": severe[i],
+                    "alerts": alerts[i],
+                },
+            )
+        return len(patients)
+
+    def results(self) -> Dict:
+        return {
+            "scored": self.top.seen,
+            "k": self.top.k,
+            "risk_class": self.risk_class,
+            "alert_weight": self.alert_weight,
+            "severe_flags": self.severe_flags,
+            "top": self.top.results(),
+        }
+
+
+def _chunks(lines: Iterable[str], size: int) -> Iterable[List[Any]]:
+    chunk = []
+    for line in lines:
+        if line.strip():
+            chunk.append(json.loads(line))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank patients by pregnancy risk, keeping only the top K")
+    parser.add_argument("input", help="NDJSON file of {id, risk, report} objects ('-' for stdin)")
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--risk-class", type=int, default=2)
+    parser.add_argument("--alert-weight", type=float, default=0.5)
+    parser.add_argument("--severe-flags", nargs="*", default=list(DEFAULT_SEVERE_FLAGS))
+    parser.add_argument("--chunk-size", type=int, default=RANK_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    ranker = RiskRanker(args.k, args.risk_class, args.alert_weight, args.severe_flags)
+    source = sys.stdin if args.input == "-" else open(args.input)
+    with source:
+        try:
+            for chunk in _chunks(source, args.chunk_size):
+                ranker.add(chunk)
+        except (ValueError, BatchInputError) as e:
+            sys.exit(f"error: {e}")
+    json.dump(ranker.results(), sys.stdout, indent=2)
+    print()
+
+
+if __name__ == "__main__":
+    main()
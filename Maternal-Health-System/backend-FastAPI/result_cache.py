@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+# Optional on-disk result cache shared by every worker process and kept across
+# restarts. Enabled by setting RESULT_CACHE_PATH to a SQLite file on local disk
+# (not NFS: SQLite locking needs a local filesystem).
+#
+# Entries are keyed by route, the canonical payload hash (singleflight.payload_key)
+# and a version string: a digest of the ensemble model files for the prediction
+# routes, and of the rule engine source plus the profile thresholds for
+# /analyze. Deploying new models, rules or thresholds therefore starts from
+# fresh keys; stale entries are never read again and age out through eviction.
+#
+# The database runs in WAL mode, so readers in any process never block on a
+# writer. Each thread of each process opens its own connection. When the stored
+# values exceed RESULT_CACHE_MAX_MB (default 256), the least recently used
+# entries are deleted down to 90% of the limit. Any SQLite error is counted and
+# treated as a miss: the cache never fails a request.
+
+# Last-access times are refreshed at most this often per entry, so hot keys
+# do not turn every hit into a write
+TOUCH_AFTER_SECONDS = 60
+# Total size is checked every this many writes
+EVICT_CHECK_EVERY = 100
+EVICT_TO = 0.9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    route TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed);
+"""
+
+
+def file_digest(paths: Iterable[str]) -> str:
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def config_digest(config) -> str:
+    canonical = json.dumps(dict(config), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+class ResultCache:
+    def __init__(self, path: Optional[str], max_bytes: int, timeout: float = 5.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._counts = {"hits": 0, "misses": 0, "writes": 0, "evicted": 0, "errors": 0}
+        if path:
+            conn = sqlite3.connect(path, timeout=timeout)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.executescript(SCHEMA)
+            finally:
+                conn.close()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _conn(self) -> sqlite3.Connection:
+        # One connection per thread; a forked worker must not reuse its
+        # parent's connection, so the pid is part of the check
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self._counts[name] += n
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT value, accessed FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._count("misses")
+                return None
+            now = time.time()
+            if now - row[1] > TOUCH_AFTER_SECONDS:
+                conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (now, key))
+        except sqlite3.Error:
+            self._count("errors")
+            return None
+        self._count("hits")
+        return json.loads(row[0])
+
+    def put(self, key: str, route: str, value: Any):
+        encoded = json.dumps(value, separators=(",", ":"))
+        try:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO results (key, route, value, size, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, route, encoded, len(encoded), time.time()),
+            )
+        except sqlite3.Error:
+            self._count("errors")
+            return
+        self._count("writes")
+        with self._lock:
+            self._writes += 1
+            check = self._writes % EVICT_CHECK_EVERY == 0
+        if check:
+            self.evict()
+
+    def evict(self):
+        # Delete least recently used entries until the total is under EVICT_TO of the limit
+        try:
+            conn = self._conn()
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            target = total - int(self.max_bytes * EVICT_TO)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Oldest entries whose cumulative size covers the excess
+                cursor = conn.execute(
+                    """
+                    DELETE FROM results WHERE key IN (
+                        SELECT key FROM (
+                            SELECT key, SUM(size) OVER (ORDER BY accessed, key) - size AS before
+                            FROM results
+                        ) WHERE before < ?
+                    )
+                    """,
+                    (target,),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        except sqlite3.Error:
+            self._count("errors")
+            return
+        self._count("evicted", cursor.rowcount)
+
+    def get_or_compute(
+        self, route: str, version: str, key: str, fn: Callable[[], Any], keep: Optional[Callable[[Any], bool]] = None
+    ) -> Any:
+        # keep(value) false: return the computed value without storing it
+        if not self.enabled:
+            return fn()
+        key = f"{route}:{version}:{key}"
+        value = self.get(key)
+        if value is None:
+            value = fn()
+            if keep is None or keep(value):
+                self.put(key, route, value)
+        return value
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = {"enabled": self.enabled, "path": self.path, "max_bytes": self.max_bytes, **self._counts}
+        if self.enabled:
+            try:
+                entries, size = self._conn().execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+                ).fetchone()
+                stats.update({"entries": entries, "bytes": size})
+            except sqlite3.Error:
+                stats["errors"] += 1
+        return stats
+
+
+RESULT_CACHE = ResultCache(
+    os.environ.get("RESULT_CACHE_PATH") or None,
+    int(float(os.environ.get("RESULT_CACHE_MAX_MB", "256")) * 1024 * 1024),
+)
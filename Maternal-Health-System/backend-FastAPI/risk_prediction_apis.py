@@ -1,3 +1,4 @@
+import os
 from fastapi import FastAPI
 from pydantic import BaseModel
 import numpy as np
@@ -5,13 +6,36 @@ import joblib
 from collections import Counter
 import pandas as pd
 
-model_rf = joblib.load("rfm.pkl")
-model_xgb = joblib.load("xgb.pkl")
-model_mlp = joblib.load("mlp.pkl") 
+# Ensemble member files (rf, xgb, mlp) in MODEL_DIR (default: the working
+# directory, or a version written by training/incremental.py); their contents
+# also version the cached predictions (see result_cache.py)
+MODEL_DIR = os.environ.get("MODEL_DIR", ".")
+MEMBER_NAMES = ("rf", "xgb", "mlp")
+PREG_MODEL_FILES = ("rfm.pkl", "xgb.pkl", "mlp.pkl")
+FETAL_MODEL_FILES = ("rfm_fetal.pkl", "xgb_fetal.pkl", "mlp_fetal.pkl")
 
-fetal_mlp = joblib.load('mlp_fetal.pkl')
-fetal_xgb = joblib.load('xgb_fetal.pkl')
-fetal_rf  = joblib.load('rfm_fetal.pkl')
+
+def model_paths(files, model_dir: str = MODEL_DIR):
+    return [os.path.join(model_dir, f) for f in files]
+
+
+model_rf, model_xgb, model_mlp = (joblib.load(p) for p in model_paths(PREG_MODEL_FILES))
+
+fetal_rf, fetal_xgb, fetal_mlp = (joblib.load(p) for p in model_paths(FETAL_MODEL_FILES))
+
+# Optional single-model students distilled from the ensembles
+# (training/distill.py); None when MODEL_DIR has none
+PREG_STUDENT_FILE = "preg_student.pkl"
+FETAL_STUDENT_FILE = "fetal_student.pkl"
+
+
+def load_student(name: str):
+    path = os.path.join(MODEL_DIR, name)
+    return joblib.load(path) if os.path.exists(path) else None
+
+
+preg_student = load_student(PREG_STUDENT_FILE)
+fetal_student = load_student(FETAL_STUDENT_FILE)
 
 app = FastAPI()
 
@@ -52,7 +76,60 @@ class FetalHealthInput(BaseModel):
     histogram_median: float
     histogram_variance: float
     histogram_tendency: float
-    
+
+
+# Column order of the input matrices, matching the training DataFrames
+PREG_FEATURES = list(RiskInputData.__annotations__)
+FETAL_FEATURES = list(FetalHealthInput.__annotations__)
+
+PREG_MODELS = (model_rf, model_xgb, model_mlp)
+FETAL_MODELS = (fetal_rf, fetal_xgb, fetal_mlp)
+
+
+def soft_vote(models, X):
+    # Average the class probabilities of every ensemble member
+    return sum(model.predict_proba(X) for model in models) / len(models)
+
+
+def input_frame(data, features) -> pd.DataFrame:
+    return pd.DataFrame([[getattr(data, f) for f in features]], columns=features)
+
+
+def predict_distilled(student, features, data):
+    # Same response as the soft vote, from the student's probabilities
+    return format_prediction(student.predict_proba(input_frame(data, features))[0].astype(float))
+
+
+def format_prediction(proba):
+    return {
+        "Probabilities": {
+            f"Class_{i}": round(prob, 4) for i, prob in enumerate(proba)
+        },
+        "EnsemblePrediction": int(np.argmax(proba))
+    }
+
+
+def predict_preg_proba(X: np.ndarray) -> np.ndarray:
+    # X: (n_patients, len(PREG_FEATURES)) float matrix
+    if len(X) == 0:
+        return np.empty((0, 3))
+    return soft_vote(PREG_MODELS, pd.DataFrame(X, columns=PREG_FEATURES, copy=False))
+
+
+def predict_fetal_proba(X: np.ndarray) -> np.ndarray:
+    # X: (n_recordings, len(FETAL_FEATURES)) float matrix
+    if len(X) == 0:
+        return np.empty((0, 3))
+    return soft_vote(FETAL_MODELS, pd.DataFrame(X, columns=FETAL_FEATURES, copy=False))
+
+
+def predict_preg_batch(X: np.ndarray):
+    return [format_prediction(proba) for proba in predict_preg_proba(X)]
+
+
+def predict_fetal_batch(X: np.ndarray):
+    return [format_prediction(proba) for proba in predict_fetal_proba(X)]
+
 ##### HARD VOTING 
 # def majority_vote(preds: list[int]) -> int:
 #     vote_count = Counter(preds)
@@ -0,0 +1,118 @@
+from typing import Dict, List, Tuple
+
+from rules.config import CONFIG
+from rules.profiling import PROFILER
+
+# Anemia and iron deficiency rules (registered in rules.engine.RULE_REGISTRY)
+
+
+def rule_anemia(p: Dict, cfg: Dict = CONFIG) -> Tuple[List[str], List[str], List[str]]:
+    rec, alert, diet = [], [], []
+
+    # Priority 1: Ferritin / Tsat (more definitive)
+    ferritin = p.get("ferritin")  # in µg/L
+    tsat = p.get("tsat")  # transferrin saturation %, as float
+
+    if ferritin is not None:
+        if ferritin < cfg["ferritin_severe"]:
+            PROFILER.branch("ferritin_severe", early=True)
+            alert.append(f"Severe iron deficiency: Ferritin {ferritin} µg/L")
+            rec.append("Parenteral iron therapy is often beneficial in such cases. ")
+            rec.append(
+                "Iron sucrose (100 mg IV on alternate days) or ferric carboxymaltose (based on weight and Hb) may be used. "
+            )
+            rec.append(
+                "It may be helpful to avoid delaying treatment due to poor oral iron response or late gestation."
+            )
+            diet.append(
+                "Iron-rich foods such as leafy greens (spinach, methi), lentils, dates, jaggery, and red meat (if not vegetarian) may help. "
+            )
+            diet.append(
+                "Vitamin C-rich foods like oranges or amla juice taken with meals may enhance iron absorption. "
+            )
+            diet.append(
+                "Avoid consuming tea/coffee with iron-rich meals as it may inhibit absorption."
+            )
+
+            return rec, alert, diet
+
+        elif ferritin < cfg["ferritin_mild"]:
+            PROFILER.branch("ferritin_mild", early=True)
+            alert.append(f"Iron deficiency: Ferritin {ferritin} µg/L")
+            rec.append(
+                "Oral iron therapy may be started—ferrous sulfate 100–200 mg elemental iron daily is typically suggested. "
+            )
+            rec.append("Vitamin C may be co-administered to improve absorption. ")
+            rec.append(
+                "Parenteral iron may still be considered if oral is poorly tolerated or patient is in late 2nd/3rd trimester."
+            )
+            diet.append(
+                "Iron-rich foods such as leafy greens (spinach, methi), lentils, dates, jaggery, and red meat (if not vegetarian) may help. "
+            )
+            diet.append(
+                "Vitamin C-rich foods like oranges or amla juice taken with meals may enhance iron absorption. "
+            )
+            diet.append(
+                "Avoid consuming tea/coffee with iron-rich meals as it may inhibit absorption."
+            )
+
+            return rec, alert, diet
+
+    if tsat is not None and tsat < cfg["tsat"]:
+        PROFILER.branch("tsat_low", early=True)
+        alert.append(f"Iron deficiency: Transferrin saturation {tsat}%")
+        rec.append(
+            "Suggest initiating oral iron (e.g., IFA 100 mg elemental iron daily). Monitor ferritin after 4–6 weeks if symptoms persist or inadequate response."
+        )
+        diet.append(
+            "Iron-rich foods such as leafy greens (spinach, methi), lentils, dates, jaggery, and red meat (if not vegetarian) may help. "
+        )
+        diet.append(
+            "Vitamin C-rich foods like oranges or amla juice taken with meals may enhance iron absorption. "
+        )
+        diet.append(
+            "Avoid consuming tea/coffee with iron-rich meals as it may inhibit absorption."
+        )
+
+        return rec, alert, diet
+
+    # Priority 2: Hb by trimester if ferritin/tsat not available
+    trimester_hb = {
+        "1st": p.get("hb_1st"),
+        "2nd": p.get("hb_2nd"),
+        "3rd": p.get("hb_3rd"),
+    }
+
+    anemia_found = False
+    for tri, hb in trimester_hb.items():
+        if hb is None:
+            continue
+        if (tri == "2nd" and hb < cfg["hb_2nd"]) or (tri in ("1st", "3rd") and hb < cfg["hb_1st_3rd"]):
+            anemia_found = True
+            alert.append(f"Anemia detected: Hb {hb} g/dL in {tri} trimester")
+
+    if anemia_found:
+        PROFILER.branch("hb_low")
+        rec.append(
+            "Oral iron supplementation (e.g., ferrous sulfate 100–200 mg daily) could be initiated based on tolerance. "
+        )
+        rec.append(
+            "Severe anemia (Hb < 7 g/dL) may require IV iron or blood transfusion. Monitoring ferritin may guide response to treatment."
+        )
+        diet.append(
+            "Iron-rich foods such as leafy greens (spinach, methi), lentils, dates, jaggery, and red meat (if not vegetarian) may help. "
+        )
+        diet.append(
+            "Vitamin C-rich foods like oranges or amla juice taken with meals may enhance iron absorption. "
+        )
+        diet.append(
+            "Avoid consuming tea/coffee with iron-rich meals as it may inhibit absorption."
+        )
+
+    return rec, alert, diet
+
+
+# Report fields each rule reads, as (fields, required); see rules.engine
+RULE_INPUTS = {
+    rule_anemia: (("ferritin", "tsat", "hb_1st", "hb_2nd", "hb_3rd"), ()),
+}
@@ -0,0 +1,22 @@
+# Default rule thresholds; per-facility profiles override them key by key
+# (rules/profiles.py)
+CONFIG = {
+    # Anemia
+    "hb_1st_3rd": 11,
+    "hb_2nd": 10.5,
+    "ferritin_severe": 15,
+    "ferritin_mild": 30,
+    "tsat": 20,
+    # Hypertension and Preeclampsia
+    "htn_sbp": 140,
+    "htn_dbp": 90,
+    # GDM
+    "gdm_ogtt_f": 92,  # mg/dL
+    "gdm_ogtt_1h": 180,  # mg/dL
+    "gdm_ogtt_2h": 153,  # mg/dL
+    # Preeclampsia
+    "pree_proteinuria": 300,  # mg/24h
+    # Thyroid
+    "tsh_first_tri": 2.5,
+    "tsh_second_third": 3.0,
+}
@@ -0,0 +1,45 @@
+from typing import Dict, List, Tuple
+
+from rules.config import CONFIG
+from rules.profiling import PROFILER
+
+# Gestational diabetes rules (registered in rules.engine.RULE_REGISTRY)
+
+
+def rule_gdm(p: Dict, cfg: Dict = CONFIG) -> Tuple[List[str], List[str], List[str]]:
+    rec, alert, diet = [], [], []
+    ogtt_f = p.get("ogtt_f")
+    ogtt_1h = p.get("ogtt_1h")
+    ogtt_2h = p.get("ogtt_2h")
+
+    if (
+        (ogtt_f and ogtt_f >= cfg["gdm_ogtt_f"])
+        or (ogtt_1h and ogtt_1h >= cfg["gdm_ogtt_1h"])
+        or (ogtt_2h and ogtt_2h >= cfg["gdm_ogtt_2h"])
+    ):
+        PROFILER.branch("ogtt_elevated")
+        alert.append("Possible GDM – schedule OGTT confirmation & endocrinology review")
+        rec.append("Elevated OGTT values suggest gestational diabetes. ")
+        rec.append(
+            "Medical Nutrition Therapy and physical activity may be the first line of management. "
+        )
+        rec.append(
+            "If glucose remains uncontrolled, insulin therapy could be indicated. "
+        )
+        rec.append("Regular monitoring of fasting and postprandial glucose is advised.")
+        diet.append(
+            "A diet focused on complex carbohydrates (whole wheat, oats), fiber (salads, fruits), and lean proteins is recommended. "
+        )
+        diet.append("Meals should be small and frequent to stabilize blood sugar. ")
+        diet.append("Limit sugary items, juices, white rice, and bakery products. ")
+        diet.append(
+            "Include fenugreek seeds, soaked overnight, which may help regulate glucose."
+        )
+
+    return rec, alert, diet
+
+
+# Report fields each rule reads, as (fields, required); see rules.engine
+RULE_INPUTS = {
+    rule_gdm: (("ogtt_f", "ogtt_1h", "ogtt_2h"), ()),
+}
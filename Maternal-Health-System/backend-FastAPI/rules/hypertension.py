@@ -0,0 +1,79 @@
+from typing import Dict, List, Tuple
+
+from rules.config import CONFIG
+from rules.profiling import PROFILER
+
+# Gestational hypertension and preeclampsia rules (registered in rules.engine.RULE_REGISTRY)
+
+
+def rule_hypertension(p: Dict, cfg: Dict = CONFIG) -> Tuple[List[str], List[str], List[str]]:
+    rec, alert, diet = [], [], []
+    sbp, dbp = p.get("sbp"), p.get("dbp")
+    if sbp is None or dbp is None:
+        PROFILER.branch("missing_bp", early=True)
+        return rec, alert, diet
+    if sbp >= cfg["htn_sbp"] or dbp >= cfg["htn_dbp"]:
+        PROFILER.branch("elevated_bp")
+        alert.append(f"Elevated BP {sbp}/{dbp} – evaluate for pre‑eclampsia")
+        rec.append(
+            "Elevated blood pressure after 20 weeks gestation without proteinuria may suggest gestational hypertension. "
+        )
+        rec.append(
+            "Monitoring BP, fetal growth, and signs of preeclampsia (e.g., headaches, vision changes) may be important. "
+        )
+        rec.append(
+            "Antihypertensives like labetalol or nifedipine may be considered based on clinical judgment."
+        )
+        diet.append(
+            "A low-sodium diet with fresh fruits, vegetables, whole grains, and lean proteins may support blood pressure control. "
+        )
+        diet.append(
+            "Reducing pickles, papads, processed snacks, and salty packaged foods might help. "
+        )
+        diet.append(
+            "Potassium-rich foods such as bananas, coconut water, and spinach could be beneficial."
+        )
+
+    return rec, alert, diet
+
+
+def rule_preeclampsia(p: Dict, cfg: Dict = CONFIG) -> Tuple[List[str], List[str], List[str]]:
+    rec, alert, diet = [], [], []
+    sbp, dbp = p.get("sbp"), p.get("dbp")
+    proteinuria = p.get("proteinuria")  # in mg/24h
+
+    if sbp and dbp and (sbp >= cfg["htn_sbp"] or dbp >= cfg["htn_dbp"]):
+        if (
+            proteinuria is not None and proteinuria > cfg["pree_proteinuria"]
+        ):  # in mg/24h
+            PROFILER.branch("proteinuria")
+            alert.append("BP + Proteinuria/Edema – Likely Preeclampsia")
+            rec.append(
+                "Hypertension with proteinuria or signs of end-organ damage after 20 weeks may indicate preeclampsia. "
+            )
+            rec.append(
+                "Frequent BP monitoring, urine dipstick or 24-hour protein analysis, and fetal assessments are essential. "
+            )
+            rec.append(
+                "Magnesium sulfate for seizure prophylaxis and planning for timely delivery may be considered."
+            )
+            diet.append(
+                "A diet rich in antioxidants (e.g., berries, broccoli), moderate salt intake, and adequate hydration may be considered. "
+            )
+            diet.append(
+                "Including foods with omega-3s (e.g., flaxseeds, walnuts) may help reduce inflammation. "
+            )
+            diet.append(
+                "Avoid processed foods and trans fats, which could contribute to oxidative stress and worsen endothelial dysfunction."
+            )
+        else:
+            PROFILER.branch("isolated_high_bp")
+            alert.append("Isolated high BP – Monitor for preeclampsia evolution")
+    return rec, alert, diet
+
+
+# Report fields each rule reads, as (fields, required); see rules.engine
+RULE_INPUTS = {
+    rule_hypertension: ((), ("sbp", "dbp")),
+    rule_preeclampsia: ((), ("sbp", "dbp")),
+}
@@ -0,0 +1,139 @@
+from typing import Dict, List, Tuple
+
+from rules.config import CONFIG
+from rules.profiling import PROFILER
+
+# Liver dysfunction: ICP, HELLP, AFLP rules (registered in rules.engine.RULE_REGISTRY)
+
+
+def rule_liver_dysfunction(p: Dict, cfg: Dict = CONFIG) -> Tuple[List[str], List[str], List[str]]:
+    rec, alert, diet = [], [], []
+
+    # Extract values
+    bile_acids = p.get("bile_acids")  # µmol/L
+    ast = p.get("ast")  # U/L
+    platelets = p.get("platelets")  # per mm³
+    ldh = p.get("ldh")  # U/L
+    bilirubin = p.get("bilirubin")  # mg/dL
+    glucose = p.get("glucose")  # mg/dL
+
+    lft_available = any(
+        v is not None for v in [bile_acids, ast, platelets, ldh, bilirubin, glucose]
+    )
+
+    if not lft_available:
+        # Only apply Step 1 if LFT values are missing
+        symptoms = p.get("symptoms") or p.get("sysmptoms") or []
+        conditions = p.get("conditions") or []
+
+        if any(
+            symptom in symptoms
+            for symptom in ["pruritus", "severe itching", "ruq", "jaundice"]
+        ) or any(
+            cond in conditions for cond in ["preeclampsia", "hep B", "hellp history"]
+        ):
+            PROFILER.branch("liver_risk_factors")
+            alert.append(
+                "Liver-related symptoms or risk conditions present — recommend ordering LFT panel"
+            )
+
+        PROFILER.branch("no_lft_values", early=True)
+        return rec, alert, diet
+
+    # ICP
+    if bile_acids is not None and bile_acids >= 19:
+        PROFILER.branch("icp")
+        alert.append(
+            f"Bile acids elevated ({bile_acids} µmol/L) — Suggestive of Intrahepatic Cholestasis of Pregnancy (ICP)"
+        )
+        if bile_acids > 100:
+            rec.append(
+                "It may be helpful to consider initiating Ursodeoxycholic acid (UDCA) at 300 mg three times daily if symptoms persist or bile acid levels rise. "
+            )
+            rec.append(
+                "Some guidelines indicate that if bile acids exceed 40 µmol/L, delivery around 37 weeks might be appropriate, "
+            )
+            rec.append(
+                "and if bile acids exceed 100 µmol/L, earlier delivery could be considered. "
+            )
+            rec.append(
+                "Close monitoring of fetal well-being and maternal liver function may be beneficial."
+            )
+        elif bile_acids > 40:
+            rec.append(
+                "Starting **UDCA 300 mg orally TID** may be beneficial. Delivery could be planned around **37 weeks gestation** to minimize risks."
+            )
+        else:
+            rec.append(
+                "It may be helpful to start **UDCA 300 mg orally TID**. Weekly monitoring of bile acid levels and maternal symptoms is advised."
+            )
+        diet.append(
+            "A balanced liver-supportive diet rich in fruits (e.g., papaya, apple), vegetables (e.g., spinach, beetroot), and whole grains is suggested. Avoid spicy, oily, or fried foods. Drinking plenty of water may support bile clearance."
+        )
+
+    # HELLP Syndrome
+    elif (
+        ast is not None
+        and ast >= 70
+        and platelets is not None
+        and platelets < 100000
+        and ldh is not None
+        and ldh >= 600
+    ):
+        PROFILER.branch("hellp")
+        alert.append(
+            "LFT pattern consistent with HELLP Syndrome (AST↑, Platelets↓, LDH↑)"
+        )
+        rec.append(
+            "Consider urgent hospitalization. Administer **Magnesium Sulfate (MgSO₄) 4 g IV over 20 minutes followed by 1 g/hr infusion** for seizure prophylaxis."
+        )
+        rec.append(
+            "Stabilization and **planning for delivery regardless of gestational age** may be needed if maternal/fetal status is unstable."
+        )
+        diet.append(
+            "During stabilization, the patient may be NPO (nothing by mouth). Once stable, a soft diet low in sodium and rich in antioxidants (e.g., vitamin C and E) may support recovery."
+        )
+
+    # AFLP (Acute Fatty Liver of Pregnancy)
+    elif (
+        ast is not None
+        and ast > 300
+        and bilirubin is not None
+        and bilirubin > 5
+        and glucose is not None
+        and glucose < 60
+    ):
+        PROFILER.branch("aflp")
+        alert.append("Findings suggest Acute Fatty Liver of Pregnancy (AFLP)")
+        rec.append(
+            "Immediate **ICU admission** may be required. Consider **IV Dextrose 10–20% infusion** if hypoglycemia persists, and prepare for **urgent delivery**."
+        )
+        rec.append("Monitoring renal and coagulation parameters may also be necessary.")
+        diet.append(
+            "In AFLP, patients are usually NPO initially. Once oral intake is allowed, a bland, low-protein diet may help reduce liver load under medical supervision."
+        )
+
+    # Non-specific abnormal pattern
+    elif any(v is not None for v in [ast, ldh, bilirubin, bile_acids]):
+        PROFILER.branch("nonspecific_lft")
+        alert.append("Abnormal liver enzymes without definitive diagnostic pattern")
+        rec.append(
+            "Further evaluation may include testing for **Hepatitis B/C, autoimmune markers (ANA, AMA), and gallbladder ultrasound**."
+        )
+        rec.append(
+            "Referral to a hepatologist could be considered if abnormalities persist or worsen."
+        )
+        diet.append(
+            "Suggest maintaining a liver-friendly diet with foods like oats, turmeric, berries, and avoiding alcohol, red meat, processed snacks, and high-fat meals."
+        )
+
+    return rec, alert, diet
+
+
+# Report fields each rule reads, as (fields, required); see rules.engine
+RULE_INPUTS = {
+    rule_liver_dysfunction: (
+        ("bile_acids", "ast", "platelets", "ldh", "bilirubin", "glucose", "symptoms", "sysmptoms", "conditions"),
+        (),
+    ),
+}
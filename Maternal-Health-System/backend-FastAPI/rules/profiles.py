@@ -0,0 +1,169 @@
+import json
+import os
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict, List, Optional, Tuple
+
+from rules.engine import CONFIG, DEFAULT_PLAN, compile_plan
+
+# Per-facility threshold profiles for the rule engine.
+#
+# Every <name>.json file in RULE_PROFILES_DIR (default rule_profiles/) is a
+# profile:
+#   {"description": "...", "facilities": ["PHC-017", ...],
+#    "thresholds": {"tsh_first_tri": 3.0, "gdm_ogtt_1h": 190}}
+# Thresholds override CONFIG key by key; unknown keys and non-numeric values
+# are rejected. A profile is validated and compiled into a rule plan (see
+# rules.engine.compile_plan) once, when its file is loaded, so selecting a
+# profile per request is a dict lookup.
+#
+# The directory is rescanned at most every RULE_PROFILES_RELOAD_SECONDS
+# (default 2). Changed files are reloaded and the whole profile table is
+# swapped in one assignment; a file that fails validation keeps serving its
+# previous version and the error is reported by ProfileStore.status().
+
+DEFAULT_PROFILE = "default"
+
+# Pairs (lower, upper) that must stay ordered for the rules to make sense
+ORDERED_THRESHOLDS = [("ferritin_severe", "ferritin_mild")]
+
+
+class ProfileError(ValueError):
+    pass
+
+
+class RuleProfile:
+    def __init__(self, name: str, thresholds: Dict, description: str = "", facilities=(), mtime: float = 0.0):
+        self.name = name
+        self.description = description
+        self.facilities = tuple(facilities)
+        self.mtime = mtime
+        self.overrides = dict(thresholds)
+        self.config = MappingProxyType({**CONFIG, **thresholds})
+        self.plan = compile_plan(self.config) if thresholds else DEFAULT_PLAN
+
+    def summary(self) -> Dict:
+        return {
+            "description": self.description,
+            "facilities": list(self.facilities),
+            "overrides": self.overrides,
+            "loaded_mtime": self.mtime,
+        }
+
+
+def validate_profile(name: str, raw) -> Tuple[Dict, str, List[str]]:
+    if not isinstance(raw, dict):
+        raise ProfileError(f"profile '{name}' must be a JSON object")
+    thresholds = raw.get("thresholds", {})
+    if not isinstance(thresholds, dict):
+        raise ProfileError(f"profile '{name}': thresholds must be an object")
+    unknown = sorted(set(thresholds) - set(CONFIG))
+    if unknown:
+        raise ProfileError(f"profile '{name}': unknown thresholds {unknown}")
+    for key, value in thresholds.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value <= 0:
+            raise ProfileError(f"profile '{name}': {key} must be a positive number")
+    merged = {**CONFIG, **thresholds}
+    for lower, upper in ORDERED_THRESHOLDS:
+        if merged[lower] >= merged[upper]:
+            raise ProfileError(f"profile '{name}': {lower} must be below {upper}")
+    facilities = raw.get("facilities", [])
+    if not isinstance(facilities, list) or not all(isinstance(f, str) for f in facilities):
+        raise ProfileError(f"profile '{name}': facilities must be a list of strings")
+    return thresholds, str(raw.get("description", "")), facilities
+
+
+def load_profile(path: str) -> RuleProfile:
+    name = os.path.splitext(os.path.basename(path))[0]
+    mtime = os.stat(path).st_mtime
+    try:
+        with open(path) as f:
+            raw = json.load(f)
+    except ValueError as e:
+        raise ProfileError(f"profile '{name}': {e}")
+    thresholds, description, facilities = validate_profile(name, raw)
+    return RuleProfile(name, thresholds, description, facilities, mtime)
+
+
+class ProfileStore:
+    def __init__(self, directory: str, reload_seconds: float = 2.0):
+        self.directory = directory
+        self.reload_seconds = reload_seconds
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        self._mtimes: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        # (profiles by name, profile name by facility), replaced as a whole
+        self._table = ({DEFAULT_PROFILE: RuleProfile(DEFAULT_PROFILE, {})}, {})
+        self.reload()
+
+    def _scan(self) -> Dict[str, float]:
+        if not os.path.isdir(self.directory):
+            return {}
+        return {
+            entry.path: entry.stat().st_mtime
+            for entry in os.scandir(self.directory)
+            if entry.name.endswith(".json") and entry.is_file()
+        }
+
+    def reload(self, force: bool = False):
+        with self._lock:
+            self._checked = time.monotonic()
+            mtimes = self._scan()
+            if mtimes == self._mtimes and not force:
+                return
+            profiles, _ = self._table
+            errors = {}
+            loaded = {}
+            for path, mtime in mtimes.items():
+                name = os.path.splitext(os.path.basename(path))[0]
+                current = profiles.get(name)
+                if current is not None and current.mtime == mtime and not force:
+                    loaded[name] = current
+                    continue
+                try:
+                    loaded[name] = load_profile(path)
+                except (OSError, ProfileError) as e:
+                    errors[name] = str(e)
+                    if current is not None:
+                        loaded[name] = current
+            loaded.setdefault(DEFAULT_PROFILE, RuleProfile(DEFAULT_PROFILE, {}))
+            facilities = {}
+            for profile in loaded.values():
+                for facility in profile.facilities:
+                    facilities[facility] = profile.name
+            self._table = (loaded, facilities)
+            self._mtimes = mtimes
+            self.errors = errors
+
+    def _maybe_reload(self):
+        if time.monotonic() - self._checked >= self.reload_seconds:
+            self.reload()
+
+    def resolve(self, profile: Optional[str] = None, facility: Optional[str] = None) -> RuleProfile:
+        # An explicit profile wins over the facility mapping; unknown facilities
+        # use the default profile
+        self._maybe_reload()
+        profiles, facilities = self._table
+        if profile is not None:
+            if profile not in profiles:
+                raise ProfileError(f"unknown rule profile '{profile}'")
+            return profiles[profile]
+        return profiles[facilities.get(facility, DEFAULT_PROFILE)]
+
+    def status(self) -> Dict:
+        self._maybe_reload()
+        profiles, facilities = self._table
+        return {
+            "directory": self.directory,
+            "profiles": {name: p.summary() for name, p in sorted(profiles.items())},
+            "facilities": dict(sorted(facilities.items())),
+            "errors": self.errors,
+        }
+
+
+PROFILES = ProfileStore(
+    os.environ.get("RULE_PROFILES_DIR", "rule_profiles"),
+    float(os.environ.get("RULE_PROFILES_RELOAD_SECONDS", "2")),
+)
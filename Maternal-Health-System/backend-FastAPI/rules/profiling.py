@@ -0,0 +1,127 @@
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Opt-in, sampled instrumentation of the rule engine.
+#
+# When a report is sampled, get_recommendations runs every rule through
+# RuleProfiler.run, which records the call count, time spent, whether the
+# rule raised an alert, and every branch the rule marked with
+# PROFILER.branch(...). Branch marks outside a sampled call are a cheap no-op,
+# so the markers can stay in the rules permanently.
+#
+# RULE_PROFILE_SAMPLE_RATE (0.0 - 1.0, default 0) sets the initial sampling rate.
+
+
+def _new_rule_stats() -> Dict:
+    return {
+        "calls": 0,
+        "fired": 0,
+        "errors": 0,
+        "total_ns": 0,
+        "max_ns": 0,
+        "branches": {},
+        "early_returns": {},
+    }
+
+
+class RuleProfiler:
+    def __init__(self, sample_rate: float = 0.0):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.sample_rate = 0.0
+        self.set_sample_rate(sample_rate)
+        self._reports = 0
+        self._rules: Dict[str, Dict] = {}
+
+    def set_sample_rate(self, rate: float):
+        if not 0.0 <= rate <= 1.0:
+            raise ValueError("sample rate must be between 0 and 1")
+        self.sample_rate = rate
+
+    def should_sample(self) -> bool:
+        rate = self.sample_rate
+        return rate > 0.0 and (rate >= 1.0 or random.random() < rate)
+
+    def branch(self, label: str, early: bool = False):
+        trace = getattr(self._local, "trace", None)
+        if trace is not None:
+            trace.append((label, early))
+
+    def run(self, rule_fn: Callable, patient: Dict) -> Tuple[List[str], List[str], List[str]]:
+        trace: List[Tuple[str, bool]] = []
+        self._local.trace = trace
+        start = time.perf_counter_ns()
+        try:
+            result = rule_fn(patient)
+        except Exception:
+            self._record(rule_fn.__name__, time.perf_counter_ns() - start, None, trace)
+            raise
+        finally:
+            self._local.trace = None
+        self._record(rule_fn.__name__, time.perf_counter_ns() - start, bool(result[1]), trace)
+        return result
+
+    def count_report(self):
+        with self._lock:
+            self._reports += 1
+
+    def _record(self, name: str, elapsed: int, fired: Optional[bool], trace):
+        with self._lock:
+            stats = self._rules.get(name)
+            if stats is None:
+                stats = self._rules[name] = _new_rule_stats()
+            stats["calls"] += 1
+            stats["total_ns"] += elapsed
+            stats["max_ns"] = max(stats["max_ns"], elapsed)
+            if fired is None:
+                stats["errors"] += 1
+            elif fired:
+                stats["fired"] += 1
+            for label, early in trace:
+                counts = stats["early_returns"] if early else stats["branches"]
+                counts[label] = counts.get(label, 0) + 1
+
+    def snapshot(self, reset: bool = False) -> Dict:
+        # Counters are copied under the lock (recording threads keep updating
+        # them) and formatted outside it
+        with self._lock:
+            rules = {
+                name: {
+                    **stats,
+                    "branches": dict(stats["branches"]),
+                    "early_returns": dict(stats["early_returns"]),
+                }
+                for name, stats in self._rules.items()
+            }
+            reports = self._reports
+            if reset:
+                self._rules = {}
+                self._reports = 0
+
+        out = {}
+        for name, stats in rules.items():
+            calls = stats["calls"]
+            out[name] = {
+                "calls": calls,
+                "fired": stats["fired"],
+                "fire_rate": round(stats["fired"] / calls, 4) if calls else 0.0,
+                "errors": stats["errors"],
+                "total_ms": round(stats["total_ns"] / 1e6, 3),
+                "mean_us": round(stats["total_ns"] / calls / 1e3, 3) if calls else 0.0,
+                "max_us": round(stats["max_ns"] / 1e3, 3),
+                "branches": stats["branches"],
+                "early_returns": stats["early_returns"],
+            }
+        # Slowest rules first: these are the candidates for optimisation
+        ordered = dict(sorted(out.items(), key=lambda kv: kv[1]["total_ms"], reverse=True))
+        return {
+            "sample_rate": self.sample_rate,
+            "sampled_reports": reports,
+            "rules": ordered,
+        }
+
+
+PROFILER = RuleProfiler(float(os.environ.get("RULE_PROFILE_SAMPLE_RATE", "0")))
@@ -0,0 +1,82 @@
+from typing import Dict, List, Tuple
+
+from rules.config import CONFIG
+from rules.profiling import PROFILER
+
+# Thyroid function by trimester rules (registered in rules.engine.RULE_REGISTRY)
+
+
+def rule_thyroid(p: Dict, cfg: Dict = CONFIG) -> Tuple[List[str], List[str], List[str]]:
+    rec, alert, diet = [], [], []
+    tsh_values = {"1st": p.get("tsh_1"), "2nd": p.get("tsh_2"), "3rd": p.get("tsh_3")}
+
+    ft4 = p.get("ft4")  # Free T4 (ng/dL)
+    tpo_ab = p.get("tpo_ab")  # True if positive
+
+    # Screening using trimester-specific TSH
+    flagged = False
+    for tri, val in tsh_values.items():
+        if val is None:
+            continue
+        if tri == "1st" and val > cfg["tsh_first_tri"]:
+            alert.append(f"TSH elevated in 1st trimester: {val} mIU/L")
+            flagged = True
+        elif tri in ("2nd", "3rd") and val > cfg["tsh_second_third"]:
+            alert.append(f"TSH elevated in {tri} trimester: {val} mIU/L")
+            flagged = True
+
+    # Confirmatory logic if TSH was high in any trimester
+    if flagged:
+        PROFILER.branch("tsh_elevated")
+        if ft4 is not None and ft4 < 0.8:
+            PROFILER.branch("ft4_low")
+            alert.append("FT4 low – Overt hypothyroidism")
+            rec.append(
+                "Overt hypothyroidism is confirmed by elevated TSH and low FT4. "
+            )
+            rec.append(
+                "Start Levothyroxine under medical supervision. Dosage adjustments may be required during pregnancy."
+            )
+            diet.append(
+                "Include iodine-rich foods such as iodized salt, dairy products, and eggs. "
+            )
+            diet.append(
+                "Ensure adequate selenium and zinc intake. Avoid soy-based products as they can interfere with hormone absorption."
+            )
+
+        elif ft4 is not None and ft4 >= 0.8 and tpo_ab is True:
+            PROFILER.branch("tpo_ab_positive")
+            alert.append(
+                "FT4 normal but TPO-Ab positive – Subclinical autoimmune hypothyroidism"
+            )
+            rec.append(
+                "TSH is elevated with normal FT4 and positive TPO antibodies, indicating subclinical autoimmune hypothyroidism. "
+            )
+            rec.append(
+                "Specialist consultation is recommended. Levothyroxine may be initiated depending on clinical judgement."
+            )
+            diet.append(
+                "Consume iodine-rich foods in moderation. Include selenium-rich foods like Brazil nuts and fish. "
+            )
+            diet.append("Avoid raw cruciferous vegetables and soy products.")
+
+        elif ft4 is None:
+            PROFILER.branch("ft4_missing")
+            rec.append(
+                "TSH levels are elevated but FT4 is not available. Order FT4 and TPO-Ab tests to confirm diagnosis. "
+            )
+            rec.append(
+                "Treatment decisions should be made after full thyroid panel results."
+            )
+            diet.append(
+                "Maintain a balanced diet with adequate iodine from dietary sources (e.g., dairy, eggs, seafood). "
+            )
+            diet.append("Avoid excessive soy intake until diagnosis is confirmed.")
+
+    return rec, alert, diet
+
+
+# Report fields each rule reads, as (fields, required); see rules.engine
+RULE_INPUTS = {
+    rule_thyroid: (("tsh_1", "tsh_2", "tsh_3"), ()),
+}
@@ -0,0 +1,217 @@
+from typing import Dict, List, Tuple
+
+from rules.config import CONFIG
+from rules.profiling import PROFILER
+
+# Gestational weight gain and BMI rules (registered in rules.engine.RULE_REGISTRY)
+
+
+def rule_low_weight_gain(p: Dict, cfg: Dict = CONFIG) -> Tuple[List[str], List[str], List[str]]:
+    rec, alert, diet = [], [], []
+
+    gestational_age_weeks = p.get("gestational_age_weeks")
+    current_weight = p.get("current_weight")
+    pre_pregnancy_weight = p.get("pre_pregnancy_weight")
+    bmi = p.get("bmi")
+    if (
+        current_weight is None
+        or pre_pregnancy_weight is None
+        or gestational_age_weeks is None
+        or bmi is None
+    ):
+        PROFILER.branch("missing_weight_inputs", early=True)
+        return rec, alert, diet
+    weight_gain = current_weight - pre_pregnancy_weight
+
+    if 13 < gestational_age_weeks < 40:
+        weeks = gestational_age_weeks - 13
+        if weeks <= 0:
+            PROFILER.branch("non_positive_weeks", early=True)
+            return rec, alert, diet
+        weekly_gain = (
+            weight_gain / weeks
+        )  # since we start recording from second trimester
+
+        if bmi < 18.5 and weekly_gain < 0.5:
+            PROFILER.branch("low_gain_underweight")
+            alert.append(f"Low weight gain: {weekly_gain:.1f} kg")
+            rec.append(
+                "Frequent calorie-dense, nutrient-rich meals and addressing underlying issues (nausea, infections) may help. "
+            )
+            rec.append("Referral to a dietician or supplementation might be warranted.")
+            diet.append(
+                "High-protein, high-calorie foods like peanut butter, nuts, ghee, milkshakes, and eggs may help support healthy weight gain. "
+            )
+            diet.append(
+                "Small, frequent meals and snacks (e.g., laddoos, dry fruits, paneer) can be useful. "
+            )
+            diet.append(
+                "Ensure iron and folate intake is adequate. Avoid skipping meals."
+            )
+        elif 18.5 <= bmi < 25 and weekly_gain < 0.4:
+            PROFILER.branch("low_gain_normal_weight")
+            alert.append(f"Low weight gain: {weekly_gain:.1f} kg")
+            rec.append(
+                "Frequent calorie-dense, nutrient-rich meals and addressing underlying issues (nausea, infections) may help. "
+            )
+            rec.append("Referral to a dietician or supplementation might be warranted.")
+            diet.append(
+                "High-protein, high-calorie foods like peanut butter, nuts, ghee, milkshakes, and eggs may help support healthy weight gain. "
+            )
+            diet.append(
+                "Small, frequent meals and snacks (e.g., laddoos, dry fruits, paneer) can be useful. "
+            )
+            diet.append(
+                "Ensure iron and folate intake is adequate. Avoid skipping meals."
+            )
+        elif 25 <= bmi < 30 and weekly_gain < 0.3:
+            PROFILER.branch("low_gain_overweight")
+            alert.append(f"Low weight gain: {weekly_gain:.1f} kg")
+            rec.append(
+                "Frequent calorie-dense, nutrient-rich meals and addressing underlying issues (nausea, infections) may help. "
+            )
+            rec.append("Referral to a dietician or supplementation might be warranted.")
+            diet.append(
+                "High-protein, high-calorie foods like peanut butter, nuts, ghee, milkshakes, and eggs may help support healthy weight gain. "
+            )
+            diet.append(
+                "Small, frequent meals and snacks (e.g., laddoos, dry fruits, paneer) can be useful. "
+            )
+            diet.append(
+                "Ensure iron and folate intake is adequate. Avoid skipping meals."
+            )
+        elif bmi >= 30 and weekly_gain < 0.2:
+            PROFILER.branch("low_gain_obese")
+            alert.append(f"Low weight gain: {weekly_gain:.1f} kg")
+            rec.append(
+                "Frequent calorie-dense, nutrient-rich meals and addressing underlying issues (nausea, infections) may help. "
+            )
+            rec.append("Referral to a dietician or supplementation might be warranted.")
+            diet.append(
+                "High-protein, high-calorie foods like peanut butter, nuts, ghee, milkshakes, and eggs may help support healthy weight gain. "
+            )
+            diet.append(
+                "Small, frequent meals and snacks (e.g., laddoos, dry fruits, paneer) can be useful. "
+            )
+            diet.append(
+                "Ensure iron and folate intake is adequate. Avoid skipping meals."
+            )
+
+    return rec, alert, diet
+
+
+def rule_obesity(p: Dict, cfg: Dict = CONFIG) -> Tuple[List[str], List[str], List[str]]:
+    rec, alert, diet = [], [], []
+    bmi = p.get("bmi")
+    gestational_age_weeks = p.get("gestational_age_weeks")
+    current_weight = p.get("current_weight")
+    pre_pregnancy_weight = p.get("pre_pregnancy_weight")
+    if bmi is not None:
+        if bmi >= 30:
+            PROFILER.branch("obese")
+            alert.append("Obese pregnancy – GDM/HTN risk ↑, monitor fetal size")
+            rec.append(
+                "BMI ≥ 30 suggests obesity, which may elevate the risk of gestational diabetes, hypertensive disorders, "
+            )
+            rec.append(
+                "and delivery complications such as cesarean section. Regular fetal growth monitoring and maternal vitals "
+            )
+            rec.append(
+                "could be considered. Suggest setting personalized weight gain goals with dietary and physical activity support."
+            )
+            diet.append(
+                "Encourage structured meal timing, whole grains, seasonal fruits, and adequate protein intake. "
+            )
+            diet.append(
+                "Avoid sugary or refined-carb-rich snacks. A food diary may help in identifying excess caloric intake. "
+            )
+            diet.append("Gentle physical activity may support weight management.")
+
+        elif bmi >= 25:
+            PROFILER.branch("overweight")
+            alert.append("Overweight – recommend diet + controlled weight gain")
+            rec.append(
+                "A structured meal plan and monitoring of weight gain trends could help maintain optimal maternal and fetal outcomes."
+            )
+            diet.append(
+                "Encourage whole foods, fresh fruits, and vegetables; prefer grilled or boiled options over fried items. "
+            )
+            diet.append(
+                "Incorporate balanced portions of complex carbs (e.g., millet, barley), proteins (dal, paneer), and healthy fats (nuts, seeds). "
+            )
+            diet.append(
+                "Avoid added sugars and fast food. Moderate exercise, such as walking or prenatal stretching, can be beneficial."
+            )
+
+    if (
+        gestational_age_weeks is not None
+        and current_weight is not None
+        and pre_pregnancy_weight is not None
+        and bmi is not None
+    ):
+        weight_gain = current_weight - pre_pregnancy_weight
+        if 13 < gestational_age_weeks < 40:
+            weeks = gestational_age_weeks - 13
+            if weeks <= 0:
+                PROFILER.branch("non_positive_weeks", early=True)
+                return rec, alert, diet
+            weekly_gain = weight_gain / weeks
+
+            if bmi < 25.0 and weekly_gain > 0.5:
+                PROFILER.branch("excess_gain_normal_weight")
+                alert.append(f"Excessive weight gain: {weekly_gain:.1f} kg")
+                rec.append(
+                    "Observed weekly weight gain > 0.5 kg in a normal BMI pregnancy. Suggest reviewing nutrition, "
+                )
+                rec.append(
+                    "activity pattern, and ensuring caloric intake is in line with trimester-specific needs."
+                )
+                diet.append(
+                    "Encourage structured meal timing, whole grains, seasonal fruits, and adequate protein intake. "
+                )
+                diet.append(
+                    "Avoid sugary or refined-carb-rich snacks. A food diary may help in identifying excess caloric intake. "
+                )
+                diet.append("Gentle physical activity may support weight management.")
+
+            elif 25.0 <= bmi < 30.0 and weekly_gain > 0.4:
+                PROFILER.branch("excess_gain_overweight")
+                alert.append(f"Excessive weight gain: {weekly_gain:.1f} kg")
+                rec.append(
+                    "Observed weekly weight gain > 0.4 kg in an overweight pregnancy. This may increase maternal-fetal risk. "
+                )
+                rec.append(
+                    "A structured approach to nutrition and physical activity may help mitigate excessive gain."
+                )
+                diet.append(
+                    "Advise meal planning with portion control, nutrient-dense foods (e.g., dals, lentils, non-starchy vegetables), "
+                )
+                diet.append(
+                    "and avoiding high-fat, high-sugar snacks. Hydration and light exercise like walking are recommended."
+                )
+
+            elif bmi >= 30.0 and weekly_gain > 0.3:
+                PROFILER.branch("excess_gain_obese")
+                alert.append(f"Excessive weight gain: {weekly_gain:.1f} kg")
+                rec.append(
+                    "Observed weekly weight gain > 0.3 kg in an obese pregnancy. Suggest reviewing calorie intake and promoting physical activity, "
+                )
+                rec.append(
+                    "as sustained excess weight gain may increase pregnancy and delivery-related complications."
+                )
+                diet.append(
+                    "Recommend high-satiety, low-calorie meals with complex carbohydrates, proteins, and steamed vegetables. "
+                )
+                diet.append(
+                    "Avoid late-night snacking, sugar-sweetened beverages, and processed snacks. "
+                )
+                diet.append("Supervised physical activity may support better outcomes.")
+
+    return rec, alert, diet
+
+
+# Report fields each rule reads, as (fields, required); see rules.engine
+RULE_INPUTS = {
+    rule_low_weight_gain: ((), ("gestational_age_weeks", "current_weight", "pre_pregnancy_weight", "bmi")),
+    rule_obesity: ((), ("bmi",)),
+}
@@ -0,0 +1,117 @@
+import os
+from typing import Dict, Optional
+
+import numpy as np
+from pydantic import BaseModel
+
+from risk_prediction_apis import PREG_FEATURES, RiskInputData, format_prediction, predict_preg_proba
+
+# What-if sensitivity of the pregnancy risk prediction.
+#
+# For each requested feature the patient's row is repeated once per grid value
+# with only that feature changed (one at a time, the other features stay at
+# the patient's values). All rows of all features, plus the unchanged row, go
+# through the ensemble as one matrix in a single batched soft vote, so the
+# cost is one /predict_preg/batch call of a few hundred rows.
+#
+# Per feature the response has the risk curve (class probabilities and
+# predicted class at every grid value), the transitions where the predicted
+# class changes between neighbouring grid values, and the grid value closest
+# to the patient's own value that gives a lower class than the patient's
+# (e.g. how far systolic BP would need to drop to leave the high-risk class).
+#
+# SENSITIVITY_MAX_POINTS (default 2000) bounds the grid size of one request.
+
+# Features varied, and their ranges, when a request names none
+DEFAULT_RANGES = {
+    "systolic": (90, 170),
+    "diastolic": (60, 110),
+    "bs": (4, 15),
+    "bmi": (17, 40),
+    "heart_rate": (60, 110),
+    "body_temp": (97, 103),
+}
+DEFAULT_STEPS = 41
+MAX_STEPS = 500
+SENSITIVITY_MAX_POINTS = int(os.environ.get("SENSITIVITY_MAX_POINTS", "2000"))
+
+
+class FeatureRange(BaseModel):
+    min: float
+    max: float
+    steps: int = DEFAULT_STEPS
+
+
+class SensitivityInput(BaseModel):
+    data: RiskInputData
+    ranges: Optional[Dict[str, FeatureRange]] = None
+
+
+def feature_grids(ranges: Optional[Dict[str, FeatureRange]]) -> Dict[str, np.ndarray]:
+    # Raises ValueError for unknown features, empty ranges or too many points
+    if not ranges:
+        ranges = {f: FeatureRange(min=lo, max=hi) for f, (lo, hi) in DEFAULT_RANGES.items()}
+    unknown = sorted(set(ranges) - set(PREG_FEATURES))
+    if unknown:
+        raise ValueError(f"unknown features {unknown}, expected some of {PREG_FEATURES}")
+    grids = {}
+    for feature, r in ranges.items():
+        if not (np.isfinite(r.min) and np.isfinite(r.max)) or r.min > r.max:
+            raise ValueError(f"{feature}: min must be a number not above max")
+        if not 2 <= r.steps <= MAX_STEPS:
+            raise ValueError(f"{feature}: steps must be between 2 and {MAX_STEPS}")
+        grids[feature] = np.linspace(r.min, r.max, r.steps)
+    points = sum(len(grid) for grid in grids.values())
+    if points > SENSITIVITY_MAX_POINTS:
+        raise ValueError(f"{points} grid points requested, at most {SENSITIVITY_MAX_POINTS} allowed")
+    return grids
+
+
+def perturbation_matrix(base: np.ndarray, grids: Dict[str, np.ndarray]) -> np.ndarray:
+    # Row 0 is the patient; then one block of rows per feature, in grid order
+    sizes = [len(grid) for grid in grids.values()]
+    X = np.repeat(base[None, :], 1 + sum(sizes), axis=0)
+    start = 1
+    for (feature, grid), size in zip(grids.items(), sizes):
+        X[start:start + size, PREG_FEATURES.index(feature)] = grid
+        start += size
+    return X
+
+
+def feature_curve(grid: np.ndarray, proba: np.ndarray, own_value: float, own_class: int) -> Dict:
+    classes = proba.argmax(1)
+    changes = np.flatnonzero(classes[1:] != classes[:-1])
+    lower = np.flatnonzero(classes < own_class)
+    nearest = lower[np.argmin(np.abs(grid[lower] - own_value))] if len(lower) else None
+    return {
+        "values": np.round(grid, 4).tolist(),
+        "probabilities": {f"Class_{k}": np.round(proba[:, k], 4).tolist() for k in range(proba.shape[1])},
+        "classes": classes.tolist(),
+        "transitions": [
+            {
+                "from_value": round(float(grid[i]), 4),
+                "to_value": round(float(grid[i + 1]), 4),
+                "from_class": int(classes[i]),
+                "to_class": int(classes[i + 1]),
+            }
+            for i in changes
+        ],
+        "nearest_lower_risk_value": None if nearest is None else round(float(grid[nearest]), 4),
+    }
+
+
+def sensitivity(data: RiskInputData, ranges: Optional[Dict[str, FeatureRange]] = None) -> Dict:
+    grids = feature_grids(ranges)
+    base = np.array([getattr(data, f) for f in PREG_FEATURES], dtype=float)
+    proba = predict_preg_proba(perturbation_matrix(base, grids))
+    baseline = format_prediction(proba[0])
+    own_class = baseline["EnsemblePrediction"]
+    curves, start = {}, 1
+    for feature, grid in grids.items():
+        block = proba[start:start + len(grid)]
+        start += len(grid)
+        curves[feature] = {
+            "current_value": getattr(data, feature),
+            **feature_curve(grid, block, getattr(data, feature), own_class),
+        }
+    return {"baseline": baseline, "grid_points": start - 1, "features": curves}
@@ -0,0 +1,153 @@
+# Multi-worker launcher that shares one copy of the models across workers.
+#
+# `uvicorn --workers N` starts N fresh interpreters, each unpickling every
+# model. Here the master imports the app once (loading the models, explainer
+# path tables and rule profiles), scores a row through each ensemble so lazy
+# state is built, moves everything it created into the permanent GC
+# generation with gc.freeze() and only then forks the workers. The workers
+# inherit the model arrays copy-on-write; because the collector no longer
+# walks the frozen objects, it does not write to their pages, and the large
+# array buffers stay shared.
+#
+# Run from the backend-FastAPI directory:
+#   python serve.py --workers 4 --port 8000
+# The master logs per-worker unique/shared memory after startup and whenever
+# it receives SIGUSR1; each worker reports its own at GET /debug/memory.
+#
+# Each worker's model thread pools get an equal share of the cores
+# (see thread_budget.py; --threads-per-worker overrides it), and --pin-cpus
+# binds every worker to its own cores. GET /debug/threads shows the result.
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+
+import numpy as np
+import uvicorn
+
+from monitoring.memory import memory_table, memory_usage
+
+
+def warm_up():
+    from risk_prediction_apis import PREG_FEATURES, FETAL_FEATURES, predict_preg_proba, predict_fetal_proba
+    from rules.engine import get_recommendations
+
+    predict_preg_proba(np.ones((1, len(PREG_FEATURES))))
+    predict_fetal_proba(np.ones((1, len(FETAL_FEATURES))))
+    get_recommendations({})
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket, log_level: str, budget, index: int, pin_cpus: bool):
+    for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGUSR1, signal.SIGALRM):
+        signal.signal(sig, signal.SIG_DFL)
+    # Thread pools are not inherited across fork; size them again in the worker
+    if pin_cpus:
+        budget.pin(index)
+    budget.apply()
+    config = uvicorn.Config(app, log_level=log_level)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def log_memory(workers):
+    master = memory_usage()
+    table = memory_table(workers)
+    if master is None:
+        print("[serve] memory accounting needs /proc/<pid>/smaps_rollup", flush=True)
+        return
+    print(f"[serve] master  pid {master['pid']}: rss {master['rss_mb']} MB", flush=True)
+    for usage in table:
+        print(
+            f"[serve] worker pid {usage['pid']}: unique {usage['unique_mb']} MB,"
+            f" shared {usage['shared_mb']} MB, pss {usage['pss_mb']} MB",
+            flush=True,
+        )
+    total = master["pss_mb"] + sum(u["pss_mb"] for u in table)
+    print(f"[serve] total pss {round(total, 1)} MB for {len(table)} workers", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the API from forked workers sharing preloaded models")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--memory-report-after", type=int, default=10, help="seconds; 0 disables")
+    parser.add_argument("--threads-per-worker", type=int, help="default: available cores // workers")
+    parser.add_argument("--pin-cpus", action="store_true", help="bind each worker to its own cores")
+    args = parser.parse_args()
+
+    # The budget is read when main is imported
+    os.environ["THREAD_BUDGET_WORKERS"] = str(args.workers)
+    if args.threads_per_worker:
+        os.environ["THREADS_PER_WORKER"] = str(args.threads_per_worker)
+    from thread_budget import THREAD_BUDGET
+
+    THREAD_BUDGET.export_env()
+    import main as api
+
+    warm_up()
+    gc.collect()
+    gc.freeze()
+    sock = bind_socket(args.host, args.port)
+
+    workers = {}
+    stopping = False
+
+    def spawn(index):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                run_worker(api.app, sock, args.log_level, THREAD_BUDGET, index, args.pin_cpus)
+            finally:
+                os._exit(0)
+        workers[pid] = index
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGUSR1, lambda signum, frame: log_memory(list(workers)))
+    signal.signal(signal.SIGALRM, lambda signum, frame: log_memory(list(workers)))
+
+    for index in range(args.workers):
+        spawn(index)
+    print(
+        f"[serve] {args.workers} workers on {args.host}:{args.port} (master pid {os.getpid()}),"
+        f" {THREAD_BUDGET.threads} threads each{' pinned' if args.pin_cpus else ''}",
+        flush=True,
+    )
+    if args.memory_report_after > 0:
+        signal.alarm(args.memory_report_after)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        index = workers.pop(pid, None)
+        if not stopping and index is not None:
+            print(f"[serve] worker {pid} exited with status {status}; restarting", flush=True)
+            spawn(index)
+    sock.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Optional
+
+# In-flight request coalescing. While one computation for a key is running,
+# identical requests wait for it and share its result (or its exception).
+# Nothing is kept once the computation finishes: this is not a result cache.
+#
+# The shared result object is handed to every waiter, so callers must treat
+# it as read-only. A waiter with a timeout stops waiting after it and gets
+# FlightTimeout; the computation carries on for the others.
+
+
+def payload_key(payload: Any) -> str:
+    # Canonical hash of a JSON-compatible payload: key order and whitespace
+    # do not matter.
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class FlightTimeout(TimeoutError):
+    pass
+
+
+class _Call:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._executed = 0
+        self._coalesced = 0
+        self._errors = 0
+        self._timeouts = 0
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        # timeout (seconds) bounds the wait of a coalesced caller; the leader
+        # always runs fn to completion
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._executed += 1
+            else:
+                call.waiters += 1
+                self._coalesced += 1
+
+        if not leader:
+            if not call.done.wait(timeout):
+                with self._lock:
+                    self._timeouts += 1
+                raise FlightTimeout(f"no result for {key} within {timeout:.3f}s")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            with self._lock:
+                self._errors += 1
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "executed": self._executed,
+                "coalesced": self._coalesced,
+                "errors": self._errors,
+                "timeouts": self._timeouts,
+                "in_flight": len(self._calls),
+            }
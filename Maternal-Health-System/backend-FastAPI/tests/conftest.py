@@ -0,0 +1,66 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import joblib
+import numpy as np
+import pandas as pd
+
+# Tests import the backend modules the way main.py does; run from the
+# backend-FastAPI directory:
+#   python -m pytest tests
+# risk_prediction_apis loads the ensembles from MODEL_DIR when first imported.
+# Without MODEL_DIR, small stand-in models of the same types (random forest,
+# XGBoost, scaled MLP; three classes, the real feature lists) are trained into
+# a temporary directory, so the suite does not need the real model files. Set
+# MODEL_DIR to test against the real ones.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PREG_FEATURES = ["age", "systolic", "diastolic", "bs", "bmi", "heart_rate", "body_temp", "previous_complications"]
+N_FETAL_FEATURES = 21
+
+_stand_in_dir = None
+
+
+def _stand_in_members(X, y):
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.neural_network import MLPClassifier
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+    from xgboost import XGBClassifier
+
+    return (
+        RandomForestClassifier(n_estimators=5, max_depth=4, random_state=0).fit(X, y),
+        XGBClassifier(n_estimators=5, max_depth=3, random_state=0).fit(X, y),
+        Pipeline([("scaler", StandardScaler()), ("mlp", MLPClassifier((8,), max_iter=300, random_state=0))]).fit(X, y),
+    )
+
+
+def write_stand_in_models(directory: str):
+    rng = np.random.default_rng(0)
+    y = np.arange(300) % 3
+    # Pregnancy models are fit on named columns, fetal ones on plain arrays,
+    # as in training
+    preg = pd.DataFrame(rng.normal(size=(300, len(PREG_FEATURES))) + y[:, None], columns=PREG_FEATURES)
+    fetal = rng.normal(size=(300, N_FETAL_FEATURES)) + y[:, None]
+    for files, X in (
+        (("rfm.pkl", "xgb.pkl", "mlp.pkl"), preg),
+        (("rfm_fetal.pkl", "xgb_fetal.pkl", "mlp_fetal.pkl"), fetal),
+    ):
+        for name, model in zip(files, _stand_in_members(X, y)):
+            joblib.dump(model, os.path.join(directory, name))
+
+
+def pytest_configure(config):
+    global _stand_in_dir
+    if os.environ.get("MODEL_DIR"):
+        return
+    _stand_in_dir = tempfile.mkdtemp(prefix="stand-in-models-")
+    write_stand_in_models(_stand_in_dir)
+    os.environ["MODEL_DIR"] = _stand_in_dir
+
+
+def pytest_unconfigure(config):
+    if _stand_in_dir is not None:
+        shutil.rmtree(_stand_in_dir, ignore_errors=True)
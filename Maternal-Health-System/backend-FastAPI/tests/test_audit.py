@@ -0,0 +1,80 @@
+import os
+import stat
+
+import numpy as np
+
+import audit
+from audit import AuditLog
+
+
+def _segments(directory):
+    return sorted(os.listdir(directory))
+
+
+def test_records_are_written_and_queried(tmp_path):
+    log = AuditLog(str(tmp_path), flush_seconds=0.01)
+    log.record("predict_preg", {"age": 30}, {"probabilities": np.array([[0.2, 0.8]])}, {"models": "v1"}, "P1")
+    log.record("analyze", {}, {}, {}, "P2")
+    log.close()
+    entries = list(audit.query(str(tmp_path), pregnancy_id="P1"))
+    assert len(entries) == 1
+    assert entries[0]["output"] == {"probabilities": [[0.2, 0.8]]}
+    assert entries[0]["pid"] == os.getpid()
+
+
+def test_segments_roll_over_by_size_and_are_closed_read_only(tmp_path):
+    log = AuditLog(str(tmp_path), batch_size=1, flush_seconds=0.01, segment_bytes=1)
+    for i in range(3):
+        log.record("analyze", {"i": i}, {}, {})
+    log.close()
+    names = _segments(tmp_path)
+    assert len(names) == 3
+    for name in names:
+        assert audit.SEGMENT_PATTERN.match(name) and "-open-" not in name
+        assert not os.stat(tmp_path / name).st_mode & stat.S_IWUSR
+    assert [e["input"]["i"] for e in audit.query(str(tmp_path))] == [0, 1, 2]
+
+
+def test_segments_roll_over_by_age(tmp_path):
+    log = AuditLog(str(tmp_path), batch_size=1, flush_seconds=0.01, segment_seconds=0)
+    for i in range(2):
+        log.record("analyze", {"i": i}, {}, {})
+    log.close()
+    assert len(_segments(tmp_path)) == 2
+
+
+def test_forked_child_writes_only_its_own_records(tmp_path):
+    # The parent's record is still queued at fork time: only the parent writes it
+    log = AuditLog(str(tmp_path), flush_seconds=60)
+    log.record("parent", {}, {}, {})
+    pid = os.fork()
+    if pid == 0:
+        try:
+            log.record("child", {}, {}, {})
+            log.close()
+        finally:
+            os._exit(0)
+    _, status = os.waitpid(pid, 0)
+    assert status == 0
+    log.record("parent_after_fork", {}, {}, {})
+    log.close()
+    entries = list(audit.query(str(tmp_path)))
+    assert sorted(e["route"] for e in entries) == ["child", "parent", "parent_after_fork"]
+    by_route = {e["route"]: e["pid"] for e in entries}
+    assert by_route["child"] == pid
+    assert by_route["parent"] == by_route["parent_after_fork"] == os.getpid()
+
+
+def test_full_queue_drops_and_counts(tmp_path):
+    log = AuditLog(str(tmp_path), max_queue=2, flush_seconds=60)
+    for _ in range(3):
+        log.record("analyze", {}, {}, {})
+    assert log.stats()["dropped"] == 1
+    log.close()
+    assert len(list(audit.query(str(tmp_path)))) == 2
+
+
+def test_disabled_log_records_nothing():
+    log = AuditLog(None)
+    log.record("analyze", {}, {}, {})
+    assert log.stats()["queued"] == 0
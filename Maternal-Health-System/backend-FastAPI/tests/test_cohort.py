@@ -0,0 +1,45 @@
+import multiprocessing
+
+from cohort import CohortAggregator, CohortRegistry
+
+
+def _report(weeks, sbp):
+    return {"gestational_age_weeks": weeks, "report": {"sbp": sbp, "dbp": 95.0}}
+
+
+def _add_from_process(path, n):
+    registry = CohortRegistry(path)
+    for _ in range(n):
+        registry.add_reports("c", [_report(30, 150)])
+
+
+def test_state_round_trip():
+    aggregator = CohortAggregator()
+    aggregator.add_reports([_report(10, 150), _report(None, 120)])
+    restored = CohortAggregator.from_state(aggregator.state())
+    assert restored.summary() == aggregator.summary()
+
+
+def test_shared_store_sums_every_process(tmp_path):
+    path = str(tmp_path / "cohorts.sqlite")
+    registry = CohortRegistry(path)
+    ctx = multiprocessing.get_context("fork")
+    processes = [ctx.Process(target=_add_from_process, args=(path, 10)) for _ in range(3)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+        assert p.exitcode == 0
+    summary = registry.summary("c")
+    assert summary["reports"] == 30
+    assert summary["by_gestational_age"]["28-36"]["reports"] == 30
+    assert registry.ids() == ["c"]
+    assert registry.remove("c")
+    assert registry.summary("c") is None
+
+
+def test_memory_registry():
+    registry = CohortRegistry()
+    assert registry.add_reports("c", [_report(40, 150)]) == 1
+    assert registry.summary("c")["by_gestational_age"][">=37"]["reports"] == 1
+    assert registry.summary("missing") is None
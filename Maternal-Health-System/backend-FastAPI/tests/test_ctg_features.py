@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+
+from ctg.features import TraceError, extract_features
+
+
+def test_fractional_sampling_rate_is_rejected():
+    fhr = np.full(600, 140.0)
+    for rate in (0.5, 2.5, float("nan"), float("inf")):
+        with pytest.raises(TraceError):
+            extract_features(fhr, sampling_rate_hz=rate)
+
+
+def test_duration_follows_sampling_rate():
+    # Five minutes of signal at 1 Hz and at 4 Hz give the same features
+    minutes = 5
+    slow = 140 + 10 * np.sin(np.arange(60 * minutes) / 10)
+    fast = np.repeat(slow, 4)
+    assert extract_features(slow, sampling_rate_hz=1) == extract_features(fast, sampling_rate_hz=4.0)
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from ctg.features import TraceError
+from ctg.live import CTG_MAX_WINDOW_SECONDS, UC_MAX, LiveCTGFeatures, LiveCTGSession
+
+
+def _run_past_window(uc_value: float) -> LiveCTGFeatures:
+    state = LiveCTGFeatures(sampling_rate_hz=4.0, window_seconds=60)
+    fhr = np.full(4 * 150, 140.0)
+    uc = np.full(len(fhr), uc_value)
+    for start in range(0, len(fhr), 40):
+        state.push(fhr[start:start + 40], uc[start:start + 40])
+    return state
+
+
+def test_uc_above_range_survives_window_wrap():
+    state = _run_past_window(300.0)
+    assert state.uc_hist.min() >= 0
+    assert state.uc_hist[UC_MAX] == state.seconds
+    assert state.features() is not None
+
+
+def test_uc_below_range_survives_window_wrap():
+    state = _run_past_window(-5.0)
+    assert state.uc_hist.min() >= 0
+    assert state.uc_hist[0] == state.seconds
+    assert state.uc_hist[1:].sum() == 0
+    assert state.features() is not None
+
+
+def test_fractional_sampling_rate_is_rejected():
+    for rate in (0.5, 2.5, float("nan"), float("inf")):
+        with pytest.raises(TraceError):
+            LiveCTGFeatures(sampling_rate_hz=rate)
+
+
+def test_session_sizes_are_bounded():
+    for window in (0, 59, CTG_MAX_WINDOW_SECONDS + 1, 10 ** 9):
+        with pytest.raises(TraceError):
+            LiveCTGFeatures(window_seconds=window)
+    for every in (0, -1, 601):
+        with pytest.raises(TraceError):
+            LiveCTGSession("s", window_seconds=600, predict_every_seconds=every)
@@ -0,0 +1,51 @@
+import time
+
+import numpy as np
+
+from deadlines import Deadline, DeadlineVoter
+
+
+class Member:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+
+    def predict_proba(self, X):
+        self.calls += 1
+        time.sleep(self.delay)
+        return np.array([[0.5, 0.5]])
+
+
+def test_full_vote_when_members_fit():
+    voter = DeadlineVoter(["rf", "xgb"], [Member(), Member()])
+    proba, used = voter.vote(None, Deadline(1000))
+    assert used == ["rf", "xgb"]
+    assert proba.tolist() == [[0.5, 0.5]]
+
+
+def test_member_over_budget_is_skipped():
+    voter = DeadlineVoter(["rf", "xgb"], [Member(), Member(0.05)])
+    voter.vote(None, Deadline(1000))
+    _, used = voter.vote(None, Deadline(10))
+    assert used == ["rf"]
+
+
+def test_member_comes_back_after_single_outlier():
+    slow = Member(0.05)
+    voter = DeadlineVoter(["rf", "xgb"], [Member(), slow], probe_every=5)
+    voter.vote(None, Deadline(1000))
+    slow.delay = 0.0
+    skipped = 0
+    while voter.vote(None, Deadline(20))[1] == ["rf"]:
+        skipped += 1
+        assert skipped < 5
+    # The probe's timing replaced the outlier, so later votes are full again
+    assert voter.vote(None, Deadline(20))[1] == ["rf", "xgb"]
+
+
+def test_full_vote_fits_follows_observed_latency():
+    voter = DeadlineVoter(["rf"], [Member()])
+    assert voter.full_vote_fits(Deadline(10))
+    voter.observe_full(1.0)
+    assert not voter.full_vote_fits(Deadline(10))
+    assert voter.full_vote_fits(Deadline(5000))
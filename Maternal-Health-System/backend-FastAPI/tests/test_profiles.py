@@ -0,0 +1,72 @@
+import json
+import os
+import threading
+
+from rules.engine import CONFIG
+from rules.profiles import DEFAULT_PROFILE, ProfileStore
+
+
+def _write(directory, name, thresholds, facilities=(), mtime=None):
+    path = os.path.join(directory, f"{name}.json")
+    with open(path, "w") as f:
+        json.dump({"thresholds": thresholds, "facilities": list(facilities)}, f)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_profiles_and_facilities_are_loaded(tmp_path):
+    _write(tmp_path, "strict", {"tsh_first_tri": 2.0}, ["PHC-1"])
+    store = ProfileStore(str(tmp_path), reload_seconds=3600)
+    assert store.resolve("strict").config["tsh_first_tri"] == 2.0
+    assert store.resolve(facility="PHC-1").name == "strict"
+    assert store.resolve(facility="other").name == DEFAULT_PROFILE
+    assert store.resolve().config["tsh_first_tri"] == CONFIG["tsh_first_tri"]
+
+
+def test_changed_file_is_reloaded(tmp_path):
+    _write(tmp_path, "strict", {"tsh_first_tri": 2.0}, mtime=1000)
+    store = ProfileStore(str(tmp_path), reload_seconds=0)
+    _write(tmp_path, "strict", {"tsh_first_tri": 2.5}, mtime=2000)
+    assert store.resolve("strict").config["tsh_first_tri"] == 2.5
+
+
+def test_invalid_change_keeps_previous_version(tmp_path):
+    _write(tmp_path, "strict", {"tsh_first_tri": 2.0}, mtime=1000)
+    store = ProfileStore(str(tmp_path), reload_seconds=0)
+    _write(tmp_path, "strict", {"not_a_threshold": 1}, mtime=2000)
+    assert store.resolve("strict").config["tsh_first_tri"] == 2.0
+    assert "strict" in store.status()["errors"]
+
+
+def test_removed_file_drops_the_profile(tmp_path):
+    path = _write(tmp_path, "strict", {"tsh_first_tri": 2.0}, ["PHC-1"])
+    store = ProfileStore(str(tmp_path), reload_seconds=0)
+    os.remove(path)
+    assert store.resolve(facility="PHC-1").name == DEFAULT_PROFILE
+    assert "strict" not in store.status()["profiles"]
+
+
+def test_resolve_during_reloads_always_sees_a_whole_table(tmp_path):
+    # Readers never observe a facility mapped to a profile missing from the table
+    _write(tmp_path, "a", {"tsh_first_tri": 2.0}, ["PHC-1"], mtime=1000)
+    store = ProfileStore(str(tmp_path), reload_seconds=0)
+    stop, errors = threading.Event(), []
+
+    def resolve():
+        while not stop.is_set():
+            try:
+                store.resolve(facility="PHC-1")
+            except Exception as e:
+                errors.append(e)
+
+    readers = [threading.Thread(target=resolve) for _ in range(4)]
+    for t in readers:
+        t.start()
+    for i in range(50):
+        _write(tmp_path, "a", {"tsh_first_tri": 2.0 + i / 100}, ["PHC-1"] if i % 2 else [], mtime=1001 + i)
+        store.reload()
+    stop.set()
+    for t in readers:
+        t.join(5)
+    assert errors == []
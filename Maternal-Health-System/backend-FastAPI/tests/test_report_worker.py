@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from workers.report_worker import ReportWorker
+
+mongomock = pytest.importorskip("mongomock")
+
+
+@pytest.fixture
+def reports():
+    return mongomock.MongoClient().db.reports
+
+
+def test_batch_is_analyzed_and_released(reports):
+    reports.insert_many([{"pregnancyId": f"P{i}", "data": {"hb_1st": 9.0}} for i in range(5)])
+    worker = ReportWorker(reports, batch_size=3)
+    assert worker.process_batch() == {"claimed": 3, "analyzed": 3, "failed": 0}
+    assert worker.process_batch() == {"claimed": 2, "analyzed": 2, "failed": 0}
+    assert worker.process_batch()["claimed"] == 0
+    for doc in reports.find():
+        assert doc["anemia"] is True
+        assert doc["recommendations"]
+        assert "analysis_claim" not in doc and "analysis_claim_until" not in doc
+
+
+def test_invalid_report_records_analysis_error(reports):
+    reports.insert_many([
+        {"pregnancyId": "P1", "data": {"hb_1st": 9.0}},
+        {"pregnancyId": "P2", "data": {"hb_1st": "not a number"}},
+    ])
+    worker = ReportWorker(reports)
+    assert worker.process_batch() == {"claimed": 2, "analyzed": 1, "failed": 1}
+    failed = reports.find_one({"pregnancyId": "P2"})
+    assert "hb_1st" in failed["analysis_error"]
+    assert "recommendations" not in failed
+    # Not retried
+    assert worker.process_batch()["claimed"] == 0
+
+
+def test_expired_lease_is_reclaimed(reports):
+    now = datetime.now(timezone.utc)
+    reports.insert_many([
+        {"pregnancyId": "expired", "data": {}, "analysis_claim": "dead", "analysis_claim_until": now - timedelta(seconds=1)},
+        {"pregnancyId": "leased", "data": {}, "analysis_claim": "alive", "analysis_claim_until": now + timedelta(hours=1)},
+    ])
+    assert ReportWorker(reports).process_batch()["claimed"] == 1
+    assert "recommendations" in reports.find_one({"pregnancyId": "expired"})
+    assert reports.find_one({"pregnancyId": "leased"})["analysis_claim"] == "alive"
@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+
+from singleflight import FlightTimeout, SingleFlight, payload_key
+
+
+def _start_leader(flight, key, release, result="result"):
+    # Runs fn in a thread that blocks until release is set
+    started = threading.Event()
+    calls = []
+
+    def fn():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    outcome = {}
+
+    def run():
+        try:
+            outcome["value"] = flight.do(key, fn)
+        except Exception as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    assert started.wait(5)
+    return thread, calls, outcome
+
+
+def _join(flight, key, n, timeout=None):
+    results = [None] * n
+
+    def run(i):
+        try:
+            results[i] = flight.do(key, lambda: pytest.fail("waiter must not compute"), timeout)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    return threads, results
+
+
+def _wait_for_waiters(flight, n):
+    deadline = time.monotonic() + 5
+    while flight.stats()["coalesced"] < n:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_concurrent_callers_share_one_computation():
+    flight, release = SingleFlight(), threading.Event()
+    leader, calls, outcome = _start_leader(flight, "k", release)
+    threads, results = _join(flight, "k", 8)
+    _wait_for_waiters(flight, 8)
+    release.set()
+    for t in [leader, *threads]:
+        t.join(5)
+    assert calls == [1]
+    assert outcome["value"] == "result"
+    assert results == ["result"] * 8
+    assert flight.stats() == {"executed": 1, "coalesced": 8, "errors": 0, "timeouts": 0, "in_flight": 0}
+
+
+def test_error_is_shared_and_not_kept():
+    flight, release = SingleFlight(), threading.Event()
+    leader, _, outcome = _start_leader(flight, "k", release, ValueError("boom"))
+    threads, results = _join(flight, "k", 3)
+    _wait_for_waiters(flight, 3)
+    release.set()
+    for t in [leader, *threads]:
+        t.join(5)
+    assert isinstance(outcome["error"], ValueError)
+    assert all(isinstance(r, ValueError) for r in results)
+    # The next call computes again
+    assert flight.do("k", lambda: "fresh") == "fresh"
+
+
+def test_waiter_timeout_leaves_the_flight_running():
+    flight, release = SingleFlight(), threading.Event()
+    leader, _, outcome = _start_leader(flight, "k", release)
+    threads, results = _join(flight, "k", 1, timeout=0.01)
+    threads[0].join(5)
+    assert isinstance(results[0], FlightTimeout)
+    release.set()
+    leader.join(5)
+    assert outcome["value"] == "result"
+    assert flight.stats()["timeouts"] == 1
+
+
+def test_different_keys_do_not_coalesce():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    assert flight.stats()["executed"] == 2
+
+
+def test_payload_key_ignores_key_order():
+    assert payload_key({"a": 1, "b": [1, 2]}) == payload_key({"b": [1, 2], "a": 1})
+    assert payload_key({"a": 1}) != payload_key({"a": 2})
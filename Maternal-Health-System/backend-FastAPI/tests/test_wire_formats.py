@@ -0,0 +1,7 @@
+from wire_formats import JSON, MSGPACK, negotiate
+
+
+def test_negotiate_skips_unacceptable_types():
+    assert negotiate("application/msgpack;q=0, application/json") == JSON
+    assert negotiate("application/msgpack;q=0") == JSON
+    assert negotiate(f"{MSGPACK};q=0.5, */*;q=0") == MSGPACK
@@ -0,0 +1,117 @@
+import os
+from typing import Dict, Iterable, List, Optional
+
+from sklearn.pipeline import Pipeline
+from threadpoolctl import threadpool_info, threadpool_limits
+from xgboost import XGBModel
+
+# Per-worker CPU thread budget for the native libraries behind the models.
+#
+# XGBoost, the random forests' joblib backend and OpenBLAS/OpenMP (used by
+# the MLPs) each size their thread pools to every core of the host. With
+# several workers on one host that multiplies into far more runnable threads
+# than cores, and single-row predictions mostly wait on each other's threads.
+# The budget gives each worker cores // workers threads (at least one):
+#
+#   THREAD_BUDGET_WORKERS   workers sharing the host (default WEB_CONCURRENCY or 1;
+#                           serve.py sets it from --workers)
+#   THREADS_PER_WORKER      explicit per-worker thread count (overrides the split)
+#
+# The cores are the ones this process may run on (its affinity mask), so a
+# container CPU set is respected. serve.py can also pin each worker to its own
+# slice of those cores (--pin-cpus). GET /debug/threads shows what is in effect.
+
+# Read by OpenMP/BLAS runtimes when they start; serve.py exports them before
+# the models are imported
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "VECLIB_MAXIMUM_THREADS")
+
+
+def available_cpus() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def model_members(models: Iterable) -> List:
+    # Estimators inside pipelines are configured individually
+    members = []
+    for model in models:
+        if model is None:
+            continue
+        if isinstance(model, Pipeline):
+            members.extend(step for _, step in model.steps)
+        else:
+            members.append(model)
+    return members
+
+
+class ThreadBudget:
+    def __init__(self, workers: int = 1, threads_per_worker: Optional[int] = None, cpus: Optional[List[int]] = None):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.workers = workers
+        self.cpus = cpus if cpus is not None else available_cpus()
+        self.threads = threads_per_worker or max(1, len(self.cpus) // workers)
+        self.pinned: Optional[List[int]] = None
+        self._limits = None
+        self._models: List = []
+
+    @classmethod
+    def from_env(cls) -> "ThreadBudget":
+        workers = int(os.environ.get("THREAD_BUDGET_WORKERS") or os.environ.get("WEB_CONCURRENCY") or 1)
+        threads = os.environ.get("THREADS_PER_WORKER")
+        return cls(workers, int(threads) if threads else None)
+
+    def export_env(self):
+        # Explicit settings in the environment win
+        for name in THREAD_ENV_VARS:
+            os.environ.setdefault(name, str(self.threads))
+
+    def apply(self, models: Optional[Iterable] = None):
+        # BLAS and OpenMP pools of this process, then each model's own setting;
+        # without models, the ones of the previous call (e.g. in a forked worker)
+        self._limits = threadpool_limits(limits=self.threads)
+        if models is not None:
+            self._models = model_members(models)
+        # The budget only lowers thread counts: XGBoost's n_jobs=None means
+        # every core, scikit-learn's means one thread and is left alone
+        for model in self._models:
+            if isinstance(model, XGBModel):
+                if model.n_jobs is None or model.n_jobs <= 0 or model.n_jobs > self.threads:
+                    model.set_params(n_jobs=self.threads)
+                model.get_booster().set_param("nthread", model.n_jobs)
+            elif getattr(model, "n_jobs", None) is not None:
+                if model.n_jobs < 0 or model.n_jobs > self.threads:
+                    model.n_jobs = self.threads
+
+    def pin(self, worker_index: int):
+        # Worker i runs on its own `threads` cores, wrapping around when
+        # workers * threads exceeds the cores available
+        if not hasattr(os, "sched_setaffinity"):
+            return
+        start = worker_index * self.threads
+        cpus = sorted({self.cpus[(start + i) % len(self.cpus)] for i in range(self.threads)})
+        os.sched_setaffinity(0, cpus)
+        self.pinned = cpus
+
+    def describe(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "cpus": self.cpus,
+            "threads_per_worker": self.threads,
+            "pinned_cpus": self.pinned,
+            "affinity": available_cpus(),
+            "env": {name: os.environ.get(name) for name in THREAD_ENV_VARS},
+            "models": [
+                {"model": type(model).__name__, "n_jobs": getattr(model, "n_jobs", None)}
+                for model in self._models
+                if hasattr(model, "n_jobs")
+            ],
+            "threadpools": [
+                {key: pool.get(key) for key in ("user_api", "internal_api", "num_threads", "prefix")}
+                for pool in threadpool_info()
+            ],
+        }
+
+
+THREAD_BUDGET = ThreadBudget.from_env()
@@ -0,0 +1,201 @@
+# Distils a soft-voting ensemble into one compact student model.
+#
+# The teacher is the ensemble in --base (rf + xgb + mlp, as served). Its
+# soft-vote probabilities on the rows of the input files, plus --augment
+# jittered copies of each row, are the training targets; the student is fitted
+# on them as soft labels (every row once per class, weighted by the teacher's
+# probability), so it learns the ensemble's probabilities, not just its classes.
+#
+# Students:
+#   gbt  a small XGBoost model (default)
+#   mlp  a standardised one-hidden-layer MLP
+#
+# A share of the real rows (--holdout) is kept out of training and used for the
+# agreement report: class agreement and probability error against the
+# ensemble, single-row and batch latency, and serialized size of both. The
+# student is written as <ensemble>_student.pkl with the report next to it as
+# <ensemble>_student.json, in --out (default: the --base directory), unless
+# its agreement is below --min-agreement. Serve it with ?backend=distilled on
+# /predict_preg and /predict_fetal, or PREDICT_BACKEND=distilled.
+#
+# Input files are CSV or NDJSON with one column per feature; labels are not needed.
+#
+# Run from the backend-FastAPI directory:
+#   python training/distill.py --ensemble preg --augment 20 reports.csv
+import argparse
+import json
+import os
+import pickle
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.neural_network import MLPClassifier
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from xgboost import XGBClassifier
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from risk_prediction_apis import FETAL_STUDENT_FILE, MODEL_DIR, PREG_STUDENT_FILE, model_paths, soft_vote
+from training.incremental import ENSEMBLES, TrainingError, iter_chunks
+
+STUDENT_FILES = {"preg": PREG_STUDENT_FILE, "fetal": FETAL_STUDENT_FILE}
+
+
+def make_student(kind: str, seed: int):
+    if kind == "gbt":
+        return XGBClassifier(
+            n_estimators=80, max_depth=4, learning_rate=0.2, tree_method="hist", n_jobs=1, random_state=seed
+        )
+    return Pipeline([
+        ("scaler", StandardScaler()),
+        ("mlp", MLPClassifier(hidden_layer_sizes=(32,), max_iter=400, random_state=seed)),
+    ])
+
+
+def read_rows(paths: List[str], features: List[str]) -> pd.DataFrame:
+    frames = []
+    for chunk in iter_chunks(paths, 50000):
+        missing = [f for f in features if f not in chunk.columns]
+        if missing:
+            raise TrainingError(f"missing columns {missing}")
+        frames.append(chunk[features].apply(pd.to_numeric, errors="coerce").dropna())
+    return pd.concat(frames, ignore_index=True).astype(float)
+
+
+def augment(X: pd.DataFrame, copies: int, jitter: float, rng) -> pd.DataFrame:
+    # Copies of every row with Gaussian noise of `jitter` standard deviations per
+    # feature, kept inside the observed range; integer-valued features stay integers
+    if copies <= 0:
+        return X
+    values = np.repeat(X.to_numpy(), copies, axis=0)
+    noisy = values + rng.normal(0, 1, values.shape) * (jitter * X.std(ddof=0).to_numpy())
+    noisy = np.clip(noisy, X.min().to_numpy(), X.max().to_numpy())
+    integer = (X == X.round()).all().to_numpy()
+    noisy[:, integer] = noisy[:, integer].round()
+    return pd.concat([X, pd.DataFrame(noisy, columns=X.columns)], ignore_index=True)
+
+
+def fit_soft(student, X: pd.DataFrame, P: np.ndarray):
+    # Weighted log-loss over (row, class) pairs equals cross-entropy against
+    # the teacher's probabilities; negligible weights are dropped
+    n, k = P.shape
+    Xr = pd.concat([X] * k, ignore_index=True)
+    yr = np.repeat(np.arange(k), n)
+    weights = P.T.reshape(-1)
+    keep = weights > 1e-4
+    if isinstance(student, Pipeline):
+        student.fit(Xr[keep], yr[keep], mlp__sample_weight=weights[keep])
+    else:
+        student.fit(Xr[keep], yr[keep], sample_weight=weights[keep])
+    return student
+
+
+def median_latency_ms(predict, X: pd.DataFrame, repeat: int) -> float:
+    timings = []
+    for i in range(repeat):
+        row = X.iloc[[i % len(X)]]
+        start = time.perf_counter()
+        predict(row)
+        timings.append(time.perf_counter() - start)
+    return round(float(np.median(timings)) * 1e3, 3)
+
+
+def batch_us_per_row(predict, X: pd.DataFrame) -> float:
+    start = time.perf_counter()
+    predict(X)
+    return round((time.perf_counter() - start) / len(X) * 1e6, 2)
+
+
+def serialized_mb(models) -> float:
+    return round(sum(len(pickle.dumps(m, protocol=pickle.HIGHEST_PROTOCOL)) for m in models) / 2**20, 3)
+
+
+def agreement_report(teacher, student, X: pd.DataFrame, repeat: int) -> Dict:
+    P_teacher = soft_vote(teacher, X)
+    P_student = student.predict_proba(X)
+    c_teacher, c_student = P_teacher.argmax(1), P_student.argmax(1)
+    error = np.abs(P_teacher - P_student)
+    teacher_predict = lambda rows: soft_vote(teacher, rows)
+    latency = {
+        "ensemble_single_ms": median_latency_ms(teacher_predict, X, repeat),
+        "student_single_ms": median_latency_ms(student.predict_proba, X, repeat),
+        "ensemble_batch_us_per_row": batch_us_per_row(teacher_predict, X),
+        "student_batch_us_per_row": batch_us_per_row(student.predict_proba, X),
+    }
+    size = {"ensemble_mb": serialized_mb(teacher), "student_mb": serialized_mb([student])}
+    return {
+        "holdout_rows": len(X),
+        "class_agreement": round(float(np.mean(c_teacher == c_student)), 4),
+        "class_agreement_by_teacher_class": {
+            str(c): round(float(np.mean(c_student[c_teacher == c] == c)), 4) for c in np.unique(c_teacher)
+        },
+        "probability_mae": round(float(error.mean()), 4),
+        "probability_max_error": round(float(error.max()), 4),
+        "latency": latency,
+        "single_row_speedup": round(latency["ensemble_single_ms"] / latency["student_single_ms"], 1),
+        "serialized_size": size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distil an ensemble into one student model")
+    parser.add_argument("paths", nargs="+", help="CSV or NDJSON files of model inputs")
+    parser.add_argument("--ensemble", choices=sorted(ENSEMBLES), required=True)
+    parser.add_argument("--student", choices=["gbt", "mlp"], default="gbt")
+    parser.add_argument("--base", default=MODEL_DIR, help="directory of the teacher ensemble")
+    parser.add_argument("--out", help="directory for the student (default: --base)")
+    parser.add_argument("--augment", type=int, default=10, help="jittered copies per training row")
+    parser.add_argument("--jitter", type=float, default=0.1, help="noise, in feature standard deviations")
+    parser.add_argument("--holdout", type=float, default=0.2, help="share of real rows kept for the report")
+    parser.add_argument("--min-agreement", type=float, default=0.95, help="refuse to write a worse student")
+    parser.add_argument("--latency-repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    features, files = ENSEMBLES[args.ensemble]
+    rng = np.random.default_rng(args.seed)
+    try:
+        teacher = [joblib.load(p) for p in model_paths(files, args.base)]
+        X = read_rows(args.paths, features)
+    except (OSError, ValueError) as e:
+        sys.exit(f"error: {e}")
+    if len(X) < 10:
+        sys.exit("error: need at least 10 input rows")
+
+    order = rng.permutation(len(X))
+    n_holdout = max(1, int(len(X) * args.holdout))
+    X_holdout = X.iloc[order[:n_holdout]].reset_index(drop=True)
+    X_train = augment(X.iloc[order[n_holdout:]].reset_index(drop=True), args.augment, args.jitter, rng)
+
+    started = time.perf_counter()
+    student = fit_soft(make_student(args.student, args.seed), X_train, soft_vote(teacher, X_train))
+    report = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "ensemble": args.ensemble,
+        "student": args.student,
+        "teacher": os.path.abspath(args.base),
+        "inputs": [os.path.abspath(p) for p in args.paths],
+        "train_rows": len(X_train),
+        "train_seconds": round(time.perf_counter() - started, 2),
+        **agreement_report(teacher, student, X_holdout, args.latency_repeat),
+    }
+    print(json.dumps(report, indent=2))
+    if report["class_agreement"] < args.min_agreement:
+        sys.exit(f"error: class agreement {report['class_agreement']} is below --min-agreement {args.min_agreement}")
+
+    out = args.out or args.base
+    os.makedirs(out, exist_ok=True)
+    path = os.path.join(out, STUDENT_FILES[args.ensemble])
+    joblib.dump(student, path)
+    with open(os.path.splitext(path)[0] + ".json", "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+# Incremental retraining of the soft-voting ensembles from new labelled data.
+#
+# Starts from the ensemble in --base (default MODEL_DIR or the working
+# directory), streams the new rows in chunks and updates each member with
+# only those rows:
+#   mlp  one partial_fit pass per chunk (--mlp-epochs); the pipeline's scaler
+#        keeps its training statistics so the learned weights stay valid
+#   xgb  --xgb-rounds more boosting rounds per chunk, continuing the booster
+#   rf   --rf-trees new trees per chunk via warm_start; --rf-max-trees drops
+#        the oldest trees beyond that many, bounding the forest's size
+# so an update costs time proportional to the new data, not to the history.
+#
+# The result is written as a new version directory under --out holding all six
+# member files under their usual names (the ensemble not being updated is
+# copied unchanged) plus manifest.json, and is served with MODEL_DIR=<version>.
+# With --eval, the accuracy of the ensemble before and after the update on a
+# labelled holdout file is recorded in the manifest.
+#
+# Input files are CSV or NDJSON (.ndjson/.jsonl) with one column per feature
+# of the ensemble (PREG_FEATURES or FETAL_FEATURES) and a label column.
+#
+# Run from the backend-FastAPI directory:
+#   python training/incremental.py --ensemble preg --out model_versions reports_2024q3.csv
+#   MODEL_DIR=model_versions/v0001 uvicorn main:app
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+import xgboost
+from sklearn.pipeline import Pipeline
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from risk_prediction_apis import (
+    FETAL_FEATURES,
+    FETAL_MODEL_FILES,
+    MODEL_DIR,
+    PREG_FEATURES,
+    PREG_MODEL_FILES,
+    model_paths,
+    soft_vote,
+)
+
+# features, member files (rf, xgb, mlp)
+ENSEMBLES = {
+    "preg": (PREG_FEATURES, PREG_MODEL_FILES),
+    "fetal": (FETAL_FEATURES, FETAL_MODEL_FILES),
+}
+MANIFEST = "manifest.json"
+
+
+class TrainingError(ValueError):
+    pass
+
+
+def iter_chunks(paths: List[str], chunk_size: int) -> Iterator[pd.DataFrame]:
+    for path in paths:
+        if path.endswith((".ndjson", ".jsonl")):
+            reader = pd.read_json(path, lines=True, chunksize=chunk_size)
+        elif path.endswith(".csv"):
+            reader = pd.read_csv(path, chunksize=chunk_size)
+        else:
+            raise TrainingError(f"{path}: expected a .csv, .ndjson or .jsonl file")
+        with reader:
+            yield from reader
+
+
+def labelled_rows(chunk: pd.DataFrame, features: List[str], label: str, classes) -> Tuple[pd.DataFrame, np.ndarray, int]:
+    # (X, y, dropped rows): rows with a missing value or an unknown label are dropped
+    missing = [c for c in features + [label] if c not in chunk.columns]
+    if missing:
+        raise TrainingError(f"missing columns {missing}")
+    chunk = chunk[features + [label]].apply(pd.to_numeric, errors="coerce").dropna()
+    keep = chunk[label].isin(classes)
+    dropped = len(keep) - int(keep.sum())
+    chunk = chunk[keep]
+    return chunk[features].astype(float), chunk[label].to_numpy().astype(int), dropped
+
+
+def member_input(model, X: pd.DataFrame):
+    # Members fitted on DataFrames keep feature names; the others were fitted on arrays
+    return X if hasattr(model, "feature_names_in_") else X.to_numpy()
+
+
+class IncrementalUpdater:
+    def __init__(
+        self,
+        rf,
+        xgb,
+        mlp,
+        rf_trees: int = 10,
+        rf_max_trees: Optional[int] = None,
+        xgb_rounds: int = 5,
+        mlp_epochs: int = 1,
+    ):
+        self.rf, self.xgb, self.mlp = rf, xgb, mlp
+        self.rf_trees = rf_trees
+        self.rf_max_trees = rf_max_trees
+        self.xgb_rounds = xgb_rounds
+        self.mlp_epochs = mlp_epochs
+        self.classes = rf.classes_
+        # Rows waiting for the next forest update (see _update_rf)
+        self._rf_pending: List[Tuple[pd.DataFrame, np.ndarray]] = []
+        self.counts = {
+            "rows": 0,
+            "chunks": 0,
+            "rf_trees_before": len(rf.estimators_),
+            "rf_trees_added": 0,
+            "rf_trees_dropped": 0,
+            "rf_rows_skipped": 0,
+            "xgb_rounds_before": xgb.get_booster().num_boosted_rounds(),
+            "mlp_epochs": 0,
+        }
+        self.class_counts = {int(c): 0 for c in self.classes}
+
+    def update(self, X: pd.DataFrame, y: np.ndarray):
+        if len(y) == 0:
+            return
+        self._update_mlp(X, y)
+        self._update_xgb(X, y)
+        self._rf_pending.append((X, y))
+        self._update_rf()
+        self.counts["rows"] += len(y)
+        self.counts["chunks"] += 1
+        for c, n in zip(*np.unique(y, return_counts=True)):
+            self.class_counts[int(c)] += int(n)
+
+    def _update_mlp(self, X: pd.DataFrame, y: np.ndarray):
+        if isinstance(self.mlp, Pipeline):
+            net, Xt = self.mlp[-1], self.mlp[:-1].transform(member_input(self.mlp, X))
+        else:
+            net, Xt = self.mlp, member_input(self.mlp, X)
+        net.verbose = False
+        for _ in range(self.mlp_epochs):
+            net.partial_fit(Xt, y)
+        self.counts["mlp_epochs"] += self.mlp_epochs
+
+    def _update_xgb(self, X: pd.DataFrame, y: np.ndarray):
+        # The low-level API keeps num_class fixed, so a chunk without some
+        # class still continues the same multi-class booster
+        params = {k: v for k, v in self.xgb.get_xgb_params().items() if v is not None}
+        params["num_class"] = len(self.xgb.classes_)
+        data = xgboost.DMatrix(member_input(self.xgb, X), label=np.searchsorted(self.xgb.classes_, y))
+        booster = xgboost.train(params, data, num_boost_round=self.xgb_rounds, xgb_model=self.xgb.get_booster())
+        self.xgb._Booster = booster
+        self.xgb.n_estimators = booster.num_boosted_rounds()
+
+    def _update_rf(self, final: bool = False):
+        # A forest fit resets classes_ from y, so new trees are only grown on
+        # rows covering every class; rows are held until they do
+        X = pd.concat([x for x, _ in self._rf_pending])
+        y = np.concatenate([y for _, y in self._rf_pending])
+        if not np.isin(self.classes, y).all():
+            if final:
+                self.counts["rf_rows_skipped"] += len(y)
+                self._rf_pending = []
+            return
+        self._rf_pending = []
+        self.rf.set_params(warm_start=True, oob_score=False, n_estimators=len(self.rf.estimators_) + self.rf_trees)
+        self.rf.fit(member_input(self.rf, X), y)
+        self.counts["rf_trees_added"] += self.rf_trees
+        if self.rf_max_trees and len(self.rf.estimators_) > self.rf_max_trees:
+            self.counts["rf_trees_dropped"] += len(self.rf.estimators_) - self.rf_max_trees
+            self.rf.estimators_ = self.rf.estimators_[-self.rf_max_trees:]
+            self.rf.n_estimators = self.rf_max_trees
+
+    def finish(self) -> Dict:
+        if self._rf_pending:
+            self._update_rf(final=True)
+        self.rf.warm_start = False
+        return {
+            **self.counts,
+            "rf_trees_after": len(self.rf.estimators_),
+            "xgb_rounds_after": self.xgb.get_booster().num_boosted_rounds(),
+            "class_counts": self.class_counts,
+        }
+
+
+def accuracy(models, features: List[str], path: str, label: str, classes) -> Optional[float]:
+    frames = [labelled_rows(chunk, features, label, classes) for chunk in iter_chunks([path], 50000)]
+    X = pd.concat([x for x, _, _ in frames])
+    y = np.concatenate([y for _, y, _ in frames])
+    if len(y) == 0:
+        return None
+    predicted = classes[np.argmax(soft_vote(models, X), axis=1)]
+    return round(float(np.mean(predicted == y)), 4)
+
+
+def next_version(out: str) -> str:
+    existing = [
+        int(name[1:]) for name in os.listdir(out) if name.startswith("v") and name[1:].isdigit()
+    ] if os.path.isdir(out) else []
+    return f"v{max(existing, default=0) + 1:04d}"
+
+
+def write_version(out: str, base: str, files, models, manifest: Dict) -> str:
+    # Written to a temporary directory and renamed, so a version directory is
+    # never seen half written
+    os.makedirs(out, exist_ok=True)
+    version = next_version(out)
+    tmp = os.path.join(out, f".{version}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for name in PREG_MODEL_FILES + FETAL_MODEL_FILES:
+        if name not in files:
+            shutil.copy2(os.path.join(base, name), os.path.join(tmp, name))
+    for name, model in zip(files, models):
+        joblib.dump(model, os.path.join(tmp, name))
+    with open(os.path.join(tmp, MANIFEST), "w") as f:
+        json.dump({"version": version, **manifest}, f, indent=2)
+    path = os.path.join(out, version)
+    os.rename(tmp, path)
+    return path
+
+
+def parent_rows(base: str) -> Dict[str, int]:
+    # Rows per ensemble used by all earlier incremental versions the base descends from
+    try:
+        with open(os.path.join(base, MANIFEST)) as f:
+            return {k: int(v) for k, v in json.load(f).get("rows_total", {}).items()}
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Update an ensemble incrementally from new labelled data")
+    parser.add_argument("paths", nargs="+", help="CSV or NDJSON files of labelled rows")
+    parser.add_argument("--ensemble", choices=sorted(ENSEMBLES), required=True)
+    parser.add_argument("--base", default=MODEL_DIR, help="directory of the ensemble to start from")
+    parser.add_argument("--out", default="model_versions", help="directory that receives the new version")
+    parser.add_argument("--label", default="label", help="label column")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--rf-trees", type=int, default=10, help="trees grown per chunk")
+    parser.add_argument("--rf-max-trees", type=int, help="keep at most this many (newest) trees")
+    parser.add_argument("--xgb-rounds", type=int, default=5, help="boosting rounds per chunk")
+    parser.add_argument("--mlp-epochs", type=int, default=1, help="partial_fit passes per chunk")
+    parser.add_argument("--eval", help="labelled holdout file scored before and after the update")
+    args = parser.parse_args()
+
+    features, files = ENSEMBLES[args.ensemble]
+    models = [joblib.load(p) for p in model_paths(files, args.base)]
+    updater = IncrementalUpdater(
+        *models,
+        rf_trees=args.rf_trees,
+        rf_max_trees=args.rf_max_trees,
+        xgb_rounds=args.xgb_rounds,
+        mlp_epochs=args.mlp_epochs,
+    )
+    started = time.perf_counter()
+    dropped = 0
+    try:
+        before = accuracy(models, features, args.eval, args.label, updater.classes) if args.eval else None
+        for chunk in iter_chunks(args.paths, args.chunk_size):
+            X, y, n_dropped = labelled_rows(chunk, features, args.label, updater.classes)
+            dropped += n_dropped
+            updater.update(X, y)
+        summary = updater.finish()
+        after = accuracy(models, features, args.eval, args.label, updater.classes) if args.eval else None
+    except (OSError, ValueError) as e:
+        sys.exit(f"error: {e}")
+    if summary["rows"] == 0:
+        sys.exit("error: no usable labelled rows")
+
+    rows_total = parent_rows(args.base)
+    manifest = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "ensemble": args.ensemble,
+        "parent": os.path.abspath(args.base),
+        "inputs": [os.path.abspath(p) for p in args.paths],
+        "rows_dropped": dropped,
+        "rows_total": {**rows_total, args.ensemble: rows_total.get(args.ensemble, 0) + summary["rows"]},
+        "update_seconds": round(time.perf_counter() - started, 2),
+        "settings": {
+            "chunk_size": args.chunk_size,
+            "rf_trees": args.rf_trees,
+            "rf_max_trees": args.rf_max_trees,
+            "xgb_rounds": args.xgb_rounds,
+            "mlp_epochs": args.mlp_epochs,
+        },
+        **summary,
+    }
+    if args.eval:
+        manifest["eval"] = {"path": os.path.abspath(args.eval), "accuracy_before": before, "accuracy_after": after}
+    path = write_version(args.out, args.base, files, models, manifest)
+    print(json.dumps(manifest, indent=2))
+    print(f"wrote {path}; serve it with MODEL_DIR={path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import numpy as np
+from fastapi import HTTPException, Request, Response
+
+# Content negotiation for the bulk scoring endpoints.
+#
+#   application/json                     default, row or columnar (see batch_input.py)
+#   application/msgpack                  same structures as JSON, binary encoded;
+#                                        meant for small and medium batches
+#   application/vnd.apache.arrow.stream  Arrow IPC stream for large columnar batches
+#   application/x-ndjson                 one JSON object per line, consumed as a
+#                                        stream by endpoints that support it
+#
+# msgpack and pyarrow are imported lazily so the JSON path works without them.
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+NDJSON = "application/x-ndjson"
+
+SUPPORTED = (JSON, MSGPACK, ARROW_STREAM)
+
+# Accepted aliases seen in the wild
+_ALIASES = {
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+}
+
+
+def _media_type(header: Optional[str]) -> str:
+    media_type = (header or JSON).split(";")[0].strip().lower()
+    return _ALIASES.get(media_type, media_type)
+
+
+def _msgpack():
+    try:
+        import msgpack
+    except ImportError:
+        raise HTTPException(status_code=415, detail="msgpack support is not installed")
+    return msgpack
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise HTTPException(status_code=415, detail="Arrow support is not installed")
+    return pa
+
+
+def _arrow_column(column) -> Any:
+    pa = _pyarrow()
+    if pa.types.is_integer(column.type) or pa.types.is_floating(column.type):
+        # A single chunk without nulls converts to NumPy without copying;
+        # nulls become NaN and are rejected by the batch validators.
+        if column.num_chunks == 1:
+            return column.chunk(0).to_numpy(zero_copy_only=False)
+        return column.to_numpy()
+    return column.to_pylist()
+
+
+def arrow_to_payload(table) -> Any:
+    # A table with a single fixed-size-list<float64> column is a row-major
+    # feature matrix and comes back as a zero-copy 2-D view of the Arrow
+    # buffer; any other table comes back as a dict of columns.
+    pa = _pyarrow()
+    if table.num_columns == 1 and pa.types.is_fixed_size_list(table.schema.field(0).type):
+        column = table.column(0)
+        width = column.type.list_size
+        chunks = column.chunks
+        values = chunks[0].flatten() if len(chunks) == 1 else column.combine_chunks().flatten()
+        if values.null_count:
+            raise HTTPException(status_code=422, detail="matrix contains null values")
+        return values.to_numpy(zero_copy_only=False).reshape(-1, width)
+    return {name: _arrow_column(table.column(name)) for name in table.column_names}
+
+
+def decode_body(body: bytes, content_type: Optional[str]) -> Any:
+    media_type = _media_type(content_type)
+    try:
+        if media_type == JSON:
+            return json.loads(body)
+        if media_type == MSGPACK:
+            return _msgpack().unpackb(body, raw=False)
+        if media_type == ARROW_STREAM:
+            pa = _pyarrow()
+            with pa.ipc.open_stream(pa.py_buffer(body)) as reader:
+                return arrow_to_payload(reader.read_all())
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"could not decode {media_type} body: {e}")
+    raise HTTPException(status_code=415, detail=f"unsupported content type: {media_type}")
+
+
+async def request_payload(request: Request) -> Any:
+    # FastAPI dependency: decode the body according to its Content-Type
+    return decode_body(await request.body(), request.headers.get("content-type"))
+
+
+def is_ndjson(request: Request) -> bool:
+    return _media_type(request.headers.get("content-type")) == NDJSON
+
+
+async def iter_ndjson_batches(request: Request, batch_size: int) -> AsyncIterator[List[Any]]:
+    # Parse an NDJSON body as it arrives, yielding lists of at most batch_size objects
+    batch, buffer = [], b""
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                batch.append(_ndjson_line(line))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if buffer.strip():
+        batch.append(_ndjson_line(buffer))
+    if batch:
+        yield batch
+
+
+def _ndjson_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"could not decode NDJSON line: {e}")
+
+
+def negotiate(accept: Optional[str]) -> str:
+    ranges = []
+    for position, part in enumerate((accept or "").split(",")):
+        pieces = [p.strip() for p in part.split(";")]
+        media_type = _ALIASES.get(pieces[0].lower(), pieces[0].lower())
+        q = 1.0
+        for param in pieces[1:]:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if not q > 0:
+            # q=0 means "not acceptable"
+            continue
+        ranges.append((-q, position, media_type))
+    for _, _, media_type in sorted(ranges):
+        if media_type in SUPPORTED:
+            return media_type
+        if media_type in ("*/*", "application/*"):
+            return JSON
+    return JSON
+
+
+def response_format(request: Request) -> str:
+    return negotiate(request.headers.get("accept"))
+
+
+def _arrow_response(columns: Dict[str, Any]) -> Response:
+    pa = _pyarrow()
+    table = pa.table(columns)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(content=sink.getvalue().to_pybytes(), media_type=ARROW_STREAM)
+
+
+def encode_predictions(avg_proba: np.ndarray, media_type: str, format_prediction):
+    # Arrow responses stay columnar: one probability column per class plus
+    # the ensemble class, rounded like the JSON response.
+    if media_type == ARROW_STREAM:
+        columns = {
+            f"Class_{i}": np.round(avg_proba[:, i], 4) for i in range(avg_proba.shape[1])
+        }
+        columns["EnsemblePrediction"] = np.argmax(avg_proba, axis=1).astype(np.int64)
+        return _arrow_response(columns)
+    return encode_records([format_prediction(proba) for proba in avg_proba], media_type)
+
+
+def encode_records(records: List[Dict], media_type: str):
+    if media_type == MSGPACK:
+        return Response(content=_msgpack().packb(records), media_type=MSGPACK)
+    if media_type == ARROW_STREAM:
+        pa = _pyarrow()
+        if not records:
+            return _arrow_response({})
+        table = pa.Table.from_pylist(records)
+        return _arrow_response({name: table.column(name) for name in table.column_names})
+    return records
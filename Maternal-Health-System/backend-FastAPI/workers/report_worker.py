@@ -0,0 +1,171 @@
+# Batched analysis of stored reports.
+#
+# Polls the `reports` collection for documents that have no recommendations
+# yet, claims a batch of them, runs the rule engine over the whole batch and
+# writes every result back with one bulk_write. Replaces the per-report HTTPS
+# call to /analyze in controllers/report.js (set REPORT_ANALYSIS=worker there).
+#
+# Claims are leases: a worker that dies mid-batch leaves documents that any
+# worker picks up again once the lease expires. A report the rules cannot
+# process gets `analysis_error` instead of recommendations, so it is not
+# retried forever.
+#
+# With AUDIT_LOG_DIR set, every analysis (or analysis_error) is written to the
+# audit log as route "report_worker", with the report's pregnancyId.
+#
+# Run from the backend-FastAPI directory:
+#   MONGODB_URI=mongodb://localhost:27017/maternal python workers/report_worker.py
+import argparse
+import logging
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+from pymongo import UpdateOne
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from audit import AUDIT_LOG
+from models.report import ReportData
+from result_cache import config_digest, file_digest
+from rules.config import CONFIG
+from rules.engine import RULE_MODULES, RULE_SOURCES, alert_flags, get_recommendations
+
+REPORT_FIELDS = list(ReportData.__annotations__)
+
+logger = logging.getLogger("report_worker")
+
+# Same fields as the /analyze audit records; the worker uses the built-in thresholds
+RULE_VERSIONS = {
+    "rules": file_digest(RULE_SOURCES),
+    "rule_modules": list(RULE_MODULES),
+    "profile": "built-in",
+    "thresholds": config_digest(CONFIG),
+}
+
+
+def report_data(doc: Dict) -> Dict:
+    # The schema nests values under `data`; older documents store them at the top level
+    source = doc.get("data") if isinstance(doc.get("data"), dict) else doc
+    return ReportData(**{f: source.get(f) for f in REPORT_FIELDS}).dict()
+
+
+def analysis_fields(patient: Dict) -> Dict:
+    # Same fields the Node controller used to store from /analyze
+    result = get_recommendations(patient)
+    flags = alert_flags(result["alerts"])
+    return {
+        "recommendations": result["supplement_recommendations"],
+        "alerts": result["alerts"],
+        "dietary_recommendations": result["dietary_recommendations"],
+        "anemia": flags["anemia"],
+        "gdm": flags["gdm"],
+        "thyroid": flags["thyroid"],
+    }
+
+
+class ReportWorker:
+    def __init__(self, collection, batch_size: int = 500, lease_seconds: float = 300):
+        # collection: a pymongo (or mongomock) Collection
+        self.collection = collection
+        self.batch_size = batch_size
+        self.lease = timedelta(seconds=lease_seconds)
+
+    def _pending(self, now: datetime) -> Dict:
+        return {
+            "recommendations": {"$exists": False},
+            "analysis_error": {"$exists": False},
+            "$or": [
+                {"analysis_claim_until": {"$exists": False}},
+                {"analysis_claim_until": {"$lt": now}},
+            ],
+        }
+
+    def claim(self) -> List[Dict]:
+        now = datetime.now(timezone.utc)
+        pending = self._pending(now)
+        ids = [
+            doc["_id"]
+            for doc in self.collection.find(pending, {"_id": 1}).limit(self.batch_size)
+        ]
+        if not ids:
+            return []
+        token = uuid.uuid4().hex
+        # Another worker may claim some of these first; only ours come back
+        self.collection.update_many(
+            {"_id": {"$in": ids}, **pending},
+            {"$set": {"analysis_claim": token, "analysis_claim_until": now + self.lease}},
+        )
+        return list(self.collection.find({"analysis_claim": token}))
+
+    def process_batch(self) -> Dict[str, int]:
+        docs = self.claim()
+        if not docs:
+            return {"claimed": 0, "analyzed": 0, "failed": 0}
+
+        now = datetime.now(timezone.utc)
+        release = {"analysis_claim": "", "analysis_claim_until": ""}
+        operations, failed = [], 0
+        for doc in docs:
+            patient = None
+            try:
+                patient = report_data(doc)
+                update = {**analysis_fields(patient), "analyzed_at": now}
+            except Exception as e:
+                update = {"analysis_error": str(e), "analyzed_at": now}
+                failed += 1
+            pregnancy_id = doc.get("pregnancyId")
+            AUDIT_LOG.record(
+                "report_worker",
+                {"report_id": str(doc["_id"]), "data": patient if patient is not None else doc.get("data")},
+                update,
+                RULE_VERSIONS,
+                str(pregnancy_id) if pregnancy_id is not None else None,
+            )
+            operations.append(
+                UpdateOne(
+                    {"_id": doc["_id"], "analysis_claim": doc["analysis_claim"]},
+                    {"$set": update, "$unset": release},
+                )
+            )
+        result = self.collection.bulk_write(operations, ordered=False)
+        return {
+            "claimed": len(docs),
+            "analyzed": result.modified_count - failed,
+            "failed": failed,
+        }
+
+    def run(self, interval: float = 5.0, once: bool = False):
+        while True:
+            stats = self.process_batch()
+            if stats["claimed"]:
+                logger.info("analyzed %d failed %d", stats["analyzed"], stats["failed"])
+            if stats["claimed"] < self.batch_size:
+                if once:
+                    return
+                time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analyze stored reports in batches")
+    parser.add_argument("--mongo-uri", default=os.environ.get("MONGODB_URI", "mongodb://localhost:27017/maternal"))
+    parser.add_argument("--db", help="database name (default: the one in the URI)")
+    parser.add_argument("--collection", default="reports")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between polls when idle")
+    parser.add_argument("--lease", type=float, default=300, help="seconds before an unfinished claim expires")
+    parser.add_argument("--once", action="store_true", help="exit when no pending reports are left")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    from pymongo import MongoClient
+
+    client = MongoClient(args.mongo_uri)
+    db = client[args.db] if args.db else client.get_default_database()
+    ReportWorker(db[args.collection], args.batch_size, args.lease).run(args.interval, args.once)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,18 @@ import RegistrationModel from "../models/registration.js";
 import ReportModel from "../models/report.js";
 import axios from "axios";
 
+// Node stops waiting for FastAPI after FASTAPI_TIMEOUT_MS; FastAPI gets the
+// same deadline, so it drops or degrades work whose answer would arrive too late.
+// The pregnancy id, when known, is recorded with FastAPI's audit log entry.
+const FASTAPI_TIMEOUT_MS = Number(process.env.FASTAPI_TIMEOUT_MS || 10000);
+const fastApiConfig = (pregnancyId) => ({
+  timeout: FASTAPI_TIMEOUT_MS,
+  headers: {
+    "X-Request-Deadline-Ms": String(FASTAPI_TIMEOUT_MS),
+    ...(pregnancyId ? { "X-Pregnancy-Id": String(pregnancyId) } : {}),
+  },
+});
+
 // Create report
 export const createReport = async (req, res) => {
   try {
@@ -18,13 +30,24 @@ export const createReport = async (req, res) => {
       { $push: { reports: report._id } }
     );
 
-    // 2. Call FastAPI for recommendations
+    // 2. Call FastAPI for recommendations, unless the batch worker
+    // (backend-FastAPI/workers/report_worker.py) analyzes stored reports
     let recommendations = null;
     let fastApiError = null;
+    if (process.env.REPORT_ANALYSIS === "worker") {
+      const finalReport = await ReportModel.findById(report._id);
+      return res.status(201).json({
+        report: finalReport,
+        recommendations,
+        fastApiError,
+        analysisPending: true,
+      });
+    }
     try {
       const fastApiRes = await axios.post(
         "https://mrp999-mh-project.hf.space/analyze", // Change if FastAPI runs elsewhere
-        { data }
+        { data },
+        fastApiConfig(pregnancyId)
       );
       recommendations = fastApiRes.data;
       // Optionally, update the report with recommendations
@@ -79,7 +102,7 @@ export const getReportById = async (req, res) => {
 // Call FastAPI for pregnancy risk prediction
 export const predictPregnancyRisk = async (req, res) => {
   try {
-    const response = await axios.post("https://mrp999-mh-project.hf.space/predict_preg", req.body);
+    const response = await axios.post("https://mrp999-mh-project.hf.space/predict_preg", req.body, fastApiConfig(req.body.pregnancyId));
     res.json(response.data);
   } catch (err) {
     res.status(500).json({ error: "Failed to get pregnancy risk prediction", details: err.message });
@@ -89,7 +112,7 @@ export const predictPregnancyRisk = async (req, res) => {
 // Call FastAPI for fetal risk prediction
 export const predictFetalRisk = async (req, res) => {
   try {
-    const response = await axios.post("https://mrp999-mh-project.hf.space/predict_fetal", req.body);
+    const response = await axios.post("https://mrp999-mh-project.hf.space/predict_fetal", req.body, fastApiConfig(req.body.pregnancyId));
     res.json(response.data);
   } catch (err) {
     res.status(500).json({ error: "Failed to get fetal risk prediction", details: err.message });
@@ -99,13 +122,23 @@ export const predictFetalRisk = async (req, res) => {
 // Call FastAPI for rules-based recommendations
 export const analyzeReport = async (req, res) => {
   try {
-    const response = await axios.post("https://mrp999-mh-project.hf.space/analyze", req.body);
+    const response = await axios.post("https://mrp999-mh-project.hf.space/analyze", req.body, fastApiConfig(req.body.pregnancyId));
     res.json(response.data);
   } catch (err) {
     res.status(500).json({ error: "Failed to get analysis from FastAPI", details: err.message });
   }
 };
 
+// Call FastAPI once for rules, pregnancy risk and fetal risk together
+export const assessPatient = async (req, res) => {
+  try {
+    const response = await axios.post("https://mrp999-mh-project.hf.space/assess", req.body, fastApiConfig(req.body.pregnancyId));
+    res.json(response.data);
+  } catch (err) {
+    res.status(500).json({ error: "Failed to get assessment from FastAPI", details: err.message });
+  }
+};
+
 export const getReportsByPregnancyId = async (req, res) => {
   try {
     const { pregnancyId } = req.params;
@@ -117,3 +150,13 @@ export const getReportsByPregnancyId = async (req, res) => {
 };
 
 export { getReports };
+
+// What-if risk curves for one patient as selected features vary
+export const pregnancyRiskSensitivity = async (req, res) => {
+  try {
+    const response = await axios.post("https://mrp999-mh-project.hf.space/predict_preg/sensitivity", req.body, fastApiConfig());
+    res.json(response.data);
+  } catch (err) {
+    res.status(500).json({ error: "Failed to get sensitivity from FastAPI", details: err.message });
+  }
+};
@@ -1,5 +1,5 @@
 import express from "express";
-import { createReport, getReportById, getReports, getReportsByPregnancyId, predictPregnancyRisk, predictFetalRisk, analyzeReport } from "../controllers/report.js";
+import { createReport, getReportById, getReports, getReportsByPregnancyId, predictPregnancyRisk, predictFetalRisk, analyzeReport, assessPatient, pregnancyRiskSensitivity } from "../controllers/report.js";
 const router = express.Router();
 
 /**
@@ -160,6 +160,55 @@ const router = express.Router();
  *         description: Rules-based recommendations
  *       500:
  *         description: Analysis error
+ *
+ * /report/assess:
+ *   post:
+ *     summary: Rules-based analysis plus pregnancy and fetal risk in one call (calls FastAPI)
+ *     tags: [Report]
+ *     requestBody:
+ *       required: true
+ *       content:
+ *         application/json:
+ *           schema:
+ *             type: object
+ *             properties:
+ *               data:
+ *                 type: object
+ *                 description: Patient report data, as for /report/analyze
+ *               risk:
+ *                 type: object
+ *                 description: Pregnancy risk inputs; systolic, diastolic and bmi default to the report's sbp, dbp and bmi
+ *               fetal:
+ *                 type: object
+ *                 description: CTG features, as for /report/predict_fetal
+ *     responses:
+ *       200:
+ *         description: Merged analysis and predictions; components without enough inputs are listed under skipped
+ *       500:
+ *         description: Assessment error
+ *
+ * /report/predict_preg/sensitivity:
+ *   post:
+ *     summary: Pregnancy risk curves as selected inputs vary, with the values where the risk class changes (calls FastAPI)
+ *     tags: [Report]
+ *     requestBody:
+ *       required: true
+ *       content:
+ *         application/json:
+ *           schema:
+ *             type: object
+ *             properties:
+ *               data:
+ *                 type: object
+ *                 description: Pregnancy risk inputs, as for /report/predict_preg
+ *               ranges:
+ *                 type: object
+ *                 description: Per feature {min, max, steps}; defaults to blood pressure, bs, bmi, heart rate and temperature
+ *     responses:
+ *       200:
+ *         description: Baseline prediction, and per feature the risk curve, class transitions and nearest lower-risk value
+ *       500:
+ *         description: Sensitivity error
  */
 /**
  * @swagger
@@ -196,5 +245,7 @@ router.get("/:id", getReportById);
 router.post("/predict_preg", predictPregnancyRisk);
 router.post("/predict_fetal", predictFetalRisk);
 router.post("/analyze", analyzeReport);
+router.post("/assess", assessPatient);
+router.post("/predict_preg/sensitivity", pregnancyRiskSensitivity);
 
 export default router;